@@ -15,15 +15,28 @@ class AnswerInline(admin.TabularInline):  # เปลี่ยนชื่อ cl
 @admin.register(Question)
 class WordAdmin(admin.ModelAdmin):
     inlines = [AnswerInline]  # เปลี่ยนชื่อ inline
-    list_display = ['word', 'pronunciation', 'get_level_number', 'sound_file']  
+    list_display = ['word', 'pronunciation', 'get_level_number', 'sound_file', 'get_attempts', 'get_correct_rate']  
     list_filter = ['level']  
     search_fields = ['word', 'pronunciation']
+    list_select_related = ['level', 'stats']
 
     def get_level_number(self,obj):
         return obj.level.number if obj.level else None
     get_level_number.short_description = 'Level'
     get_level_number.admin_order_field = 'level__number'
 
+    # สถิติจาก progress.QuestionStats (อัปเดตด้วย manage.py update_question_stats)
+    def get_attempts(self, obj):
+        stats = getattr(obj, 'stats', None)
+        return stats.attempts if stats else 0
+    get_attempts.short_description = 'Attempts'
+    get_attempts.admin_order_field = 'stats__attempts'
+
+    def get_correct_rate(self, obj):
+        stats = getattr(obj, 'stats', None)
+        return f"{stats.correct_rate:.1f}%" if stats and stats.attempts else '-'
+    get_correct_rate.short_description = 'Correct (%)'
+
 @admin.register(Score)
 class ScoreAdmin(admin.ModelAdmin):
     list_display = ['player_name', 'score', 'max_score', 'level', 'created_at']
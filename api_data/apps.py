@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ApiDataConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_data'
+
+    def ready(self):
+        from django.core import checks
+
+        from . import signals
+        from .cache import check_shared_cache
+        checks.register(check_shared_cache, checks.Tags.caches, deploy=True)
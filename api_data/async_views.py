@@ -0,0 +1,128 @@
+"""view แบบ async ของ endpoint ที่อ่านอย่างเดียวและถูกเรียกบ่อย (ใช้เมื่อ ``ASYNC_VIEWS`` เปิดอยู่)
+
+รันด้วย uvicorn (ดู ``Procfile.asgi``) แต่ละ request เป็น coroutine ที่รอฐานข้อมูลผ่าน
+async ORM แทนการจอง worker ทั้งตัวแบบ gunicorn sync ผลลัพธ์เหมือน view ของ DRF ทุกอย่าง
+(serializer, cache, สิทธิ์และ ETag เดียวกัน) ส่วน request แบบอื่น (POST, ?search=, แบ่งหน้า ฯลฯ)
+ส่งต่อให้ view เดิมของ DRF
+"""
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from .cache import LEVEL_BUNDLE_TIMEOUT, aget_content_version, aget_vocabulary_version, level_bundle_key
+from .conditional import READ_METHODS, add_validators, content_validators, not_modified
+from .lean import LeanQuestionSerializer, LeanVocabularySerializer, lean_enabled
+from .models import Level, Question, Vocabulary
+from .renderers import dumps
+from .serializers import LevelSerializer, QuestionSerializer, VocabularySerializer
+from .views import LevelViewSet, QuestionsByLevelView, VocabularyViewSet
+
+# query parameter ที่ view async ตอบเองได้ นอกนั้นส่งต่อให้ DRF
+VOCABULARY_PARAMS = {'category'}
+
+
+def json_response(data, status=200):
+    """JSON แบบเดียวกับ JSONRenderer ของ DRF (UTF-8 ไม่ escape, ไม่มีช่องว่าง)"""
+    content = dumps(data, DjangoJSONEncoder().default)
+    if content is not None:
+        return HttpResponse(content, status=status, content_type='application/json')
+    return JsonResponse(data, status=status, safe=False, encoder=DjangoJSONEncoder,
+                        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')})
+
+
+async def authorize(request, ajax=True):
+    """ตรวจสิทธิ์แบบ IsAuthenticatedAjaxOrAdmin (ajax=False คือ IsAuthenticated) คืนค่า 403 ถ้าไม่ผ่าน"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return json_response({'detail': 'Authentication credentials were not provided.'}, status=403)
+    if ajax and not (user.is_superuser or user.is_staff) \
+            and request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+        return json_response({'detail': 'You do not have permission to perform this action.'}, status=403)
+    return None
+
+
+async def conditional(request, version, build):
+    """ETag/Last-Modified แบบเดียวกับ ConditionalGetMixin (ETag ตรงกับของ view DRF ที่ตอบ JSON)"""
+    etag, last_modified = content_validators(request, version, 'json')
+    response = not_modified(request, etag, last_modified) or await build()
+    return add_validators(response, etag, last_modified, vary=['Accept'])
+
+
+def delegate(view):
+    """เรียก view เดิม (sync) ใน thread ของ Django สำหรับ request ที่ view async ไม่ได้ตอบเอง"""
+    return sync_to_async(view)
+
+
+level_list_fallback = delegate(LevelViewSet.as_view({'get': 'list', 'post': 'create'}))
+questions_by_level_fallback = delegate(QuestionsByLevelView.as_view())
+vocabulary_list_fallback = delegate(VocabularyViewSet.as_view({'get': 'list'}))
+
+
+# CSRF ของ request ที่ส่งต่อ DRF ตรวจเองใน SessionAuthentication เหมือน view เดิม
+@csrf_exempt
+async def level_list(request):
+    if request.method not in READ_METHODS:
+        return await level_list_fallback(request)
+    denied = await authorize(request)
+    if denied:
+        return denied
+
+    async def build():
+        levels = [level async for level in Level.objects.order_by('number')]
+        return json_response(LevelSerializer(levels, many=True, context={'request': request}).data)
+    return await conditional(request, await aget_content_version(), build)
+
+
+@csrf_exempt
+async def questions_by_level(request, level_id):
+    if request.method not in READ_METHODS:
+        return await questions_by_level_fallback(request, level_id=level_id)
+    denied = await authorize(request)
+    if denied:
+        return denied
+
+    version = await aget_content_version()
+
+    async def build():
+        # cache key เดียวกับ QuestionsByLevelView ทั้งสอง view ใช้ cache ร่วมกัน
+        cache_key = level_bundle_key(level_id, request.build_absolute_uri('/'), version)
+        data = await cache.aget(cache_key)
+        if data is None:
+            if lean_enabled():
+                serializer = LeanQuestionSerializer(request)
+                rows = [row async for row in serializer.rows(level_id)]
+                answer_rows = [row async for row in serializer.answer_rows([row[0] for row in rows])]
+                data = serializer.to_representation(rows, answer_rows)
+            else:
+                questions = [
+                    question async for question in
+                    Question.objects.filter(level=level_id).select_related('level').prefetch_related('answers')
+                    .order_by('id')
+                ]
+                data = QuestionSerializer(questions, many=True, context={'request': request}).data
+            await cache.aset(cache_key, data, LEVEL_BUNDLE_TIMEOUT)
+        return json_response(data)
+    return await conditional(request, version, build)
+
+
+@csrf_exempt
+async def vocabulary_list(request):
+    if request.method not in READ_METHODS or not set(request.GET) <= VOCABULARY_PARAMS:
+        return await vocabulary_list_fallback(request)
+    denied = await authorize(request)
+    if denied:
+        return denied
+
+    async def build():
+        queryset = Vocabulary.objects.all()
+        category = request.GET.get('category')
+        if category:
+            queryset = queryset.filter(category=category)
+        if lean_enabled():
+            serializer = LeanVocabularySerializer(request)
+            return json_response(serializer.to_representation([row async for row in serializer.rows(queryset)]))
+        vocabulary = [entry async for entry in queryset]
+        return json_response(VocabularySerializer(vocabulary, many=True, context={'request': request}).data)
+    return await conditional(request, await aget_vocabulary_version(), build)
@@ -0,0 +1,170 @@
+"""แปลงไฟล์เสียงที่อัปโหลดให้อยู่ในรูปแบบเดียวกันสำหรับมือถือ
+
+หลังบันทึก Question / Vocabulary ที่มีไฟล์เสียงใหม่ ไฟล์จะถูกส่งเข้า thread pool
+ในเครื่อง (ไม่ทำใน request) แล้วใช้ ffmpeg
+
+- แปลงเป็น MP3 mono 44.1 kHz ที่ ``AUDIO_BITRATE`` (เล่นได้ทุก browser)
+- ปรับความดังด้วย EBU R128 loudnorm ให้ทุกคำดังเท่ากัน
+- ตัด metadata/ID3 และภาพปกที่ติดมาออก
+- เก็บความยาว (วินาที) และขนาดไฟล์ไว้ใน ``sound_duration`` / ``sound_size``
+
+ไฟล์ที่แปลงแล้วจำชื่อไว้ใน ``sound_processed_name`` จึงไม่ถูกแปลงซ้ำ
+ถ้าไม่มี ffmpeg ในเครื่อง ไฟล์จะถูกใช้ตามที่อัปโหลดมา
+``manage.py process_sounds`` แปลงไฟล์ที่มีอยู่แล้วแบบขนาน
+"""
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+SOUND_MODELS = ('api_data.Question', 'api_data.Vocabulary')
+OUTPUT_EXTENSION = '.mp3'
+SAMPLE_RATE = 44100
+# เป้าหมายความดังสำหรับเสียงพูดบนมือถือ
+LOUDNORM_FILTER = 'loudnorm=I=-16:TP=-1.5:LRA=11'
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def ffmpeg_binary():
+    return getattr(settings, 'FFMPEG_BINARY', 'ffmpeg')
+
+
+def ffprobe_binary():
+    return getattr(settings, 'FFPROBE_BINARY', 'ffprobe')
+
+
+def processing_available():
+    return (
+        getattr(settings, 'AUDIO_PROCESSING', True)
+        and shutil.which(ffmpeg_binary()) is not None
+        and shutil.which(ffprobe_binary()) is not None
+    )
+
+
+def needs_processing(instance):
+    return bool(instance.sound_file) and instance.sound_file.name != instance.sound_processed_name
+
+
+def transcode(source, target):
+    subprocess.run([
+        ffmpeg_binary(), '-nostdin', '-y', '-loglevel', 'error',
+        '-i', source,
+        '-vn', '-map_metadata', '-1', '-ac', '1', '-ar', str(SAMPLE_RATE),
+        '-af', LOUDNORM_FILTER,
+        '-c:a', 'libmp3lame', '-b:a', getattr(settings, 'AUDIO_BITRATE', '64k'),
+        '-id3v2_version', '0', '-write_id3v1', '0',
+        '-f', 'mp3', target,
+    ], check=True, capture_output=True, timeout=120)
+
+
+def probe_duration(path):
+    result = subprocess.run([
+        ffprobe_binary(), '-v', 'error', '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1', path,
+    ], check=True, capture_output=True, text=True, timeout=30)
+    return round(float(result.stdout.strip()), 3)
+
+
+@contextmanager
+def local_file(field_file):
+    """path ของไฟล์ในเครื่องสำหรับส่งให้ ffmpeg (copy ลง temp ถ้า storage ไม่ใช่ไฟล์ในเครื่อง)"""
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        path = None
+    if path:
+        yield path
+        return
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(field_file.name)[1]) as f:
+        with field_file.open('rb') as uploaded:
+            shutil.copyfileobj(uploaded, f)
+        f.flush()
+        yield f.name
+
+
+def output_name(name):
+    return os.path.splitext(os.path.basename(name))[0] + OUTPUT_EXTENSION
+
+
+def process_sound(model_label, pk, force=False):
+    """แปลงไฟล์เสียงของแถวเดียว คืนค่า True ถ้าได้ไฟล์ใหม่"""
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not instance.sound_file:
+        return False
+    if not force and not needs_processing(instance):
+        return False
+
+    source_name = instance.sound_file.name
+    with tempfile.TemporaryDirectory() as workdir:
+        target = os.path.join(workdir, output_name(source_name))
+        with local_file(instance.sound_file) as source:
+            transcode(source, target)
+        duration = probe_duration(target)
+
+        with transaction.atomic():
+            instance = model.objects.select_for_update().filter(pk=pk).first()
+            if instance is None or instance.sound_file.name != source_name:
+                # มีการอัปโหลดไฟล์ใหม่ระหว่างแปลง งานของไฟล์ใหม่จะมาแทน
+                return False
+            with open(target, 'rb') as f:
+                instance.sound_file.save(output_name(source_name), File(f), save=False)
+            instance.sound_duration = duration
+            instance.sound_size = instance.sound_file.size
+            instance.sound_processed_name = instance.sound_file.name
+            instance.save(update_fields=['sound_file', 'sound_duration', 'sound_size', 'sound_processed_name'])
+
+    if source_name != instance.sound_file.name and not model.objects.filter(sound_file=source_name).exists():
+        instance.sound_file.storage.delete(source_name)
+    logger.info(f"Processed {source_name} -> {instance.sound_file.name} ({duration}s, {instance.sound_size} bytes)")
+    return True
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'AUDIO_WORKERS', 2),
+                thread_name_prefix='audio'
+            )
+        return _executor
+
+
+def run_job(model_label, pk, force=False):
+    """งานหนึ่งชิ้นใน worker thread คืนค่าผลของ process_sound (None ถ้า error)"""
+    # ออกจาก _pending ตอนเริ่มงาน ถ้ามีไฟล์ใหม่อัปโหลดระหว่างแปลงจะได้เข้าคิวอีกรอบ
+    _pending.discard((model_label, pk))
+    try:
+        return process_sound(model_label, pk, force)
+    except Exception:
+        logger.exception(f"Audio processing failed for {model_label} {pk}")
+        return None
+    finally:
+        # thread ของ pool ไม่ได้อยู่ใน request cycle ต้องปิด connection เอง
+        connection.close()
+
+
+def enqueue_sound(instance):
+    """ส่งไฟล์เสียงของ instance เข้า worker pool (ถ้ายังไม่ได้แปลงและมี ffmpeg)"""
+    if not needs_processing(instance) or not processing_available():
+        return
+    key = (instance._meta.label, instance.pk)
+    if key in _pending:
+        return
+    _pending.add(key)
+    get_executor().submit(run_job, *key)
@@ -0,0 +1,256 @@
+"""Autocomplete คำศัพท์จาก index ในหน่วยความจำ
+
+คำอ่านภาษาละตินถูกแปลงเป็น key ที่ไม่สนการสะกดแบบต่างๆ ("Ka phok", "kaphok",
+"ga pok" -> "kapok") แล้วเก็บใน
+
+- prefix trie: แต่ละ node เก็บ id ของคำศัพท์ที่มี key ขึ้นต้นด้วย prefix นั้น
+  และ ``MAX_LIMIT`` คำแรกเรียงตามคำศัพท์ไว้แล้ว คำค้นสั้นๆ ที่ตรงเกือบทุกคำ
+  จึงไม่ต้องเรียงทั้ง index ทุกครั้งที่พิมพ์
+- n-gram index: trigram -> key ใช้หา key ที่ใกล้เคียงเมื่อพิมพ์ผิด
+  แล้วคัดด้วย edit distance
+
+index สร้างครั้งแรกเมื่อถูกเรียกใช้ และอัปเดตทีละคำผ่าน signal ของ Vocabulary
+ถ้า process อื่นแก้ไขคำศัพท์ (version ใน cache เปลี่ยน) จะสร้างใหม่ทั้งหมด
+"""
+import heapq
+import re
+import threading
+from bisect import insort
+from collections import Counter, defaultdict
+
+from .cache import get_vocabulary_version
+from .search import normalize_term
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# การสะกดคำอ่านที่ต่างกันแต่ออกเสียงเหมือนกัน (เรียงจากยาวไปสั้น)
+ROMANIZATION_RULES = [
+    ('bp', 'p'), ('dt', 't'), ('ph', 'p'), ('th', 't'), ('kh', 'k'), ('ch', 'c'),
+    ('ng', 'N'), ('g', 'k'), ('j', 'c'), ('w', 'u'), ('r', 'l'),
+]
+REPEATED_RE = re.compile(r'(.)\1+')
+
+
+def search_key(value):
+    """แปลงข้อความ (ไทยหรือละติน) เป็น key สำหรับ index"""
+    key = normalize_term(value).replace(' ', '')
+    if key.isascii():
+        for source, target in ROMANIZATION_RULES:
+            key = key.replace(source, target)
+        # สระเสียงยาว (aa, ee) และพยัญชนะซ้ำ นับเป็นตัวเดียว
+        key = REPEATED_RE.sub(r'\1', key)
+    return key
+
+
+def ngrams(key):
+    padded = f'^{key}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_distance(key):
+    return 1 if len(key) <= 6 else 2
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance ที่หยุดทันทีเมื่อเกิน limit (คืน limit + 1)"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class TrieNode:
+    __slots__ = ('children', 'ids', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = Counter()
+        # (word, id) ที่น้อยที่สุดไม่เกิน MAX_LIMIT ตัวจาก ids เรียงแล้ว
+        self.top = []
+
+
+class AutocompleteIndex:
+    FIELDS = ['id', 'word', 'pronunciation', 'thai_translation', 'english_translation', 'category']
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+        self.clear()
+
+    def clear(self):
+        self.root = TrieNode()
+        self.entries = {}
+        self.entry_keys = {}
+        self.key_ids = defaultdict(set)
+        self.gram_keys = defaultdict(set)
+
+    def keys_for(self, entry):
+        return {
+            key for key in (
+                search_key(entry['pronunciation']),
+                search_key(entry['word']),
+                search_key(entry['thai_translation']),
+                search_key(entry['english_translation']),
+                *(search_key(part) for part in entry['english_translation'].split()),
+            ) if key
+        }
+
+    def add(self, entry):
+        self.remove(entry['id'])
+        keys = self.keys_for(entry)
+        self.entries[entry['id']] = entry
+        self.entry_keys[entry['id']] = keys
+        item = (entry['word'], entry['id'])
+        for key in keys:
+            node = self.root
+            for char in key:
+                node = node.children.setdefault(char, TrieNode())
+                node.ids[entry['id']] += 1
+                if node.ids[entry['id']] == 1 and (len(node.top) < MAX_LIMIT or item < node.top[-1]):
+                    insort(node.top, item)
+                    del node.top[MAX_LIMIT:]
+            if not self.key_ids[key]:
+                for gram in ngrams(key):
+                    self.gram_keys[gram].add(key)
+            self.key_ids[key].add(entry['id'])
+
+    def remove(self, vocabulary_id):
+        keys = self.entry_keys.pop(vocabulary_id, set())
+        entry = self.entries.pop(vocabulary_id, None)
+        for key in keys:
+            node = self.root
+            path = []
+            for char in key:
+                path.append((node, char))
+                node = node.children[char]
+                node.ids[vocabulary_id] -= 1
+                if node.ids[vocabulary_id] <= 0:
+                    del node.ids[vocabulary_id]
+                    self.drop_top(node, (entry['word'], vocabulary_id))
+            # ตัด node ที่ไม่มีคำศัพท์เหลือแล้วออก
+            for parent, char in reversed(path):
+                if parent.children[char].ids:
+                    break
+                del parent.children[char]
+            self.key_ids[key].discard(vocabulary_id)
+            if not self.key_ids[key]:
+                del self.key_ids[key]
+                for gram in ngrams(key):
+                    self.gram_keys[gram].discard(key)
+                    if not self.gram_keys[gram]:
+                        del self.gram_keys[gram]
+
+    def drop_top(self, node, item):
+        """เอาคำออกจาก top ของ node แล้วเติมคำถัดไปจาก ids (เฉพาะตอนแก้ไข ไม่ใช่ตอน query)"""
+        if item not in node.top:
+            return
+        node.top.remove(item)
+        if len(node.ids) > len(node.top):
+            node.top = self.smallest(MAX_LIMIT, node.ids)
+
+    def smallest(self, count, ids):
+        return heapq.nsmallest(count, ((self.entries[vocabulary_id]['word'], vocabulary_id) for vocabulary_id in ids))
+
+    def build(self, version=None):
+        from .models import Vocabulary
+
+        with self.lock:
+            self.clear()
+            for entry in Vocabulary.objects.order_by().values(*self.FIELDS):
+                self.add(entry)
+            self.version = version
+
+    def ensure_current(self):
+        version = get_vocabulary_version()
+        if self.version != version:
+            self.build(version)
+
+    def prefix_node(self, key):
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def prefix_ids(self, key, limit, exclude):
+        """id ที่ขึ้นต้นด้วย key ไม่อยู่ใน exclude ไม่เกิน limit ตัว เรียงตามคำศัพท์"""
+        node = self.prefix_node(key)
+        if node is None:
+            return []
+        top = node.top
+        if len(top) < len(node.ids) and len(top) < limit + len(exclude):
+            # exact match กินที่ใน top ไปจนไม่พอ (เกิดได้เมื่อ exact มีหลายคำ)
+            top = self.smallest(limit + len(exclude), node.ids)
+        return [vocabulary_id for _, vocabulary_id in top if vocabulary_id not in exclude][:limit]
+
+    def fuzzy_matches(self, key):
+        """key ที่ห่างจากคำค้นไม่เกิน max_distance คืนค่า {id: distance}"""
+        limit = max_distance(key)
+        grams = ngrams(key)
+        # key ที่ต่างกัน d ตัวอักษร มี trigram ร่วมกันอย่างน้อย len(grams) - 3d ตัว
+        shared = Counter(candidate for gram in grams for candidate in self.gram_keys.get(gram, ()))
+        needed = max(1, len(grams) - 3 * limit)
+        matches = {}
+        for candidate, count in shared.items():
+            if count < needed:
+                continue
+            distance = edit_distance(key, candidate, limit)
+            if distance <= limit:
+                for vocabulary_id in self.key_ids[candidate]:
+                    matches[vocabulary_id] = min(distance, matches.get(vocabulary_id, distance))
+        return matches
+
+    def query(self, text, limit=DEFAULT_LIMIT):
+        """คืนรายการคำศัพท์ที่ตรงกับคำค้น เรียง exact > prefix > พิมพ์ผิด"""
+        key = search_key(text)
+        if not key:
+            return []
+        with self.lock:
+            self.ensure_current()
+            ranked = {}
+            for vocabulary_id in self.key_ids.get(key, ()):
+                ranked[vocabulary_id] = (0, 0)
+            for vocabulary_id in self.prefix_ids(key, limit, ranked):
+                ranked[vocabulary_id] = (1, 0)
+            if len(ranked) < limit:
+                for vocabulary_id, distance in self.fuzzy_matches(key).items():
+                    ranked.setdefault(vocabulary_id, (2, distance))
+            ordered = heapq.nsmallest(
+                limit, ranked,
+                key=lambda vocabulary_id: (*ranked[vocabulary_id], self.entries[vocabulary_id]['word'], vocabulary_id)
+            )
+            return [
+                {**self.entries[vocabulary_id], 'match': ('exact', 'prefix', 'fuzzy')[ranked[vocabulary_id][0]]}
+                for vocabulary_id in ordered
+            ]
+
+    def update(self, vocabulary, previous_version, version):
+        """นำการแก้ไขคำศัพท์หนึ่งคำเข้า index
+
+        ทำเฉพาะเมื่อ index ตรงกับ version ก่อนแก้ไข ถ้าตามหลังอยู่แล้ว
+        (หรือยังไม่เคยสร้าง) ปล่อยให้สร้างใหม่ตอน query ครั้งถัดไป
+        """
+        with self.lock:
+            if self.version is None or self.version != previous_version:
+                return
+            self.add({name: getattr(vocabulary, name) for name in self.FIELDS})
+            self.version = version
+
+    def discard(self, vocabulary_id, previous_version, version):
+        with self.lock:
+            if self.version is None or self.version != previous_version:
+                return
+            self.remove(vocabulary_id)
+            self.version = version
+
+
+vocabulary_index = AutocompleteIndex()
@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+CONTENT_VERSION_KEY = 'api_data:content_version'
+VOCABULARY_VERSION_KEY = 'api_data:vocabulary_version'
+LEVEL_BUNDLE_TIMEOUT = getattr(settings, 'LEVEL_BUNDLE_CACHE_TIMEOUT', 60 * 60 * 24)
+LOCAL_CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+logger = logging.getLogger(__name__)
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # ใช้เวลาปัจจุบันเป็น version เพื่อไม่ให้ชนกับ key เก่าที่อาจยังค้างอยู่ใน cache
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+async def aget_version(key):
+    """``get_version`` สำหรับ view แบบ async (``cache.aget`` ไม่บล็อก event loop ถ้า cache อยู่บน network)"""
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key, time.time_ns())
+    return version
+
+
+def bump_version(key):
+    version = time.time_ns()
+    cache.set(key, version, None)
+    return version
+
+
+def get_content_version():
+    """คืนค่า version ของเนื้อหา (Level/Question/Answer) ที่ใช้เป็นส่วนหนึ่งของ cache key"""
+    return get_version(CONTENT_VERSION_KEY)
+
+
+async def aget_content_version():
+    return await aget_version(CONTENT_VERSION_KEY)
+
+
+def bump_content_version():
+    """เปลี่ยน version ของเนื้อหา ทำให้ cache ของทุก level หมดอายุทันที"""
+    return bump_version(CONTENT_VERSION_KEY)
+
+
+def get_vocabulary_version():
+    """คืนค่า version ของคำศัพท์ (Vocabulary) ใช้บอก process อื่นว่าคำศัพท์เปลี่ยนแล้ว"""
+    return get_version(VOCABULARY_VERSION_KEY)
+
+
+async def aget_vocabulary_version():
+    return await aget_version(VOCABULARY_VERSION_KEY)
+
+
+def bump_vocabulary_version():
+    return bump_version(VOCABULARY_VERSION_KEY)
+
+
+def level_bundle_key(level_id, base_url, version=None):
+    """สร้าง cache key ของชุดคำถามต่อ level
+
+    base_url แยก cache ตาม scheme/host เพราะ sound_file_url เป็น URL เต็ม
+    view แบบ async ส่ง version ที่อ่านด้วย ``aget_content_version`` มาเอง
+    """
+    if version is None:
+        version = get_content_version()
+    host_hash = hashlib.md5(base_url.encode('utf-8')).hexdigest()[:12]
+    return f'api_data:level_bundle:{level_id}:{version}:{host_hash}'
+
+
+def local_cache_workers():
+    """จำนวน worker ถ้า cache default เป็นของแต่ละ process (LocMemCache) บน production ไม่อย่างนั้น 0
+
+    version ของเนื้อหา ชุดคำถาม ``user_levels`` และ leaderboard อยู่ใน cache default ทั้งหมด
+    ถ้าแต่ละ worker มี cache ของตัวเอง การล้าง cache ใน worker หนึ่งจะไม่ถึง worker อื่น
+    (gunicorn และ ``Procfile.asgi`` ใช้จำนวน worker จาก ``WEB_CONCURRENCY``)
+    """
+    if settings.DEBUG or settings.CACHES['default']['BACKEND'] != LOCAL_CACHE_BACKEND:
+        return 0
+    try:
+        return max(int(os.environ.get('WEB_CONCURRENCY', 1)), 1)
+    except ValueError:
+        return 1
+
+
+def ensure_shared_cache():
+    """เรียกตอนเริ่ม server (wsgi.py / asgi.py) บันทึก error ถ้าหลาย worker ใช้ LocMemCache
+
+    ไม่หยุด server เพราะ host อย่าง Heroku / Render ตั้ง ``WEB_CONCURRENCY`` ให้เอง
+    deploy เดิมที่ยังไม่มี cache กลางจะได้ไม่ boot ไม่ขึ้น (``check --deploy`` เตือนด้วย W001)
+    """
+    workers = local_cache_workers()
+    if workers > 1:
+        logger.error(
+            f'WEB_CONCURRENCY={workers} with LocMemCache: each worker keeps its own content versions, '
+            f'level bundles and leaderboards. Set CACHE_BACKEND to a shared cache (e.g. redis) or run one worker.'
+        )
+    elif workers:
+        logger.warning('LocMemCache is per process; set CACHE_BACKEND to a shared cache before adding workers')
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """``manage.py check --deploy``"""
+    if not local_cache_workers():
+        return []
+    return [checks.Warning(
+        'The default cache is LocMemCache, which is not shared between worker processes.',
+        hint='Set CACHE_BACKEND/CACHE_LOCATION to a shared cache such as redis.',
+        id='api_data.W001',
+    )]
@@ -0,0 +1,39 @@
+"""Conditional GET (ETag / Last-Modified) ของ endpoint เนื้อหา
+
+validator สร้างจาก version ใน cache (``get_content_version`` / ``get_vocabulary_version``
+ซึ่งเป็นเวลา ns ตอนที่เนื้อหาเปลี่ยนครั้งล่าสุด) จึงตอบ 304 ได้โดยไม่ query และไม่ serialize
+ETag รวม URL เต็ม (host มีผลกับ URL ไฟล์เสียง, query มีผลกับผลลัพธ์) และรูปแบบ response ไว้ด้วย
+
+response เป็นของผู้ใช้ที่ login เท่านั้นจึงเป็น ``private`` และ ``no-cache`` ให้ browser ถามใหม่
+ทุกครั้ง (ไม่อย่างนั้นจะเดาอายุ cache จาก Last-Modified เอง) ``Vary: X-Requested-With``
+ใส่ให้ทุก response ของ /api/ ใน APIAccessMiddleware
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def content_validators(request, version, variant=''):
+    """คืนค่า (etag, last_modified เป็นวินาที) ของ response ที่สร้างจากเนื้อหา version นี้"""
+    digest = hashlib.md5(f'{request.build_absolute_uri()}|{variant}'.encode('utf-8')).hexdigest()[:12]
+    return f'"{version:x}-{digest}"', version // 1_000_000_000
+
+
+def not_modified(request, etag, last_modified):
+    """HttpResponseNotModified ถ้า client มี response นี้อยู่แล้ว ไม่อย่างนั้น None"""
+    if request.method not in READ_METHODS:
+        return None
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def add_validators(response, etag, last_modified, vary=()):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        if vary:
+            patch_vary_headers(response, vary)
+    return response
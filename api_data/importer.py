@@ -0,0 +1,450 @@
+"""นำเข้าเนื้อหาจากไฟล์ใน static/data แบบ bulk (ใช้กับ ``manage.py import_content``)
+
+- ``ezan_words.json`` (list ของคำ) -> ``Vocabulary`` key คือ ``"<Category>:<Word>"``
+  เก็บใน ``Vocabulary.source_key``
+- ``vocabulary.json`` (stages -> levels -> words) -> ``Level`` (key คือ ``number``)
+  ``Question`` (``uid`` เป็น uuid5 จาก id ของคำในไฟล์) และ ``Answer`` (key คือคำถามกับ ``english_text``)
+
+แถวที่เพิ่มทาง admin ไม่มี key ของไฟล์ (``source_key`` เป็น NULL, ``uid`` สุ่ม) จึงจับคู่ด้วย
+key ธรรมชาติแทน (คำศัพท์: category + word, คำถาม: word + pronunciation + level) แล้วเขียน key
+ของไฟล์ลงแถวเดิม ถ้าตรงกันมากกว่าหนึ่งแถวจะข้ามแถวนั้นและรายงาน
+คำตอบแก้ไขในที่เดิม คำตอบที่ไม่มีในไฟล์แล้วจะลบเฉพาะที่ยังไม่มีใครตอบ (QuestionAttempt
+และสถิติอ้างถึงคำตอบ ถ้าลบประวัติของผู้เรียนจะหายไปด้วย)
+
+ไฟล์ถูกอ่านทีละแถว (ใช้ ``ijson`` ถ้าติดตั้งไว้ ไม่อย่างนั้นอ่าน list ชั้นบนสุดทีละ chunk)
+แล้วเขียนทีละ batch ด้วย ``bulk_create(update_conflicts=True)`` เฉพาะแถวที่ใหม่หรือเปลี่ยน
+bulk_create ไม่ส่ง signal จึงต้องล้าง cache / index / snapshot เองหลัง import
+"""
+import codecs
+import json
+import uuid
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_content_version, bump_vocabulary_version
+from .models import Answer, Level, Question, Vocabulary
+from .search import build_search_text, rebuild_fts_table
+from .serializers import used_answer_ids
+from .snapshot import refresh_snapshot
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+BATCH_SIZE = 1000
+READ_SIZE = 64 * 1024
+# namespace ของ uid คำถามที่มาจากไฟล์ คำเดิมได้ uid เดิมทุกครั้ง
+QUESTION_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'ezan:question')
+VOCABULARY_FIELDS = ['word', 'pronunciation', 'thai_translation', 'english_translation', 'category']
+QUESTION_FIELDS = ['word', 'pronunciation']
+ANSWER_COUNT = 4
+
+
+@dataclass
+class ImportReport:
+    """ผลการ import ของ model หนึ่ง"""
+    model: str
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    changes: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def __str__(self):
+        return (f'{self.model}: {self.created} new, {self.updated} changed, '
+                f'{self.unchanged} unchanged, {len(self.errors)} skipped')
+
+
+def iter_array(fp):
+    """อ่าน JSON list ชั้นบนสุดทีละ element โดยไม่โหลดทั้งไฟล์"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # ข้ามช่องว่างและ , ระหว่าง element
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise ValueError('Expected a JSON array')
+            started = True
+            position += 1
+            continue
+        if started and position < len(buffer) and buffer[position] == ']':
+            return
+        if position < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # element ที่จบพอดีปลาย buffer อาจยังไม่ครบ (เช่นตัวเลข) ต้องอ่านต่อก่อน
+                if end < len(buffer) or eof:
+                    yield item
+                    position = end
+                    continue
+        if eof:
+            raise ValueError('Unexpected end of JSON array')
+        chunk = fp.read(READ_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_items(path, prefix):
+    """element ของ list ที่ path ``prefix`` (แบบ ijson เช่น ``'item'``, ``'stages.item'``)"""
+    with open(path, 'rb') as fp:
+        if ijson is not None:
+            yield from ijson.items(fp, prefix, use_float=True)
+            return
+        if prefix == 'item':
+            yield from iter_array(codecs.getreader('utf-8')(fp))
+            return
+        # ไม่มี ijson: list ที่ซ้อนอยู่ใน object ต้องโหลดทั้งไฟล์ (ไฟล์บทเรียนมีขนาดเล็ก)
+        data = json.load(fp)
+        for key in prefix.split('.')[:-1]:
+            data = data[key]
+        yield from data
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def check_length(model, values):
+    """คืนค่าข้อความ error ถ้าค่าว่างหรือยาวเกิน field"""
+    for name, value in values.items():
+        model_field = model._meta.get_field(name)
+        if not value:
+            return f'{name} is empty'
+        if model_field.max_length and len(value) > model_field.max_length:
+            return f'{name} is longer than {model_field.max_length} characters'
+    return None
+
+
+def diff(report, key, old, new):
+    """นับแถวใหม่/เปลี่ยน/เหมือนเดิม คืนค่า True ถ้าต้องเขียน"""
+    if old is None:
+        report.created += 1
+        report.changes.append(f'+ {key}')
+        return True
+    changed = [name for name in new if old.get(name) != new[name]]
+    if not changed:
+        report.unchanged += 1
+        return False
+    report.updated += 1
+    report.changes.append(f'~ {key} ' + ', '.join(f'{name}: {old.get(name)!r} -> {new[name]!r}' for name in changed))
+    return True
+
+
+def import_vocabulary(path, dry_run=False, batch_size=BATCH_SIZE):
+    report = ImportReport('Vocabulary')
+    categories = {choice for choice, _ in Vocabulary.CATEGORY_CHOICES}
+
+    for batch in batched(iter_items(path, 'item'), batch_size):
+        rows = {}
+        for entry in batch:
+            values = {
+                'word': (entry.get('Word') or '').strip(),
+                'pronunciation': (entry.get('Pronunciation') or '').strip(),
+                'thai_translation': (entry.get('Thai') or '').strip(),
+                'english_translation': (entry.get('Eng') or '').strip(),
+                'category': (entry.get('Category') or '').strip(),
+            }
+            key = f"{values['category']}:{values['word']}"
+            error = check_length(Vocabulary, values)
+            if error is None and values['category'] not in categories:
+                error = f"unknown category {values['category']!r}"
+            if error:
+                report.errors.append(f'{key}: {error}')
+                continue
+            rows[key] = values
+
+        existing = {
+            row['source_key']: row
+            for row in Vocabulary.objects.filter(source_key__in=rows).values('source_key', *VOCABULARY_FIELDS)
+        }
+        adopted = adopt_vocabulary(rows, {key for key in rows if key not in existing}, report)
+        objects = []
+        claimed = []
+        for key, values in rows.items():
+            if key in adopted:
+                vocabulary = Vocabulary(id=adopted[key]['id'], source_key=key, **values)
+                vocabulary.search_text = build_search_text(vocabulary)
+                claimed.append(vocabulary)
+                report.updated += 1
+                report.changes.append(f"~ {key} matched existing row {adopted[key]['id']}")
+            elif diff(report, key, existing.get(key), values):
+                vocabulary = Vocabulary(source_key=key, **values)
+                vocabulary.search_text = build_search_text(vocabulary)
+                objects.append(vocabulary)
+
+        if dry_run:
+            continue
+        if claimed:
+            Vocabulary.objects.bulk_update(claimed, ['source_key', *VOCABULARY_FIELDS, 'search_text'])
+        if objects:
+            Vocabulary.objects.bulk_create(
+                objects, update_conflicts=True, unique_fields=['source_key'],
+                update_fields=[*VOCABULARY_FIELDS, 'search_text'],
+            )
+    return report
+
+
+def adopt_vocabulary(rows, missing, report):
+    """คำศัพท์ที่เพิ่มทาง admin (source_key เป็น NULL) ที่ตรงกับแถว ``missing`` ในไฟล์ด้วย category + word
+
+    คืนค่า {key: แถวเดิม} แถวที่ตรงกันมากกว่าหนึ่งแถวถูกลบออกจาก ``rows`` และรายงานเป็น error
+    """
+    if not missing:
+        return {}
+    matches = {}
+    candidates = Vocabulary.objects.filter(
+        source_key__isnull=True,
+        word__in={rows[key]['word'] for key in missing},
+        category__in={rows[key]['category'] for key in missing},
+    ).values('id', 'word', 'category')
+    for row in candidates:
+        key = f"{row['category']}:{row['word']}"
+        if key in missing:
+            matches.setdefault(key, []).append(row)
+
+    adopted = {}
+    for key, found in matches.items():
+        if len(found) == 1:
+            adopted[key] = found[0]
+            continue
+        del rows[key]
+        ids = ', '.join(str(row['id']) for row in found)
+        report.errors.append(f'{key}: matches {len(found)} existing rows ({ids}); merge them first')
+    return adopted
+
+
+def question_uid(word_id):
+    return uuid.uuid5(QUESTION_NAMESPACE, str(word_id))
+
+
+def build_answers(word, level_words, quizzes, translations):
+    """คำตอบของคำถาม: คำแปลที่ถูก + ตัวเลือกผิดจาก quiz ของคำนี้ หรือจากคำอื่นใน level"""
+    answers = [(word['thai'], word['english'], True)]
+    options = []
+    for quiz in quizzes:
+        if quiz.get('correctAnswer') == word['english']:
+            options = [option for option in quiz.get('options', []) if option != word['english']]
+            break
+    if not options:
+        options = [other['english'] for other in level_words if other['english'] != word['english']]
+    for option in options[:ANSWER_COUNT - 1]:
+        answers.append((translations.get(option, option), option, False))
+    return answers
+
+
+def import_lessons(path, dry_run=False, batch_size=BATCH_SIZE):
+    """นำเข้า Level / Question / Answer คืนค่า (report ของ level, question, answer)"""
+    levels = ImportReport('Level')
+    questions = ImportReport('Question')
+    answers = ImportReport('Answer')
+    number = 0
+
+    for stage in iter_items(path, 'stages.item'):
+        level_rows = {}
+        word_rows = []
+        for level in stage.get('levels', []):
+            # เลข level เรียงตามลำดับในไฟล์ต่อกันทุก stage
+            number += 1
+            level_rows[number] = {'name': level.get('name', '')[:100], 'description': stage.get('description')}
+            words = [word for word in level.get('words', []) if word.get('id') and word.get('isan')]
+            translations = {word['english']: word['thai'] for word in words}
+            for word in words:
+                word_rows.append((number, word, build_answers(word, words, level.get('quizzes', []), translations)))
+
+        existing = {
+            row['number']: row
+            for row in Level.objects.filter(number__in=level_rows).values('number', 'name', 'description')
+        }
+        objects = [
+            Level(number=key, **values) for key, values in level_rows.items()
+            if diff(levels, f'level {key}', existing.get(key), values)
+        ]
+        if objects and not dry_run:
+            Level.objects.bulk_create(
+                objects, update_conflicts=True, unique_fields=['number'], update_fields=['name', 'description'],
+            )
+        level_ids = dict(Level.objects.filter(number__in=level_rows).values_list('number', 'id'))
+
+        for batch in batched(word_rows, batch_size):
+            import_questions(batch, level_ids, questions, answers, dry_run)
+    return levels, questions, answers
+
+
+def import_questions(batch, level_ids, questions, answers, dry_run):
+    rows = {}
+    for number, word, answer_rows in batch:
+        values = {'word': word['isan'].strip(), 'pronunciation': (word.get('karaoke') or '').strip()}
+        error = check_length(Question, values)
+        for thai, english, _ in answer_rows:
+            error = error or check_length(Answer, {'thai_text': thai, 'english_text': english})
+        if error:
+            questions.errors.append(f"{word['id']}: {error}")
+            continue
+        # english_text เป็น key ของคำตอบ ตัวเลือกซ้ำใช้ตัวแรก
+        unique_answers = {}
+        for thai, english, is_correct in answer_rows:
+            unique_answers.setdefault(english, (thai, english, is_correct))
+        rows[question_uid(word['id'])] = (word['id'], number, values, sorted(unique_answers.values()))
+
+    existing = {
+        row['uid']: row
+        for row in Question.objects.filter(uid__in=rows).values('uid', 'id', 'level__number', *QUESTION_FIELDS)
+    }
+    adopted = adopt_questions(rows, {uid for uid in rows if uid not in existing}, questions)
+    question_ids = {uid: row['id'] for uid, row in {**existing, **adopted}.items()}
+    existing_answers = {}
+    for row in Answer.objects.filter(question_id__in=question_ids.values()).order_by('id').values_list(
+            'question_id', 'id', 'thai_text', 'english_text', 'is_correct'):
+        existing_answers.setdefault(row[0], []).append(row[1:])
+
+    # คำตอบเดิมที่ไม่มีในไฟล์แล้ว (หรือ english_text ซ้ำ) ลบได้เฉพาะที่ยังไม่มีใครตอบ
+    plans = {}
+    for uid, (word_id, number, values, answer_rows) in rows.items():
+        plans[uid] = plan_answers(existing_answers.get(question_ids.get(uid), []), answer_rows)
+    used = used_answer_ids([answer[0] for plan in plans.values() for answer in plan['extra']])
+
+    changed_questions = []
+    claimed_questions = []
+    changed_answers = []
+    for uid, (word_id, number, values, answer_rows) in rows.items():
+        if uid in adopted:
+            claimed_questions.append(Question(
+                id=adopted[uid]['id'], uid=uid, level_id=level_ids.get(number), updated_at=timezone.now(), **values))
+            questions.updated += 1
+            questions.changes.append(f"~ question {word_id} matched existing question {adopted[uid]['id']}")
+        else:
+            old = existing.get(uid)
+            old_values = None if old is None else {'level': old['level__number'], **old}
+            if diff(questions, f'question {word_id}', old_values, {'level': number, **values}):
+                changed_questions.append(Question(uid=uid, level_id=level_ids.get(number), **values))
+
+        plan = plans[uid]
+        plan['kept'] = [answer for answer in plan['extra'] if answer[0] in used]
+        plan['deleted'] = [answer[0] for answer in plan['extra'] if answer[0] not in used]
+        old_answers = sorted(answer[1:] for answer in plan['matched'] + plan['extra'] if answer[0] not in used)
+        label = f'answers of {word_id}'
+        if plan['kept']:
+            label += ' (kept answered: ' + ', '.join(repr(answer[2]) for answer in plan['kept']) + ')'
+        if diff(answers, label, {'answers': old_answers} if old_answers else None, {'answers': answer_rows}):
+            changed_answers.append((uid, plan))
+
+    if dry_run:
+        return
+    if claimed_questions:
+        Question.objects.bulk_update(claimed_questions, ['uid', *QUESTION_FIELDS, 'level', 'updated_at'])
+    if changed_questions:
+        Question.objects.bulk_create(
+            changed_questions, update_conflicts=True, unique_fields=['uid'],
+            update_fields=[*QUESTION_FIELDS, 'level', 'updated_at'],
+        )
+    if changed_answers:
+        if any(uid not in question_ids for uid, _ in changed_answers):
+            question_ids = dict(
+                Question.objects.filter(uid__in=[uid for uid, _ in changed_answers]).values_list('uid', 'id'))
+        deleted = [answer_id for _, plan in changed_answers for answer_id in plan['deleted']]
+        if deleted:
+            Answer.objects.filter(id__in=deleted).delete()
+        Answer.objects.bulk_update([
+            Answer(id=answer_id, thai_text=thai, english_text=english, is_correct=is_correct)
+            for _, plan in changed_answers
+            for answer_id, thai, english, is_correct in plan['updated']
+        ], ['thai_text', 'is_correct'], batch_size=BATCH_SIZE)
+        Answer.objects.bulk_create([
+            Answer(question_id=question_ids[uid], thai_text=thai, english_text=english, is_correct=is_correct)
+            for uid, plan in changed_answers
+            for thai, english, is_correct in plan['created']
+        ], batch_size=BATCH_SIZE)
+
+
+def adopt_questions(rows, missing, report):
+    """คำถามที่เพิ่มทาง admin (uid สุ่ม) ที่ตรงกับคำ ``missing`` ในไฟล์ด้วย word + pronunciation + level
+
+    คืนค่า {uid ของไฟล์: แถวเดิม} คำที่ตรงกันมากกว่าหนึ่งข้อถูกลบออกจาก ``rows`` และรายงานเป็น error
+    """
+    if not missing:
+        return {}
+    keys = {}
+    for uid in missing:
+        _, number, values, _ = rows[uid]
+        keys[(values['word'], values['pronunciation'], number)] = uid
+    matches = {}
+    candidates = Question.objects.filter(
+        word__in={key[0] for key in keys}, level__number__in={key[2] for key in keys},
+    ).exclude(uid__in=rows).values('uid', 'id', 'level__number', *QUESTION_FIELDS)
+    for row in candidates:
+        uid = keys.get((row['word'], row['pronunciation'], row['level__number']))
+        if uid is not None:
+            matches.setdefault(uid, []).append(row)
+
+    adopted = {}
+    for uid, found in matches.items():
+        if len(found) == 1:
+            adopted[uid] = found[0]
+            continue
+        word_id = rows.pop(uid)[0]
+        ids = ', '.join(str(row['id']) for row in found)
+        report.errors.append(f'{word_id}: matches {len(found)} existing questions ({ids}); merge them first')
+    return adopted
+
+
+def plan_answers(old_answers, answer_rows):
+    """จับคู่คำตอบเดิม (id, thai, english, is_correct) กับคำตอบในไฟล์ด้วย english_text"""
+    by_english = {}
+    extra = []
+    for answer in old_answers:
+        if answer[2] in by_english:
+            extra.append(answer)
+        else:
+            by_english[answer[2]] = answer
+    plan = {'matched': [], 'updated': [], 'created': [], 'extra': extra}
+    for thai, english, is_correct in answer_rows:
+        old = by_english.pop(english, None)
+        if old is None:
+            plan['created'].append((thai, english, is_correct))
+            continue
+        plan['matched'].append(old)
+        if old[1:] != (thai, english, is_correct):
+            plan['updated'].append((old[0], thai, english, is_correct))
+    plan['extra'].extend(by_english.values())
+    return plan
+
+
+def import_content(vocabulary_path=None, lessons_path=None, dry_run=False, batch_size=BATCH_SIZE):
+    """นำเข้าทั้งสองไฟล์ใน transaction เดียว คืนค่า list ของ ImportReport"""
+    reports = []
+    with transaction.atomic():
+        if vocabulary_path:
+            reports.append(import_vocabulary(vocabulary_path, dry_run, batch_size))
+        if lessons_path:
+            reports.extend(import_lessons(lessons_path, dry_run, batch_size))
+        if dry_run:
+            return reports
+
+        written = {report.model for report in reports if report.created or report.updated}
+        if 'Vocabulary' in written:
+            rebuild_fts_table()
+            transaction.on_commit(bump_vocabulary_version)
+            transaction.on_commit(refresh_snapshot)
+        if written & {'Level', 'Question', 'Answer'}:
+            transaction.on_commit(bump_content_version)
+    return reports
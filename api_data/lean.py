@@ -0,0 +1,103 @@
+"""Serializer แบบเบาสำหรับ endpoint ที่อ่านบ่อย (``/api/vocabulary/`` และ ``/api/questions/level/<id>/``)
+
+อ่านแถวด้วย ``values_list()`` แทนการสร้าง model instance และ ModelSerializer ทีละแถว
+ผลลัพธ์ต้องเหมือน ``VocabularySerializer`` / ``QuestionSerializer`` ทุก field
+URL เต็มของไฟล์เสียงต่อจาก prefix ที่คำนวณครั้งเดียวต่อ request
+(``request.build_absolute_uri(MEDIA_URL)``) แทน ``build_absolute_uri`` ทุกแถว
+
+ปิดได้ด้วย ``LEAN_SERIALIZERS = False`` (กลับไปใช้ serializer ของ DRF)
+"""
+from django.conf import settings
+from django.utils.encoding import filepath_to_uri
+
+from .models import Answer, Question, Vocabulary
+
+VOCABULARY_FIELDS = ['id', 'word', 'pronunciation', 'thai_translation', 'english_translation', 'category',
+                     'sound_file', 'sound_duration']
+QUESTION_FIELDS = ['id', 'word', 'pronunciation', 'sound_file', 'sound_duration', 'level_id', 'level__name',
+                   'level__number', 'level__description', 'level__sound_sprite', 'level__sound_sprite_map']
+ANSWER_FIELDS = ['question_id', 'id', 'thai_text', 'english_text', 'is_correct']
+
+
+def lean_enabled():
+    return getattr(settings, 'LEAN_SERIALIZERS', True)
+
+
+class MediaURL:
+    """URL เต็มของไฟล์ใน MEDIA_ROOT แบบเดียวกับ FileField.url + build_absolute_uri"""
+
+    def __init__(self, request=None):
+        self.prefix = request.build_absolute_uri(settings.MEDIA_URL) if request is not None else settings.MEDIA_URL
+
+    def __call__(self, name):
+        if not name:
+            return None
+        return self.prefix + filepath_to_uri(name).lstrip('/')
+
+
+class LeanVocabularySerializer:
+    def __init__(self, request=None):
+        self.media_url = MediaURL(request)
+
+    def rows(self, queryset=None):
+        """values_list ของ queryset คำศัพท์ (ใช้ filter และ ordering ของ queryset เดิม)"""
+        if queryset is None:
+            queryset = Vocabulary.objects.all()
+        return queryset.values_list(*VOCABULARY_FIELDS)
+
+    def to_representation(self, rows):
+        media_url = self.media_url
+        data = []
+        for pk, word, pronunciation, thai, english, category, sound_file, duration in rows:
+            url = media_url(sound_file)
+            data.append({
+                'id': pk, 'word': word, 'pronunciation': pronunciation, 'thai_translation': thai,
+                'english_translation': english, 'category': category, 'sound_file': url,
+                'sound_file_url': url, 'sound_duration': duration,
+            })
+        return data
+
+    def data(self, queryset=None):
+        return self.to_representation(self.rows(queryset))
+
+
+class LeanQuestionSerializer:
+    """ชุดคำถามของ level: คำถาม (join level) หนึ่ง query และคำตอบอีกหนึ่ง query"""
+
+    def __init__(self, request=None):
+        self.media_url = MediaURL(request)
+
+    def rows(self, level_id):
+        return Question.objects.filter(level=level_id).order_by('id').values_list(*QUESTION_FIELDS)
+
+    def answer_rows(self, question_ids):
+        return Answer.objects.filter(question_id__in=question_ids).order_by('question_id', 'id').values_list(
+            *ANSWER_FIELDS)
+
+    def to_representation(self, rows, answer_rows):
+        answers = {}
+        for question_id, pk, thai, english, is_correct in answer_rows:
+            answers.setdefault(question_id, []).append(
+                {'id': pk, 'thai_text': thai, 'english_text': english, 'is_correct': is_correct})
+
+        media_url = self.media_url
+        levels = {}
+        data = []
+        for pk, word, pronunciation, sound_file, duration, level_id, *level in rows:
+            if level_id is not None and level_id not in levels:
+                name, number, description, sprite, _ = level
+                levels[level_id] = {'id': level_id, 'name': name, 'number': number, 'description': description,
+                                    'sound_sprite_url': media_url(sprite)}
+            url = media_url(sound_file)
+            data.append({
+                'id': pk, 'word': word, 'pronunciation': pronunciation, 'sound_file': url,
+                'sound_file_url': url, 'sound_duration': duration,
+                'sound_sprite': level[4].get(str(pk)) if level_id is not None else None,
+                'level': level_id, 'level_details': levels.get(level_id),
+                'answers': answers.get(pk, []),
+            })
+        return data
+
+    def data(self, level_id):
+        rows = list(self.rows(level_id))
+        return self.to_representation(rows, self.answer_rows([row[0] for row in rows]))
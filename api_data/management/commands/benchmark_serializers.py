@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api_data.lean import LeanQuestionSerializer, LeanVocabularySerializer
+from api_data.models import Level, Question, Vocabulary
+from api_data.renderers import FastJSONRenderer, orjson
+from api_data.serializers import QuestionSerializer, VocabularySerializer
+
+
+class Command(BaseCommand):
+    help = ('Compare rows/s of ModelSerializer + JSONRenderer against the values_list() serializers + '
+            'orjson for the /api/vocabulary/ and /api/questions/level/<id>/ payloads (query, serialize, render)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--level', type=int, help='Level number for the question bundle (default: largest level)')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per variant; the best run is reported')
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/api/', SERVER_NAME='localhost')
+        levels = Level.objects.annotate(question_count=Count('questions'))
+        if options['level'] is not None:
+            level = levels.filter(number=options['level']).first()
+            if level is None:
+                raise CommandError(f'Level {options["level"]} does not exist')
+        else:
+            level = levels.order_by('-question_count').first()
+
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed: FastJSONRenderer falls back to json'))
+
+        def drf_vocabulary():
+            data = VocabularySerializer(Vocabulary.objects.all(), many=True, context={'request': request}).data
+            return len(data), JSONRenderer().render(data)
+
+        def lean_vocabulary():
+            data = LeanVocabularySerializer(request).data(Vocabulary.objects.all())
+            return len(data), FastJSONRenderer().render(data)
+
+        self.compare('/api/vocabulary/', drf_vocabulary, lean_vocabulary, options['repeat'])
+        if level is None:
+            return
+
+        def drf_questions():
+            queryset = (Question.objects.filter(level=level).select_related('level')
+                        .prefetch_related('answers').order_by('id'))
+            data = QuestionSerializer(queryset, many=True, context={'request': request}).data
+            return len(data), JSONRenderer().render(data)
+
+        def lean_questions():
+            data = LeanQuestionSerializer(request).data(level.id)
+            return len(data), FastJSONRenderer().render(data)
+
+        self.compare(f'/api/questions/level/{level.id}/', drf_questions, lean_questions, options['repeat'])
+
+    def compare(self, label, drf_variant, lean_variant, repeat):
+        results = []
+        for variant in (drf_variant, lean_variant):
+            best = None
+            for _ in range(max(repeat, 1)):
+                started = time.perf_counter()
+                rows, body = variant()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results.append((rows, len(body), best))
+
+        (rows, size, drf), (_, lean_size, lean) = results
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{label} ({rows} rows, {size} bytes)'))
+        if rows == 0:
+            self.stdout.write('  no rows')
+            return
+        self.stdout.write(f'  ModelSerializer + JSONRenderer  {rows / drf:10.0f} rows/s  {drf * 1000:8.2f} ms')
+        self.stdout.write(f'  values_list + orjson            {rows / lean:10.0f} rows/s  {lean * 1000:8.2f} ms'
+                          f'  ({drf / lean:.1f}x)')
+        if lean_size != size:
+            self.stdout.write(self.style.WARNING(f'  payload size differs: {lean_size} vs {size} bytes'))
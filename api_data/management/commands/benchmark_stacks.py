@@ -0,0 +1,168 @@
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from importlib import import_module
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api_data.models import Level
+
+STACKS = {
+    # gunicorn sync workers + WSGI: the current Procfile
+    'wsgi': ('gunicorn', ['ezan_project.wsgi', '--worker-class', 'sync'], 'False'),
+    # uvicorn + ASGI with the async read views: Procfile.asgi
+    'asgi': ('uvicorn', ['ezan_project.asgi:application', '--no-access-log', '--log-level', 'warning'], 'True'),
+}
+STARTUP_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Serve the app with gunicorn (sync/WSGI) and uvicorn (async/ASGI) in turn, '
+            'load the read endpoints with the same client and compare req/s and p50/p99 latency')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username the requests are authenticated as')
+        parser.add_argument('--stacks', default='wsgi,asgi', help='Comma separated: wsgi, asgi')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and stack')
+        parser.add_argument('--concurrency', type=int, default=16, help='Client connections in parallel')
+        parser.add_argument('--workers', type=int, default=1, help='Server worker processes for each stack')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Endpoint to load (repeatable); defaults to the four async read endpoints')
+
+    def handle(self, *args, **options):
+        stacks = [name.strip() for name in options['stacks'].split(',') if name.strip()]
+        for name in stacks:
+            if name not in STACKS:
+                raise CommandError(f'Unknown stack {name!r}')
+            if find_spec(STACKS[name][0]) is None:
+                raise CommandError(f'{STACKS[name][0]} is not installed')
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]!r} does not exist')
+
+        paths = options['paths'] or self.default_paths()
+        session = self.login(user)
+        headers = {
+            'Host': 'localhost',
+            'Cookie': f'{settings.SESSION_COOKIE_NAME}={session.session_key}',
+            'X-Requested-With': 'XMLHttpRequest',
+        }
+        try:
+            for name in stacks:
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{name}: {options["workers"]} worker(s), {options["concurrency"]} connections'))
+                with self.serve(name, options['workers']) as port:
+                    for path in paths:
+                        self.stdout.write('  ' + self.load(port, path, headers, options['requests'],
+                                                           options['concurrency']))
+        finally:
+            session.delete()
+
+    def default_paths(self):
+        level = Level.objects.order_by('number').values_list('id', flat=True).first()
+        paths = ['/api/levels/', '/api/vocabulary/', '/api/progress/user_levels/']
+        if level is not None:
+            paths.insert(1, f'/api/questions/level/{level}/')
+        return paths
+
+    def login(self, user):
+        """A session for the user, as the login view would create (deleted afterwards)"""
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session
+
+    @contextmanager
+    def serve(self, name, workers):
+        """Run one stack on a free port until the block exits; yields the port"""
+        module, arguments, async_views = STACKS[name]
+        port = free_port()
+        bind = ['--bind', f'127.0.0.1:{port}'] if module == 'gunicorn' else ['--host', '127.0.0.1', '--port', str(port)]
+        process = subprocess.Popen(
+            [sys.executable, '-m', module, *arguments, *bind, '--workers', str(workers)],
+            env={**os.environ, 'ASYNC_VIEWS': async_views},
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        try:
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            while True:
+                if process.poll() is not None:
+                    raise CommandError(f'{module} exited: {process.stderr.read().decode()[-2000:]}')
+                try:
+                    socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise CommandError(f'{module} did not start within {STARTUP_TIMEOUT}s')
+                    time.sleep(0.2)
+            yield port
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def load(self, port, path, headers, total, concurrency):
+        local = threading.local()
+        latencies = []
+        errors = []
+
+        def fetch(_):
+            connection = getattr(local, 'connection', None)
+            if connection is None:
+                connection = local.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as exc:
+                connection.close()
+                errors.append(type(exc).__name__)
+                return
+            if status != 200:
+                errors.append(str(status))
+                return
+            latencies.append(time.perf_counter() - started)
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            # Warm up caches and connections before timing
+            list(pool.map(fetch, range(concurrency)))
+            latencies.clear()
+            errors.clear()
+            started = time.perf_counter()
+            list(pool.map(fetch, range(total)))
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        line = (f'{path:<34} {len(latencies) / elapsed:8.1f} req/s   '
+                f'p50 {percentile(latencies, 0.5) * 1000:7.1f} ms   p99 {percentile(latencies, 0.99) * 1000:7.1f} ms')
+        if errors:
+            line += f'   {len(errors)} failed ({", ".join(sorted(set(errors)))})'
+        return line
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api_data.audio import processing_available
+from api_data.models import Level
+from api_data.sprites import build_level_sprite
+
+
+class Command(BaseCommand):
+    help = 'Concatenate the question sounds of each level into one audio sprite with an offset map'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--level', type=int, help='Only build the sprite for this level number')
+
+    def handle(self, *args, **options):
+        if not processing_available():
+            raise CommandError('ffmpeg/ffprobe not found or AUDIO_PROCESSING is disabled')
+
+        levels = Level.objects.order_by('number')
+        if options['level'] is not None:
+            levels = levels.filter(number=options['level'])
+            if not levels.exists():
+                raise CommandError(f'Level {options["level"]} does not exist')
+
+        for level in levels:
+            sprite_map = build_level_sprite(level.id)
+            self.stdout.write(f'Level {level.number}: {len(sprite_map or {})} clips')
+        self.stdout.write(self.style.SUCCESS('Sound sprites built'))
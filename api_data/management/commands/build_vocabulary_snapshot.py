@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api_data.snapshot import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write the content-hashed vocabulary snapshot served by /api/vocabulary/snapshot/'
+
+    def handle(self, *args, **options):
+        manifest = refresh_snapshot()
+        if manifest is None:
+            raise CommandError('Could not write the vocabulary snapshot, see the log for details')
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {manifest['version']} with {manifest['count']} words: {manifest['url']}"
+        ))
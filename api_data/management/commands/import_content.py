@@ -0,0 +1,52 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api_data.importer import BATCH_SIZE, import_content
+
+DATA_DIR = Path(settings.BASE_DIR) / 'static' / 'data'
+
+
+class Command(BaseCommand):
+    help = 'Bulk upsert Vocabulary, Level, Question and Answer rows from the JSON files in static/data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vocabulary', default=str(DATA_DIR / 'ezan_words.json'),
+                            help='Word list for Vocabulary (default: static/data/ezan_words.json)')
+        parser.add_argument('--lessons', default=str(DATA_DIR / 'vocabulary.json'),
+                            help='Stages/levels/words file for Level, Question and Answer '
+                                 '(default: static/data/vocabulary.json)')
+        parser.add_argument('--only', choices=['vocabulary', 'lessons'],
+                            help='Only import one of the two files')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without writing anything')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        vocabulary_path = options['vocabulary'] if options['only'] != 'lessons' else None
+        lessons_path = options['lessons'] if options['only'] != 'vocabulary' else None
+        for path in filter(None, [vocabulary_path, lessons_path]):
+            if not Path(path).is_file():
+                raise CommandError(f'{path} does not exist')
+
+        started = time.monotonic()
+        try:
+            reports = import_content(vocabulary_path, lessons_path, options['dry_run'], max(options['batch_size'], 1))
+        except ValueError as error:
+            raise CommandError(f'Could not parse input: {error}')
+
+        for report in reports:
+            if options['verbosity'] >= 2:
+                for change in report.changes:
+                    self.stdout.write(f'  {change}')
+            for error in report.errors:
+                self.stderr.write(f'  skipped {error}')
+            self.stdout.write(str(report))
+
+        elapsed = time.monotonic() - started
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run, nothing written ({elapsed:.2f}s)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Import finished in {elapsed:.2f}s'))
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api_data.audio import SOUND_MODELS, needs_processing, processing_available, run_job
+
+
+class Command(BaseCommand):
+    help = 'Transcode and loudness-normalize sound files that have not been processed yet, in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=['question', 'vocabulary'],
+                            help='Only process one model (default: both)')
+        parser.add_argument('--force', action='store_true',
+                            help='Reprocess files that were already processed')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'AUDIO_WORKERS', 2),
+                            help='Number of parallel ffmpeg processes')
+
+    def handle(self, *args, **options):
+        if not processing_available():
+            raise CommandError('ffmpeg/ffprobe not found or AUDIO_PROCESSING is disabled')
+
+        jobs = []
+        for label in SOUND_MODELS:
+            model = apps.get_model(label)
+            if options['model'] and model._meta.model_name != options['model']:
+                continue
+            for instance in model.objects.exclude(sound_file='').exclude(sound_file__isnull=True):
+                if options['force'] or needs_processing(instance):
+                    jobs.append((label, instance.pk))
+
+        self.stdout.write(f'Processing {len(jobs)} sound files with {options["workers"]} workers')
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as pool:
+            results = list(pool.map(lambda job: run_job(*job, force=options['force']), jobs))
+
+        failed = results.count(None)
+        self.stdout.write(self.style.SUCCESS(f'Processed {results.count(True)} files, {failed} failed'))
+        if failed:
+            raise CommandError(f'{failed} files could not be processed, see the log for details')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api_data.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Recompute normalized vocabulary search text and rebuild the search index'
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} vocabulary entries'))
@@ -0,0 +1,159 @@
+"""ส่งไฟล์เสียงใน MEDIA_ROOT แทน ``django.views.static.serve``
+
+- รองรับ ``Range`` (byte range เดียว) ให้ <audio> บนมือถือ seek ได้ และ ``If-Range``
+- ETag / Last-Modified ตอบ 304 เมื่อ client มีไฟล์อยู่แล้ว
+- ชื่อไฟล์ที่มี hash ของเนื้อหา (เช่น snapshot) cache ได้ 1 ปีแบบ immutable
+  ไฟล์อื่น cache ตาม ``MEDIA_CACHE_MAX_AGE`` แล้วตรวจซ้ำด้วย ETag
+- ถ้าตั้ง ``MEDIA_ACCEL_REDIRECT`` ไว้ จะให้ nginx (X-Accel-Redirect) หรือ
+  Apache/lighttpd (X-Sendfile) เป็นคนส่งไฟล์ Django แค่ตรวจ path และใส่ header
+- ใต้ ASGI อ่านไฟล์ทีละ ``BLOCK_SIZE`` ผ่าน async iterator (ดู api_data/streaming.py)
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .streaming import stream_for
+
+MEDIA_PREFIXES = ('question_sounds/', 'vocabulary_sounds/', 'snapshots/', 'level_sprites/')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# hash ฐาน 16 อย่างน้อย 12 ตัวในชื่อไฟล์ เช่น vocabulary-6f6f15ceb1db0726.json.gz
+CONTENT_HASH_RE = re.compile(r'[-_.][0-9a-f]{12,64}\.')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+
+
+class RangeFile:
+    """อ่านไฟล์เฉพาะช่วง [start, start + length) สำหรับ FileResponse"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """แปลง Range header เป็น (start, end) แบบรวมปลาย
+
+    คืนค่า None ถ้าไม่มีหรืออ่านไม่ได้ (ส่งทั้งไฟล์ตามปกติ)
+    และ False ถ้าช่วงอยู่นอกไฟล์ (416)
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        # bytes=-500 คือ 500 byte สุดท้าย
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def cache_max_age(path):
+    if CONTENT_HASH_RE.search(os.path.basename(path)):
+        return IMMUTABLE_MAX_AGE, True
+    return getattr(settings, 'MEDIA_CACHE_MAX_AGE', 60 * 60 * 24), False
+
+
+@require_safe
+def serve_media(request, path):
+    path = posixpath.normpath(path).lstrip('/')
+    if not path.startswith(MEDIA_PREFIXES):
+        raise Http404("File not found")
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+    try:
+        stat = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("File not found")
+    if not os.path.isfile(fullpath):
+        raise Http404("File not found")
+
+    size = stat.st_size
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    last_modified = int(stat.st_mtime)
+    max_age, immutable = cache_max_age(path)
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        patch_cache_control(response, public=True, max_age=max_age)
+        if immutable:
+            patch_cache_control(response, immutable=True)
+        return response
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return finish(conditional)
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    accel = getattr(settings, 'MEDIA_ACCEL_REDIRECT', None)
+    if accel:
+        # front proxy ส่งไฟล์เอง (รวมถึง Range)
+        response = HttpResponse(content_type=content_type)
+        if accel == 'nginx':
+            prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(path)
+        else:
+            response['X-Sendfile'] = fullpath
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return finish(response)
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if byte_range is not None and request.headers.get('If-Range'):
+        # ไฟล์เปลี่ยนไปแล้วตั้งแต่ client โหลดส่วนแรก ต้องส่งทั้งไฟล์ใหม่
+        if_range = request.headers['If-Range']
+        if if_range != etag and parse_http_date_safe(if_range) != last_modified:
+            byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return finish(response)
+
+    if byte_range is None:
+        response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(open(fullpath, 'rb'), start, end - start + 1),
+                                status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response.block_size = BLOCK_SIZE
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return finish(stream_for(request, response))
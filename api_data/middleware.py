@@ -1,20 +1,84 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.http import HttpResponseForbidden
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from social_django.middleware import SocialAuthExceptionMiddleware as BaseSocialAuthExceptionMiddleware
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+# middleware ทุกตัวต้องรองรับ async ไม่อย่างนั้นเมื่อรันแบบ ASGI Django จะต้องสลับไปรันใน
+# thread เดียวกันทุก request และ view แบบ async จะไม่ได้ประโยชน์ (ดู ezan_project/asgi.py)
+
 
 class APIAccessMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def is_denied(self, request, user):
+        # ตรวจสอบว่าเป็น AJAX request หรือไม่
+        is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        # ตรวจสอบว่าเป็น admin หรือไม่
+        is_admin = user.is_authenticated and (user.is_staff or user.is_superuser)
+        # ถ้าไม่ใช่ AJAX request และไม่ใช่ admin ให้ปฏิเสธการเข้าถึง
+        return not is_ajax and not is_admin
+
+    def finish(self, response):
+        # response ของ API ขึ้นกับ X-Requested-With (403 หรือไม่) cache ต้องแยกตาม header นี้
+        patch_vary_headers(response, ['X-Requested-With'])
+        return response
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         # ตรวจสอบเฉพาะ request ที่เข้าถึง API
-        if request.path.startswith('/api/'):
-            # ตรวจสอบว่าเป็น AJAX request หรือไม่
-            is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
-            # ตรวจสอบว่าเป็น admin หรือไม่
-            is_admin = request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser)
-            
-            # ถ้าไม่ใช่ AJAX request และไม่ใช่ admin ให้ปฏิเสธการเข้าถึง
-            if not is_ajax and not is_admin:
-                from django.http import HttpResponseForbidden
-                return HttpResponseForbidden("The API is accessible only from JavaScript or only.")
-        
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+        if not request.path.startswith('/api/'):
+            return self.get_response(request)
+        if self.is_denied(request, request.user):
+            return self.finish(HttpResponseForbidden("The API is accessible only from JavaScript or only."))
+        return self.finish(self.get_response(request))
+
+    async def __acall__(self, request):
+        if not request.path.startswith('/api/'):
+            return await self.get_response(request)
+        if self.is_denied(request, await request.auser()):
+            return self.finish(HttpResponseForbidden("The API is accessible only from JavaScript or only."))
+        return self.finish(await self.get_response(request))
+
+
+class SocialAuthExceptionMiddleware(BaseSocialAuthExceptionMiddleware, MiddlewareMixin):
+    """SocialAuthExceptionMiddleware ของ social_django ที่รองรับ async (มีแค่ process_exception)"""
+
+    def __init__(self, get_response):
+        MiddlewareMixin.__init__(self, get_response)
+
+    def __call__(self, request):
+        return MiddlewareMixin.__call__(self, request)
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """WhiteNoise ที่รองรับ async: หาไฟล์จาก dict ในหน่วยความจำ เปิดไฟล์ใน thread"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data', '0002_vocabulary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='score',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+from api_data.search import FTS_TABLE, build_search_text, create_search_index, drop_search_index
+
+
+def fill_search_text(apps, schema_editor):
+    Vocabulary = apps.get_model('api_data', 'Vocabulary')
+    vocabularies = list(Vocabulary.objects.all())
+    for vocabulary in vocabularies:
+        vocabulary.search_text = build_search_text(vocabulary)
+    Vocabulary.objects.bulk_update(vocabularies, ['search_text'], batch_size=500)
+
+
+def add_search_index(apps, schema_editor):
+    create_search_index(schema_editor)
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, search_text) SELECT id, search_text FROM api_data_vocabulary'
+        )
+
+
+def remove_search_index(apps, schema_editor):
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data', '0003_score_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vocabulary',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data', '0004_vocabulary_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['-created_at', '-id'], name='score_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='vocabulary',
+            index=models.Index(fields=['category', 'word', 'id'], name='vocabulary_category_word_id'),
+        ),
+    ]
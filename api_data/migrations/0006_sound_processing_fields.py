@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='sound_duration',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='sound_processed_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='sound_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='vocabulary',
+            name='sound_duration',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='ความยาวเสียง (วินาที)'),
+        ),
+        migrations.AddField(
+            model_name='vocabulary',
+            name='sound_processed_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='vocabulary',
+            name='sound_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='ขนาดไฟล์เสียง (byte)'),
+        ),
+    ]
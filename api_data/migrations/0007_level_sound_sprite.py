@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data', '0006_sound_processing_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='level',
+            name='sound_sprite',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='level_sprites/'),
+        ),
+        migrations.AddField(
+            model_name='level',
+            name='sound_sprite_map',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data', '0008_vocabulary_source_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['level', '-score'], name='score_level_score'),
+        ),
+    ]
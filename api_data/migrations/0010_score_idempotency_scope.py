@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data', '0009_score_level_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='score',
+            name='idempotency_scope',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='score',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='score',
+            constraint=models.UniqueConstraint(fields=('idempotency_scope', 'idempotency_key'), name='score_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+from rest_framework import serializers
+
+from .cache import get_content_version
+from .conditional import add_validators, content_validators, not_modified
+
+
+def parse_field_list(value):
+    """แปลง 'a,b, c' เป็น set ของชื่อ field (คืนค่า None ถ้าไม่ได้ระบุ)"""
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class DynamicFieldsMixin:
+    """Serializer ที่รองรับ ?fields= และ ?expand=
+
+    - field ใน ``expandable_fields`` จะถูกส่งกลับเฉพาะเมื่อระบุใน ``expand``
+    - ``fields`` จำกัด field ของ serializer ชั้นนอกสุดเท่านั้น
+    ค่าทั้งสองอ่านจาก serializer context (ดู SparseFieldsMixin)
+    """
+    expandable_fields = []
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.context.get('expand') or set()
+        for name in self.expandable_fields:
+            if name not in expand:
+                fields.pop(name, None)
+
+        requested = self.context.get('fields')
+        if requested and self.is_root_serializer():
+            for name in list(fields):
+                if name not in requested:
+                    fields.pop(name)
+        return fields
+
+    def is_root_serializer(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+
+class SparseFieldsMixin:
+    """ViewSet ที่ส่ง ?fields= และ ?expand= ต่อให้ serializer และใช้เลือก prefetch ให้พอดีกับ field ที่ขอ"""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = parse_field_list(self.request.query_params.get('fields'))
+        context['expand'] = parse_field_list(self.request.query_params.get('expand')) or set()
+        return context
+
+    def wants_field(self, name):
+        """field ชั้นนอกสุดนี้จะอยู่ใน response หรือไม่ (ตาม ?fields=)"""
+        fields = parse_field_list(self.request.query_params.get('fields'))
+        return fields is None or name in fields
+
+    def expanded(self, name):
+        """field นี้ถูกขอผ่าน ?expand= หรือไม่"""
+        return name in (parse_field_list(self.request.query_params.get('expand')) or set())
+
+
+class ConditionalGetMixin:
+    """ViewSet ที่ตอบ list/retrieve ด้วย ETag/Last-Modified จาก version ของเนื้อหา (ดู api_data/conditional.py)
+
+    ถ้า client มี response เดิมอยู่แล้วจะตอบ 304 ทันทีหลังตรวจสิทธิ์ ไม่ query และไม่ serialize
+    """
+
+    def get_content_version(self):
+        return get_content_version()
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = content_validators(request, self.get_content_version(), request.accepted_renderer.format)
+        response = not_modified(request, etag, last_modified) or handler(request, *args, **kwargs)
+        # รูปแบบ response (JSON / browsable API) เลือกจาก Accept
+        return add_validators(response, etag, last_modified, vary=['Accept'])
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
@@ -1,10 +1,14 @@
 from django.db import models
 import uuid
+from .search import build_search_text
 
 class Level(models.Model):
     name = models.CharField(max_length=100)
     number = models.IntegerField(unique=True)
     description = models.TextField(blank=True,null=True)
+    # เสียงของทุกคำถามใน level รวมเป็นไฟล์เดียว และช่วงเวลา {question_id: [start, end]} (ดู api_data/sprites.py)
+    sound_sprite = models.FileField(upload_to='level_sprites/', null=True, blank=True, editable=False)
+    sound_sprite_map = models.JSONField(default=dict, blank=True, editable=False)
     def __str__(self):
         return f"Level {self.number}: {self.name}"
     class Meta: 
@@ -15,6 +19,10 @@ class Question(models.Model):
     word = models.CharField(max_length=100)
     pronunciation = models.CharField(max_length=100)
     sound_file = models.FileField(upload_to='question_sounds/', null=True, blank=True)
+    # เติมโดย api_data/audio.py หลังแปลงไฟล์เสียง
+    sound_duration = models.FloatField(null=True, blank=True, editable=False)
+    sound_size = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    sound_processed_name = models.CharField(max_length=255, blank=True, default='', editable=False)
     level = models.ForeignKey(
         Level, 
         on_delete=models.CASCADE, 
@@ -42,8 +50,22 @@ class Score(models.Model):
     score = models.IntegerField()
     max_score = models.IntegerField()
     level = models.ForeignKey(Level, on_delete=models.CASCADE, related_name='scores')
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    # เจ้าของ idempotency_key ("user:<id>") client อื่นใช้ key ซ้ำก็ไม่ได้ Score ของคนอื่น
+    idempotency_scope = models.CharField(max_length=64, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['idempotency_scope', 'idempotency_key'], name='score_idempotency_key'),
+        ]
+        indexes = [
+            # keyset pagination ของ /api/scores/ (ดู ScorePagination)
+            models.Index(fields=['-created_at', '-id'], name='score_created_id'),
+            # คะแนนสูงสุดต่อ level (rebuild_leaderboard)
+            models.Index(fields=['level', '-score'], name='score_level_score'),
+        ]
+
     def __str__(self):
         return f"{self.player_name} - {self.score}/{self.max_score}"
 
@@ -70,11 +92,29 @@ class Vocabulary(models.Model):
     english_translation = models.CharField(max_length=100, verbose_name="คำแปลภาษาอังกฤษ")
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, verbose_name="หมวดหมู่")
     sound_file = models.FileField(upload_to='vocabulary_sounds/', null=True, blank=True, verbose_name="ไฟล์เสียง")
+    sound_duration = models.FloatField(null=True, blank=True, editable=False, verbose_name="ความยาวเสียง (วินาที)")
+    sound_size = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="ขนาดไฟล์เสียง (byte)")
+    sound_processed_name = models.CharField(max_length=255, blank=True, default='', editable=False)
+    # key ของแถวในไฟล์ข้อมูล ใช้ upsert ตอน import (ดู api_data/importer.py) แถวที่เพิ่มทาง admin เป็น NULL
+    source_key = models.CharField(max_length=150, unique=True, null=True, blank=True, editable=False)
+    # ข้อความจากทุก field ที่ normalize แล้ว ใช้ค้นหา (ดู api_data/search.py)
+    search_text = models.TextField(blank=True, default='', editable=False)
     
     def __str__(self):
         return f"{self.word} ({self.category})"
+
+    def save(self, *args, **kwargs):
+        self.search_text = build_search_text(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
+        super().save(*args, **kwargs)
     
     class Meta:
         verbose_name = "คำศัพท์"
         verbose_name_plural = "คำศัพท์"
-        ordering = ['category', 'word']
\ No newline at end of file
+        ordering = ['category', 'word']
+        indexes = [
+            # keyset pagination ของ /api/vocabulary/ (ดู VocabularyPagination)
+            models.Index(fields=['category', 'word', 'id'], name='vocabulary_category_word_id'),
+        ]
\ No newline at end of file
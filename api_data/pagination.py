@@ -0,0 +1,157 @@
+"""Keyset (cursor) pagination
+
+ต่างจาก CursorPagination ของ DRF ที่จำตำแหน่งด้วย field แรกของ ordering
+อย่างเดียว (แถวที่ค่าซ้ำกันต้องใช้ offset) ที่นี่ cursor เก็บค่าของทุก field
+ใน ordering ของแถวสุดท้าย หน้าถัดไปจึงเป็นเงื่อนไข
+``(a, b, id) > (x, y, z)`` ที่ใช้ composite index ได้ตรงๆ ไม่ว่าจะอยู่หน้าไหน
+
+ordering ที่ใช้คือ ordering ของ queryset (เช่นจาก ?ordering= หรือการค้นหา)
+ถ้าไม่มีใช้ ``ordering`` ของ class และเติม id ท้ายสุดเพื่อให้ลำดับไม่ซ้ำ
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('id',)
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    # ถ้า True จะแบ่งหน้าเฉพาะเมื่อ client ส่ง ?page_size= หรือ ?cursor= มา
+    # (หน้าเว็บเดิมที่ต้องการ list ทั้งหมดยังได้ list เหมือนเดิม)
+    opt_in = False
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.opt_in and self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.fields)
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(queryset.model, self.decode_cursor(cursor)))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by)
+        if not ordering or not all(isinstance(field, str) for field in ordering):
+            ordering = list(self.ordering)
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def field_value(self, obj, field):
+        value = obj
+        for part in field.lstrip('-').split('__'):
+            value = getattr(value, part)
+        return value
+
+    def after(self, model, values):
+        """เงื่อนไขของแถวที่อยู่หลัง cursor ตาม ordering (รองรับทั้งเรียงขึ้นและลง)"""
+        if len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.fields, values):
+            name = field.lstrip('-')
+            value = self.to_python(model, name, value)
+            operator = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{operator}': value})
+            equal &= Q(**{name: value})
+        # เงื่อนไข field แรกแบบ >= ซ้ำไว้ ให้ฐานข้อมูลใช้ index เป็น range scan
+        first = self.fields[0]
+        first_value = self.to_python(model, first.lstrip('-'), values[0])
+        return Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": first_value}) & condition
+
+    def to_python(self, model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # annotation (เช่น search_rank) หรือ field ของ model อื่น ใช้ค่าตามที่อยู่ใน cursor
+            return value
+        try:
+            return field.to_python(value)
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj):
+        values = []
+        for field in self.fields:
+            value = self.field_value(obj, field)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            values.append(value)
+        raw = json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw.decode('utf-8'))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class VocabularyPagination(KeysetPagination):
+    ordering = ('category', 'word', 'id')
+    page_size = 100
+    # learn.js โหลดคำศัพท์ทั้งหมดมากรองเอง จึงแบ่งหน้าเฉพาะเมื่อขอ
+    opt_in = True
+
+
+class ScorePagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
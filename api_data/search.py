@@ -0,0 +1,213 @@
+"""ค้นหาคำศัพท์ด้วย index ของฐานข้อมูล
+
+ทุกแถวของ Vocabulary เก็บ ``search_text`` ซึ่งเป็นข้อความจากทุก field ที่ผ่าน
+``normalize_term`` แล้ว การค้นหาจึงเทียบกับคอลัมน์เดียว
+
+- PostgreSQL: GIN index แบบ ``gin_trgm_ops`` (pg_trgm) รองรับทั้ง LIKE '%คำ%'
+  และ word similarity (พิมพ์ผิดเล็กน้อยก็ยังเจอ) เรียงผลตาม similarity
+- SQLite: ตาราง FTS5 (tokenizer แบบ trigram จึงค้นกลางคำภาษาไทยที่ไม่มีช่องว่างได้)
+  เรียงผลตาม bm25 และตัดที่ ``SEARCH_RESULT_LIMIT`` ภายใน query ของ FTS5 เอง
+  (คำค้นกว้างๆ จึงไม่ดึง id ทุกแถวที่ตรงออกมา)
+- ฐานข้อมูลอื่น หรือคำค้นที่สั้นกว่า 3 ตัวอักษร ใช้ LIKE บน ``search_text``
+
+ทุกแบบคืนผลไม่เกิน ``SEARCH_RESULT_LIMIT`` แถวที่ใกล้เคียงที่สุด
+"""
+import re
+import unicodedata
+
+from django.db import OperationalError, connection
+from django.db.models import BooleanField, Case, F, FloatField, Func, Q, Value, When
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .pagination import VocabularyPagination
+
+FTS_TABLE = 'api_data_vocabulary_fts'
+TRGM_INDEX = 'api_data_vocabulary_search_trgm'
+SEARCH_FIELDS = ['word', 'pronunciation', 'thai_translation', 'english_translation', 'category']
+MIN_TRIGRAM_LENGTH = 3
+# จำนวนผลสูงสุดที่ FTS5 คืนต่อคำค้น (เท่ากับหน้าใหญ่สุดที่ client ขอได้)
+SEARCH_RESULT_LIMIT = VocabularyPagination.max_page_size
+
+# zero-width space ฯลฯ ที่มักติดมากับข้อความภาษาไทยที่ copy มา และวรรณยุกต์ไทย (่ ้ ๊ ๋)
+# ซึ่งผู้เรียนมักพิมพ์ผิดหรือไม่พิมพ์ ตัดออกทั้งหมดเพื่อให้ค้นเจอ
+STRIP_CHARS = dict.fromkeys(map(ord, '\u200b\u200c\u200d\u2060\ufeff\u0e48\u0e49\u0e4a\u0e4b'))
+# สระบน/ล่างของไทยไม่นับเป็น \w จึงต้องยกเว้นช่วงอักษรไทยไว้
+PUNCTUATION_RE = re.compile(r'[^\w\s\u0e00-\u0e7f]|_')
+
+
+def is_thai(char):
+    return '\u0e00' <= char <= '\u0e7f'
+
+
+def normalize_term(value):
+    """ทำให้ข้อความอยู่ในรูปเดียวกันก่อนเก็บหรือค้นหา
+
+    NFKC, ตัด zero-width และวรรณยุกต์ไทย, รวม นิคหิต+สระอา เป็น สระอำ,
+    ตัดเครื่องหมายเสียงของคำอ่านภาษาละติน (à -> a), ตัวพิมพ์เล็ก และยุบเครื่องหมาย/ช่องว่าง
+    """
+    value = unicodedata.normalize('NFKC', value or '').translate(STRIP_CHARS)
+    # NFKC แยก ำ เป็น ํ + า จึงต้องรวมกลับ (หลังตัดวรรณยุกต์ที่อาจคั่นอยู่แล้ว)
+    value = value.replace('\u0e4d\u0e32', '\u0e33')
+    value = ''.join(
+        char for char in unicodedata.normalize('NFD', value)
+        if is_thai(char) or not unicodedata.combining(char)
+    )
+    value = PUNCTUATION_RE.sub(' ', unicodedata.normalize('NFC', value).casefold())
+    return ' '.join(value.split())
+
+
+def build_search_text(vocabulary):
+    return normalize_term(' '.join(getattr(vocabulary, name) or '' for name in SEARCH_FIELDS))
+
+
+class WordSimilar(Func):
+    """``term <% search_text`` ของ pg_trgm (ใช้ GIN index ได้)"""
+    template = '%(expressions)s'
+    arg_joiner = ' <%% '
+    output_field = BooleanField()
+
+
+def fts_query(term):
+    """term เป็นวลีเดียวของ FTS5 (เครื่องหมายในคำค้นไม่ถูกตีความเป็น syntax)"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def fts_ranked_ids(term, limit=SEARCH_RESULT_LIMIT):
+    """id ของคำศัพท์ที่ตรงกับ term เรียงตาม bm25 จากตาราง FTS5 (SQLite) ไม่เกิน limit แถว"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+            [fts_query(term), limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def fts_available():
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(f'SELECT 1 FROM {FTS_TABLE} LIMIT 0')
+        except OperationalError:
+            return False
+    return True
+
+
+def top_ranked(queryset, ordering):
+    """คงไว้เฉพาะ SEARCH_RESULT_LIMIT แถวแรกตาม ordering (LIMIT ใน subquery จึงยัง filter/แบ่งหน้าต่อได้)"""
+    top = queryset.order_by(*ordering, 'id').values('id')[:SEARCH_RESULT_LIMIT]
+    return queryset.filter(id__in=top).order_by(*ordering)
+
+
+def search_vocabulary(queryset, query):
+    """กรองและเรียง queryset ของ Vocabulary ตามคำค้น"""
+    term = normalize_term(query)
+    if not term:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        return top_ranked(queryset.filter(
+            Q(search_text__contains=term) | WordSimilar(Value(term), F('search_text'))
+        ).annotate(
+            search_rank=Func(Value(term), F('search_text'), function='word_similarity', output_field=FloatField())
+        ), ['-search_rank', 'category', 'word'])
+
+    # ถ้ายังไม่ได้สร้างตาราง FTS (เช่นยังไม่ได้ migrate) ใช้ LIKE แทน
+    if connection.vendor == 'sqlite' and len(term) >= MIN_TRIGRAM_LENGTH and fts_available():
+        # FTS5 เรียงตาม rank (bm25) และตัดที่ LIMIT เอง ตารางหลักอ่านแค่แถวที่ได้
+        match = fts_query(term)
+        table = queryset.model._meta.db_table
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+            [match, SEARCH_RESULT_LIMIT]
+        )).annotate(search_rank=RawSQL(
+            f'SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            [match], output_field=FloatField()
+        )).order_by('search_rank', 'category', 'word')
+
+    # คำที่ตรงตั้งแต่ต้นขึ้นก่อน
+    return top_ranked(queryset.filter(search_text__contains=term).annotate(
+        search_rank=Case(When(search_text__startswith=term, then=Value(0)), default=Value(1))
+    ), ['search_rank', 'category', 'word'])
+
+
+def index_vocabulary(vocabulary):
+    """อัปเดตแถวของคำศัพท์ในตาราง FTS5 (เฉพาะ SQLite; Postgres ใช้ index บนตารางหลักอยู่แล้ว)"""
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [vocabulary.pk])
+            cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, search_text) VALUES (%s, %s)',
+                           [vocabulary.pk, vocabulary.search_text])
+    except OperationalError:
+        pass
+
+
+def unindex_vocabulary(vocabulary_id):
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [vocabulary_id])
+    except OperationalError:
+        pass
+
+
+def create_search_index(schema_editor):
+    """สร้าง index สำหรับค้นหาตามชนิดฐานข้อมูล (เรียกจาก migration)"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TRGM_INDEX} ON api_data_vocabulary '
+            'USING gin (search_text gin_trgm_ops)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(search_text, tokenize='trigram')"
+        )
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TRGM_INDEX}')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def rebuild_search_index():
+    """เติม ``search_text`` ให้ทุกแถวใหม่ และสร้างตาราง FTS5 ใหม่ทั้งหมด (ใช้หลัง import แบบ bulk)
+
+    คืนค่าจำนวนคำศัพท์ที่ถูก index
+    """
+    from .models import Vocabulary
+
+    vocabularies = list(Vocabulary.objects.all())
+    for vocabulary in vocabularies:
+        vocabulary.search_text = build_search_text(vocabulary)
+    Vocabulary.objects.bulk_update(vocabularies, ['search_text'], batch_size=500)
+    rebuild_fts_table()
+    return len(vocabularies)
+
+
+def rebuild_fts_table():
+    """สร้างตาราง FTS5 ใหม่จาก ``search_text`` ที่มีอยู่ (PostgreSQL ใช้ index ปกติ ไม่ต้องทำอะไร)"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, search_text) SELECT id, search_text FROM api_data_vocabulary'
+        )
+
+
+class VocabularySearchFilter(filters.BaseFilterBackend):
+    """แทน SearchFilter ของ DRF: ใช้ ?search= เหมือนเดิมแต่ค้นผ่าน index และเรียงตามความใกล้เคียง"""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return search_vocabulary(queryset, query)
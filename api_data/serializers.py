@@ -1,12 +1,21 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Level,Answer,Question,Score,Vocabulary
+from .audio import enqueue_sound
+from .cache import bump_content_version
+from .sprites import enqueue_sprite
+
+# จำนวนคำถามสูงสุดต่อหนึ่ง request ของ /api/questions/bulk/
+BULK_QUESTION_LIMIT = 200
 
 class VocabularySerializer(serializers.ModelSerializer):
     sound_file_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Vocabulary
-        fields = ['id', 'word', 'pronunciation', 'thai_translation', 'english_translation', 'category', 'sound_file', 'sound_file_url']
+        fields = ['id', 'word', 'pronunciation', 'thai_translation', 'english_translation', 'category', 'sound_file', 'sound_file_url', 'sound_duration']
     
     def get_sound_file_url(self, obj):
         """คืนค่า URL เต็มของไฟล์เสียง"""
@@ -18,9 +27,20 @@ class VocabularySerializer(serializers.ModelSerializer):
         return None
 
 class LevelSerializer(serializers.ModelSerializer):
+    sound_sprite_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Level
-        fields = ['id', 'name', 'number','description']
+        fields = ['id', 'name', 'number','description', 'sound_sprite_url']
+
+    def get_sound_sprite_url(self, obj):
+        """URL เต็มของไฟล์เสียงรวมทั้ง level (ช่วงของแต่ละคำถามอยู่ใน sound_sprite ของคำถาม)"""
+        if obj.sound_sprite:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.sound_sprite.url)
+            return obj.sound_sprite.url
+        return None
 
 class AnswerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -31,10 +51,17 @@ class QuestionSerializer(serializers.ModelSerializer):
     answers = AnswerSerializer(many=True)
     level_details = LevelSerializer(source='level', read_only=True)
     sound_file_url = serializers.SerializerMethodField()
+    sound_sprite = serializers.SerializerMethodField()
 
     class Meta:
         model = Question
-        fields = ['id','word','pronunciation', 'sound_file', 'sound_file_url','level', 'level_details','answers']
+        fields = ['id','word','pronunciation', 'sound_file', 'sound_file_url', 'sound_duration', 'sound_sprite', 'level', 'level_details','answers']
+
+    def get_sound_sprite(self, obj):
+        """ช่วง [start, end] (วินาที) ของเสียงคำถามนี้ในไฟล์ sound_sprite_url ของ level"""
+        if obj.level:
+            return obj.level.sound_sprite_map.get(str(obj.id))
+        return None
 
     def get_sound_file_url(self, obj):
         """คืนค่า URL เต็มของไฟล์เสียง"""
@@ -51,6 +78,174 @@ class QuestionSerializer(serializers.ModelSerializer):
             Answer.objects.create(question=question, **answer)
         return question
 
+class BulkAnswerSerializer(AnswerSerializer):
+    """คำตอบใน bulk request มี id = แก้ไขคำตอบเดิมของคำถามนั้น ไม่มี id = สร้างใหม่"""
+    id = serializers.IntegerField(required=False)
+
+
+class BulkQuestionItemSerializer(serializers.Serializer):
+    """คำถามหนึ่งข้อใน bulk request มี id = แก้ไขคำถามเดิม ไม่มี id = สร้างใหม่"""
+    id = serializers.IntegerField(required=False)
+    word = serializers.CharField(max_length=100)
+    pronunciation = serializers.CharField(max_length=100)
+    level = serializers.IntegerField(required=False, allow_null=True)
+    sound_file = serializers.FileField(required=False, max_length=100)
+    answers = BulkAnswerSerializer(many=True, allow_empty=False)
+
+    def validate_id(self, value):
+        if value not in self.context['question_ids']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+    def validate_level(self, value):
+        if value is not None and value not in self.context['level_ids']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+    def validate_answers(self, answers):
+        if not any(answer.get('is_correct') for answer in answers):
+            raise serializers.ValidationError('At least one answer must be correct.')
+        return answers
+
+    def validate(self, attrs):
+        answer_questions = self.context['answer_questions']
+        for answer in attrs['answers']:
+            if 'id' in answer and ('id' not in attrs or answer_questions.get(answer['id']) != attrs['id']):
+                raise serializers.ValidationError(
+                    {'answers': [f'Invalid pk "{answer["id"]}" - answer does not belong to this question.']})
+        return attrs
+
+
+def referenced_ids(items, name):
+    """id ที่อ้างถึงใน request (ยังไม่ผ่าน validation) ใช้ดึงจากฐานข้อมูลครั้งเดียว"""
+    ids = set()
+    for item in items if isinstance(items, list) else []:
+        try:
+            ids.add(int(item[name]))
+        except (KeyError, TypeError, ValueError):
+            pass
+    return ids
+
+
+def used_answer_ids(answer_ids):
+    """คำตอบที่มีคนตอบแล้ว (มี QuestionAttempt หรือสถิติ) ลบไม่ได้เพราะจะลบประวัติของผู้เรียนไปด้วย"""
+    return set(
+        Answer.objects.filter(id__in=answer_ids)
+        .filter(Q(questionattempt__isnull=False) | Q(stats__isnull=False))
+        .values_list('id', flat=True).distinct()
+    )
+
+
+class BulkQuestionSerializer(serializers.Serializer):
+    """สร้าง/แก้ไขคำถามหลายข้อพร้อมคำตอบใน transaction เดียว
+
+    ตรวจทุกข้อก่อน (level และ id ที่อ้างถึงดึงด้วย query เดียว) ถ้าผิดข้อใดข้อหนึ่งจะไม่บันทึกเลย
+    แล้วเขียนด้วย bulk_create / bulk_update ซึ่งไม่ส่ง signal จึงล้าง cache,
+    ส่งไฟล์เสียงไปแปลง และสร้าง sprite ของ level ที่เกี่ยวข้องเอง
+
+    คำตอบของคำถามเดิมแก้ไขในที่เดิมตาม id (QuestionAttempt และสถิติที่อ้างถึงคำตอบยังอยู่)
+    คำตอบที่ไม่ได้ส่งมาจะถูกลบเฉพาะที่ยังไม่มีใครตอบ ถ้ามีคนตอบแล้วตอบ 400
+    """
+    questions = BulkQuestionItemSerializer(many=True, allow_empty=False, max_length=BULK_QUESTION_LIMIT)
+
+    def to_internal_value(self, data):
+        items = data.get('questions') if isinstance(data, dict) else None
+        self.context['level_ids'] = set(
+            Level.objects.filter(id__in=referenced_ids(items, 'level')).values_list('id', flat=True)
+        )
+        self.context['question_ids'] = set(
+            Question.objects.filter(id__in=referenced_ids(items, 'id')).values_list('id', flat=True)
+        )
+        # id คำตอบเดิม -> id คำถาม ของคำถามที่จะแก้ไข
+        self.context['answer_questions'] = dict(
+            Answer.objects.filter(question_id__in=self.context['question_ids']).values_list('id', 'question_id')
+        )
+        return super().to_internal_value(data)
+
+    def validate_questions(self, items):
+        question_ids = [item['id'] for item in items if 'id' in item]
+        if len(set(question_ids)) != len(question_ids):
+            raise serializers.ValidationError('Each question id may appear only once.')
+
+        kept = [answer['id'] for item in items for answer in item['answers'] if 'id' in answer]
+        if len(set(kept)) != len(kept):
+            raise serializers.ValidationError('Each answer id may appear only once.')
+        kept = set(kept)
+        self.removed_answer_ids = {
+            answer_id for answer_id, question_id in self.context['answer_questions'].items()
+            if question_id in question_ids and answer_id not in kept
+        }
+        used = used_answer_ids(self.removed_answer_ids)
+        if used:
+            answer_questions = self.context['answer_questions']
+            errors = []
+            for item in items:
+                ids = sorted(answer_id for answer_id in used if answer_questions[answer_id] == item.get('id'))
+                errors.append({'answers': [
+                    f'Answers {", ".join(map(str, ids))} already have attempts and cannot be removed.'
+                ]} if ids else {})
+            raise serializers.ValidationError(errors)
+        return items
+
+    def create(self, validated_data):
+        items = validated_data['questions']
+        existing = Question.objects.in_bulk([item['id'] for item in items if 'id' in item])
+        now = timezone.now()
+        created, updated, saved, stored = [], [], [], []
+        update_fields = {'word', 'pronunciation', 'level', 'updated_at'}
+        affected_levels = {question.level_id for question in existing.values()}
+
+        try:
+            with transaction.atomic():
+                for item in items:
+                    question = existing[item['id']] if 'id' in item else Question()
+                    question.word = item['word']
+                    question.pronunciation = item['pronunciation']
+                    question.level_id = item.get('level')
+                    question.updated_at = now
+                    upload = item.get('sound_file')
+                    if upload:
+                        question.sound_file.save(upload.name, upload, save=False)
+                        stored.append(question.sound_file.name)
+                        update_fields.add('sound_file')
+                    (updated if question.pk else created).append(question)
+                    saved.append(question)
+                    affected_levels.add(question.level_id)
+
+                if created:
+                    Question.objects.bulk_create(created)
+                    if any(question.pk is None for question in created):
+                        # ฐานข้อมูลที่ไม่คืน id จาก bulk insert
+                        ids = dict(
+                            Question.objects.filter(uid__in=[q.uid for q in created]).values_list('uid', 'id'))
+                        for question in created:
+                            question.pk = ids[question.uid]
+                if updated:
+                    Question.objects.bulk_update(updated, sorted(update_fields))
+
+                answers = [
+                    Answer(question=question, **answer)
+                    for question, item in zip(saved, items)
+                    for answer in item['answers']
+                ]
+                if self.removed_answer_ids:
+                    Answer.objects.filter(id__in=self.removed_answer_ids).delete()
+                changed = [answer for answer in answers if answer.id is not None]
+                if changed:
+                    Answer.objects.bulk_update(changed, ['thai_text', 'english_text', 'is_correct'])
+                Answer.objects.bulk_create([answer for answer in answers if answer.id is None])
+
+                bump_content_version()
+                transaction.on_commit(lambda: [enqueue_sound(question) for question in saved])
+                transaction.on_commit(lambda: [enqueue_sprite(level_id) for level_id in affected_levels])
+        except Exception:
+            # ไฟล์เสียงที่เขียนไปแล้วไม่ย้อนกลับตาม transaction ต้องลบเอง
+            for name in stored:
+                Question._meta.get_field('sound_file').storage.delete(name)
+            raise
+        return saved
+
+
 class ScoreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Score
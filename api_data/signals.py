@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .audio import enqueue_sound
+from .autocomplete import vocabulary_index
+from .cache import bump_content_version, bump_vocabulary_version, get_vocabulary_version
+from .models import Answer, Level, Question, Vocabulary
+from .search import index_vocabulary, unindex_vocabulary
+from .snapshot import refresh_snapshot
+from .sprites import enqueue_sprite, levels_containing
+
+
+@receiver([post_save, post_delete], sender=Level)
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=Answer)
+def invalidate_level_bundles(sender, **kwargs):
+    """ล้าง cache ชุดคำถามเมื่อมีการแก้ไขเนื้อหา"""
+    bump_content_version()
+    # request อื่นที่อ่านระหว่าง transaction ยังเห็นข้อมูลเดิม แต่อาจได้ version ใหม่ไปแล้ว
+    # (ทั้ง cache และ ETag) จึงเปลี่ยน version อีกครั้งหลัง commit
+    transaction.on_commit(bump_content_version)
+
+
+@receiver(post_save, sender=Vocabulary)
+def update_search_index(sender, instance, **kwargs):
+    """อัปเดต index ค้นหา, autocomplete และ snapshot เมื่อมีการแก้ไขคำศัพท์"""
+    index_vocabulary(instance)
+    transaction.on_commit(lambda: vocabulary_index.update(
+        instance, get_vocabulary_version(), bump_vocabulary_version()
+    ))
+    transaction.on_commit(refresh_snapshot)
+
+
+@receiver(post_delete, sender=Vocabulary)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_vocabulary(instance.pk)
+    vocabulary_id = instance.pk
+    transaction.on_commit(lambda: vocabulary_index.discard(
+        vocabulary_id, get_vocabulary_version(), bump_vocabulary_version()
+    ))
+    transaction.on_commit(refresh_snapshot)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=Vocabulary)
+def process_uploaded_sound(sender, instance, **kwargs):
+    """ส่งไฟล์เสียงที่อัปโหลดใหม่ไปแปลงหลัง commit (ไม่ทำใน request)"""
+    transaction.on_commit(lambda: enqueue_sound(instance))
+
+
+@receiver([post_save, post_delete], sender=Question)
+def rebuild_level_sprites(sender, instance, **kwargs):
+    """สร้าง sprite เสียงใหม่ให้ level ของคำถาม และ level เดิมถ้าคำถามถูกย้ายหรือลบ"""
+    def rebuild():
+        for level_id in {instance.level_id, *levels_containing(instance.pk)}:
+            enqueue_sprite(level_id)
+    transaction.on_commit(rebuild)
+
+
+@receiver(post_delete, sender=Level)
+def delete_level_sprite(sender, instance, **kwargs):
+    if instance.sound_sprite:
+        transaction.on_commit(lambda: instance.sound_sprite.storage.delete(instance.sound_sprite.name))
@@ -0,0 +1,128 @@
+"""Snapshot ของคำศัพท์ทั้งหมดเป็นไฟล์ static ที่ชื่อไฟล์มี hash ของเนื้อหา
+
+ไฟล์ ``snapshots/vocabulary-<hash>.json.gz`` (และ ``.msgpack.gz`` ถ้าเปิดไว้)
+เนื้อหาไม่เปลี่ยนตลอดอายุไฟล์ client จึง cache ได้ตลอดไป แล้วถาม
+``/api/vocabulary/snapshot/`` ว่า hash ล่าสุดคืออะไร ดาวน์โหลดใหม่เมื่อ hash เปลี่ยนเท่านั้น
+
+รูปแบบ: ``{"version": hash, "fields": [...], "rows": [[...], ...]}`` (แถวเป็น list
+ตามลำดับ fields ไม่ต้องส่งชื่อ field ซ้ำทุกแถว)
+"""
+import gzip
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .cache import get_vocabulary_version
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_PREFIX = 'vocabulary-'
+# เก็บไฟล์เก่าไว้จำนวนหนึ่ง ให้ client ที่ยังถือ URL เดิมอยู่ดาวน์โหลดได้
+SNAPSHOT_KEEP = 3
+FIELDS = ['id', 'word', 'pronunciation', 'thai_translation', 'english_translation', 'category', 'sound_file_url']
+
+
+def snapshot_rows():
+    from .models import Vocabulary
+
+    rows = []
+    for row in Vocabulary.objects.order_by('category', 'word', 'id').values_list(*FIELDS[:-1], 'sound_file'):
+        sound_file = row[-1]
+        rows.append([*row[:-1], settings.MEDIA_URL + sound_file if sound_file else None])
+    return rows
+
+
+def compress(data):
+    # mtime=0 ให้ไฟล์ที่เนื้อหาเหมือนกันได้ byte เหมือนกันทุกครั้ง
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def msgpack_enabled():
+    return msgpack is not None and getattr(settings, 'VOCABULARY_SNAPSHOT_MSGPACK', False)
+
+
+def write_file(name, data):
+    """บันทึกไฟล์ถ้ายังไม่มี (ชื่อมี hash อยู่แล้ว ไฟล์ชื่อเดิมจึงมีเนื้อหาเดิม)"""
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+    return default_storage.url(name)
+
+
+def build_snapshot():
+    """สร้างไฟล์ snapshot จากคำศัพท์ปัจจุบัน คืนค่า manifest (version, url, count)"""
+    rows = snapshot_rows()
+    body = json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    data = {'version': digest, 'fields': FIELDS, 'rows': rows}
+
+    base = f'{SNAPSHOT_DIR}/{SNAPSHOT_PREFIX}{digest}'
+    manifest = {
+        'version': digest,
+        'count': len(rows),
+        'url': write_file(f'{base}.json.gz', compress(
+            json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        )),
+        'msgpack_url': None,
+    }
+    if msgpack_enabled():
+        manifest['msgpack_url'] = write_file(f'{base}.msgpack.gz', compress(msgpack.packb(data)))
+    prune_snapshots(digest)
+    return manifest
+
+
+def prune_snapshots(current):
+    """ลบ snapshot เก่า เหลือไว้ SNAPSHOT_KEEP รุ่นล่าสุด"""
+    try:
+        _, files = default_storage.listdir(SNAPSHOT_DIR)
+    except FileNotFoundError:
+        return
+    versions = {}
+    for name in files:
+        if name.startswith(SNAPSHOT_PREFIX):
+            version = name[len(SNAPSHOT_PREFIX):].split('.', 1)[0]
+            path = f'{SNAPSHOT_DIR}/{name}'
+            modified = default_storage.get_modified_time(path)
+            versions.setdefault(version, []).append((modified, path))
+    ordered = sorted(versions, key=lambda version: max(versions[version])[0], reverse=True)
+    for version in ordered[SNAPSHOT_KEEP:]:
+        if version == current:
+            continue
+        for _, path in versions[version]:
+            default_storage.delete(path)
+
+
+def snapshot_cache_key():
+    return f'api_data:vocabulary_snapshot:{get_vocabulary_version()}'
+
+
+def current_snapshot():
+    """manifest ของ snapshot ที่ตรงกับคำศัพท์ปัจจุบัน สร้างใหม่ถ้ายังไม่มี"""
+    key = snapshot_cache_key()
+    manifest = cache.get(key)
+    if manifest is None:
+        manifest = build_snapshot()
+        cache.set(key, manifest, None)
+    return manifest
+
+
+def refresh_snapshot():
+    """สร้าง snapshot ใหม่หลังคำศัพท์เปลี่ยน (เรียกจาก signal และ management command)"""
+    try:
+        manifest = build_snapshot()
+    except OSError:
+        logger.exception("Could not write vocabulary snapshot")
+        return None
+    cache.set(snapshot_cache_key(), manifest, None)
+    logger.info(f"Vocabulary snapshot {manifest['version']} ({manifest['count']} words)")
+    return manifest
@@ -0,0 +1,127 @@
+"""รวมไฟล์เสียงของทุกคำถามใน level เป็นไฟล์เดียว (audio sprite)
+
+หน้า quiz โหลดเสียงทั้ง level ใน request เดียว แล้วเล่นเฉพาะช่วง
+``[start, end]`` (วินาที) ของแต่ละคำถามตาม ``Level.sound_sprite_map``
+
+แต่ละไฟล์ถูก decode เป็น PCM (mono 44.1 kHz) ต่อกันโดยคั่นด้วยความเงียบ
+``GAP_SECONDS`` แล้ว encode เป็น MP3 ครั้งเดียว offset จึงคำนวณจากจำนวน sample
+ได้แม่นยำ ช่วงเงียบกันไม่ให้เสียงคำถัดไปหลุดมาเมื่อ browser หยุดเล่นช้าไปเล็กน้อย
+ชื่อไฟล์มี hash ของเนื้อหา จึง cache แบบ immutable ได้ (ดู media.py)
+
+สร้างใหม่อัตโนมัติใน worker pool ของ audio.py เมื่อคำถามหรือไฟล์เสียงของ level เปลี่ยน
+หรือสั่งเองด้วย ``manage.py build_sound_sprites``
+"""
+import hashlib
+import logging
+import subprocess
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from .audio import SAMPLE_RATE, ffmpeg_binary, get_executor, local_file, processing_available
+
+logger = logging.getLogger(__name__)
+
+SPRITE_DIR = 'level_sprites'
+GAP_SECONDS = 0.3
+BYTES_PER_SAMPLE = 2  # s16le mono
+
+_pending = set()
+
+
+def decode_pcm(path):
+    """decode ไฟล์เสียงเป็น PCM 16-bit mono"""
+    return subprocess.run([
+        ffmpeg_binary(), '-nostdin', '-loglevel', 'error', '-i', path,
+        '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-',
+    ], check=True, capture_output=True, timeout=120).stdout
+
+
+def encode_mp3(pcm):
+    return subprocess.run([
+        ffmpeg_binary(), '-nostdin', '-loglevel', 'error',
+        '-f', 's16le', '-ar', str(SAMPLE_RATE), '-ac', '1', '-i', '-',
+        '-c:a', 'libmp3lame', '-b:a', getattr(settings, 'AUDIO_BITRATE', '64k'),
+        '-id3v2_version', '0', '-write_id3v1', '0', '-f', 'mp3', '-',
+    ], input=pcm, check=True, capture_output=True, timeout=300).stdout
+
+
+def seconds(byte_count):
+    return round(byte_count / BYTES_PER_SAMPLE / SAMPLE_RATE, 3)
+
+
+def build_level_sprite(level_id):
+    """สร้าง sprite ของ level คืนค่า map {question_id: [start, end]} (None ถ้าไม่มี level)"""
+    from .models import Level, Question
+
+    level = Level.objects.filter(pk=level_id).first()
+    if level is None:
+        return None
+
+    questions = list(Question.objects.filter(level=level).exclude(sound_file='')
+                     .exclude(sound_file__isnull=True).order_by('id'))
+    gap = b'\0' * (int(GAP_SECONDS * SAMPLE_RATE) * BYTES_PER_SAMPLE)
+    chunks = []
+    sprite_map = {}
+    position = 0
+    for question in questions:
+        try:
+            with local_file(question.sound_file) as path:
+                pcm = decode_pcm(path)
+        except (OSError, subprocess.CalledProcessError):
+            logger.warning(f"Skipping {question.sound_file.name} in level {level.number} sprite", exc_info=True)
+            continue
+        if chunks:
+            chunks.append(gap)
+            position += len(gap)
+        sprite_map[str(question.id)] = [seconds(position), seconds(position + len(pcm))]
+        chunks.append(pcm)
+        position += len(pcm)
+
+    old_name = level.sound_sprite.name if level.sound_sprite else ''
+    new_name = ''
+    if chunks:
+        pcm = b''.join(chunks)
+        digest = hashlib.sha256(pcm).hexdigest()[:16]
+        new_name = f'{SPRITE_DIR}/level-{level.id}-{digest}.mp3'
+        storage = level.sound_sprite.storage
+        if not storage.exists(new_name):
+            storage.save(new_name, ContentFile(encode_mp3(pcm)))
+
+    with transaction.atomic():
+        level = Level.objects.select_for_update().get(pk=level_id)
+        level.sound_sprite = new_name or None
+        level.sound_sprite_map = sprite_map
+        level.save(update_fields=['sound_sprite', 'sound_sprite_map'])
+
+    if old_name and old_name != new_name:
+        level.sound_sprite.storage.delete(old_name)
+    logger.info(f"Built sound sprite for level {level.number}: {len(sprite_map)} clips")
+    return sprite_map
+
+
+def run_sprite_job(level_id):
+    _pending.discard(level_id)
+    try:
+        return build_level_sprite(level_id)
+    except Exception:
+        logger.exception(f"Sound sprite build failed for level {level_id}")
+        return None
+    finally:
+        connection.close()
+
+
+def enqueue_sprite(level_id):
+    """สร้าง sprite ของ level ใหม่ใน worker pool (ถ้ามี ffmpeg)"""
+    if level_id is None or not processing_available() or level_id in _pending:
+        return
+    _pending.add(level_id)
+    get_executor().submit(run_sprite_job, level_id)
+
+
+def levels_containing(question_id):
+    """level ที่ sprite ปัจจุบันมีเสียงของคำถามนี้อยู่ (ใช้ตอนคำถามถูกย้าย level หรือลบ)"""
+    from .models import Level
+
+    return list(Level.objects.filter(sound_sprite_map__has_key=str(question_id)).values_list('id', flat=True))
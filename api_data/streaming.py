@@ -0,0 +1,30 @@
+"""ส่ง response แบบ streaming ให้ได้ทั้ง WSGI และ ASGI
+
+ใต้ ASGI Django อ่าน iterator แบบ sync ของ ``StreamingHttpResponse`` /
+``FileResponse`` จนหมดด้วย ``sync_to_async(list)`` ก่อนส่ง ไฟล์หรือ export
+ทั้งก้อนจึงอยู่ในหน่วยความจำของ worker ``stream_for`` เปลี่ยน content เป็น
+async iterator ที่ดึงทีละ ``batch`` ชิ้นใน thread ของ sync code แทน
+(thread เดียวกับ connection ของฐานข้อมูล จึงใช้กับ ``QuerySet.iterator()`` ได้)
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+async def async_chunks(iterator, batch=1):
+    """async iterator ที่อ่าน iterator แบบ sync ทีละ batch ชิ้น (รวมเป็น bytes ก้อนเดียว)"""
+    iterator = iter(iterator)
+    read = sync_to_async(lambda: list(islice(iterator, batch)))
+    while True:
+        parts = await read()
+        if not parts:
+            break
+        yield b''.join(parts)
+
+
+def stream_for(request, response, batch=1):
+    """ถ้า request มาทาง ASGI ให้ response ส่ง streaming_content ด้วย async iterator"""
+    if isinstance(request, ASGIRequest) and response.streaming and not response.is_async:
+        response.streaming_content = async_chunks(response.streaming_content, batch)
+    return response
@@ -1,3 +1,983 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import async_views
+from .audio import process_sound, processing_available
+from . import importer
+from .autocomplete import MAX_LIMIT, AutocompleteIndex, search_key, vocabulary_index
+from .cache import check_shared_cache, ensure_shared_cache
+from .middleware import APIAccessMiddleware
+from .media import serve_media
+from .models import Answer, Level, Question, Score, Vocabulary
+from .renderers import FastJSONRenderer
+from .search import fts_ranked_ids, normalize_term
+from .snapshot import SNAPSHOT_KEEP
+from .sprites import GAP_SECONDS, build_level_sprite
+
+
+class TempMediaMixin:
+    """ใช้ MEDIA_ROOT ชั่วคราว ไม่ให้ test เขียนไฟล์ลง media/ จริง"""
+
+    def use_temp_media(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class QuestionsByLevelCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+        self.level = Level.objects.create(name='Basics', number=1)
+        for i in range(3):
+            question = Question.objects.create(word=f'word{i}', pronunciation=f'p{i}', level=self.level)
+            Answer.objects.create(question=question, thai_text='ก', english_text='a', is_correct=True)
+            Answer.objects.create(question=question, thai_text='ข', english_text='b')
+        self.url = f'/api/questions/level/{self.level.id}/'
+
+    def test_cold_load_is_prefetched(self):
+        # questions + answers prefetch (level ใช้ select_related)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()), 3)
+        self.assertEqual(len(response.json()[0]['answers']), 2)
+
+    def test_hot_load_hits_no_database(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+    def test_content_change_invalidates_bundle(self):
+        self.client.get(self.url)
+        answer = Answer.objects.filter(question__level=self.level).first()
+        answer.english_text = 'changed'
+        answer.save()
+        data = self.client.get(self.url).json()
+        texts = [a['english_text'] for q in data for a in q['answers']]
+        self.assertIn('changed', texts)
+
+        self.level.name = 'Renamed'
+        self.level.save()
+        data = self.client.get(self.url).json()
+        self.assertEqual(data[0]['level_details']['name'], 'Renamed')
+
+
+class SharedCacheCheckTests(TestCase):
+    LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+    @override_settings(DEBUG=False, CACHES=LOCMEM)
+    def test_several_workers_with_local_cache_are_reported(self):
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '4'}):
+            # บันทึก error แต่ยังเริ่ม server ได้ (host ตั้ง WEB_CONCURRENCY ให้เอง)
+            with self.assertLogs('api_data.cache', 'ERROR'):
+                ensure_shared_cache()
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['api_data.W001'])
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '1'}):
+            with self.assertLogs('api_data.cache', 'WARNING'):
+                ensure_shared_cache()
+
+    @override_settings(DEBUG=False, CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_shared_cache_passes(self):
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '4'}):
+            ensure_shared_cache()
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class AsyncReadViewTests(TestCase):
+    """view async ต้องตอบเหมือน view ของ DRF (เรียกตรงๆ เพราะ url ของ view async เปิดเฉพาะเมื่อ ASYNC_VIEWS)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+        self.level = Level.objects.create(name='Basics', number=1)
+        Level.objects.create(name='Next', number=2)
+        for i in range(3):
+            question = Question.objects.create(word=f'word{i}', pronunciation=f'p{i}', level=self.level)
+            Answer.objects.create(question=question, thai_text='ก', english_text='a', is_correct=True)
+            Answer.objects.create(question=question, thai_text='ข', english_text='b')
+        Vocabulary.objects.create(word='กิน', pronunciation='kin', thai_translation='กิน',
+                                  english_translation='eat', category='Verbs')
+        Vocabulary.objects.create(word='หมา', pronunciation='maa', thai_translation='สุนัข',
+                                  english_translation='dog', category='Animals')
+
+    def call(self, view, path, data=None, user=None, ajax=True, method='get', **kwargs):
+        headers = {'X-Requested-With': 'XMLHttpRequest'} if ajax else {}
+        request = getattr(AsyncRequestFactory(), method)(path, data, headers=headers)
+        user = user or self.user
+
+        async def auser():
+            return user
+        request.auser = auser
+        # AuthenticationMiddleware ตั้งไว้ให้ view ของ DRF ที่ถูกส่งต่อไป
+        request.user = user
+        request._dont_enforce_csrf_checks = True
+        response = async_to_sync(view)(request, **kwargs)
+        # response ของ DRF (ที่ถูกส่งต่อไป) handler ของ Django เป็นคน render
+        return response.render() if hasattr(response, 'render') else response
+
+    def test_levels_match_sync_view(self):
+        response = self.call(async_views.level_list, '/api/levels/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), self.client.get('/api/levels/').json())
+
+    def test_questions_by_level_share_cache_with_sync_view(self):
+        url = f'/api/questions/level/{self.level.id}/'
+        # questions + answers เหมือน view sync
+        with self.assertNumQueries(2):
+            response = self.call(async_views.questions_by_level, url, level_id=self.level.id)
+        data = json.loads(response.content)
+        self.assertEqual(len(data), 3)
+        self.assertEqual(len(data[0]['answers']), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json(), data)
+
+    def test_cache_is_read_without_blocking_calls(self):
+        # cache.get แบบ sync จะบล็อก event loop ถ้า cache อยู่บน network
+        with mock.patch('api_data.cache.get_version', side_effect=AssertionError('sync cache call')):
+            self.assertEqual(self.call(async_views.level_list, '/api/levels/').status_code, 200)
+            response = self.call(async_views.questions_by_level, f'/api/questions/level/{self.level.id}/',
+                                 level_id=self.level.id)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.call(async_views.vocabulary_list, '/api/vocabulary/').status_code, 200)
+
+    def test_vocabulary_filters_and_falls_back_to_drf(self):
+        response = self.call(async_views.vocabulary_list, '/api/vocabulary/', {'category': 'Verbs'})
+        self.assertEqual([entry['word'] for entry in json.loads(response.content)], ['กิน'])
+        self.assertEqual(json.loads(self.call(async_views.vocabulary_list, '/api/vocabulary/').content),
+                         self.client.get('/api/vocabulary/').json())
+        # แบ่งหน้าไม่ได้ทำใน view async ต้องได้ผลของ DRF
+        response = self.call(async_views.vocabulary_list, '/api/vocabulary/', {'page_size': 1})
+        self.assertEqual(json.loads(response.content), self.client.get('/api/vocabulary/?page_size=1').json())
+
+    def test_permissions_match_drf(self):
+        response = self.call(async_views.level_list, '/api/levels/', user=AnonymousUser())
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(json.loads(response.content), {'detail': 'Authentication credentials were not provided.'})
+        self.assertEqual(self.call(async_views.level_list, '/api/levels/', ajax=False).status_code, 403)
+        admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.assertEqual(self.call(async_views.level_list, '/api/levels/', user=admin, ajax=False).status_code, 200)
+
+    def test_writes_go_to_drf_view(self):
+        response = self.call(async_views.level_list, '/api/levels/', {'name': 'Third', 'number': 3}, method='post')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Level.objects.filter(number=3).exists())
+
+    def test_access_middleware_async_path(self):
+        async def get_response(request):
+            return HttpResponse('ok')
+        middleware = APIAccessMiddleware(get_response)
+        request = AsyncRequestFactory().get('/api/levels/')
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        self.assertEqual(async_to_sync(middleware)(request).status_code, 403)
+        request = AsyncRequestFactory().get('/api/levels/', headers={'X-Requested-With': 'XMLHttpRequest'})
+        request.auser = auser
+        self.assertEqual(async_to_sync(middleware)(request).status_code, 200)
+
+
+class ConditionalGetTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+        self.level = Level.objects.create(name='Basics', number=1)
+        question = Question.objects.create(word='word', pronunciation='p', level=self.level)
+        Answer.objects.create(question=question, thai_text='ก', english_text='a', is_correct=True)
+        Vocabulary.objects.create(word='กิน', pronunciation='kin', thai_translation='กิน',
+                                  english_translation='eat', category='Verbs')
+
+    def assert_revalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('X-Requested-With', response['Vary'])
+        # ตรวจสิทธิ์ (session/user) ได้ แต่ไม่ query เนื้อหาและไม่ serialize
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertIn('X-Requested-With', cached['Vary'])
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        return response['ETag']
+
+    def test_content_endpoints_answer_304(self):
+        for url in ['/api/levels/', f'/api/levels/{self.level.id}/', '/api/questions/',
+                    f'/api/questions/level/{self.level.id}/', '/api/vocabulary/']:
+            with self.subTest(url=url):
+                self.assert_revalidates(url)
+
+    def test_etag_depends_on_query_and_content_version(self):
+        url = f'/api/questions/level/{self.level.id}/'
+        etag = self.assert_revalidates(url)
+        self.assertNotEqual(self.client.get('/api/vocabulary/?category=Verbs')['ETag'],
+                            self.client.get('/api/vocabulary/')['ETag'])
+
+        Answer.objects.filter(question__level=self.level).update(english_text='changed')
+        Question.objects.get(level=self.level).save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['answers'][0]['english_text'], 'changed')
+
+    def test_vocabulary_uses_its_own_version(self):
+        # on_commit ของ Vocabulary สร้าง snapshot ใหม่
+        self.use_temp_media()
+        levels_etag = self.client.get('/api/levels/')['ETag']
+        vocabulary_etag = self.client.get('/api/vocabulary/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Vocabulary.objects.create(word='หมา', pronunciation='maa', thai_translation='สุนัข',
+                                      english_translation='dog', category='Animals')
+        self.assertEqual(self.client.get('/api/levels/', HTTP_IF_NONE_MATCH=levels_etag).status_code, 304)
+        response = self.client.get('/api/vocabulary/', HTTP_IF_NONE_MATCH=vocabulary_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_denied_requests_vary_on_ajax_header(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/levels/')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('X-Requested-With', response['Vary'])
+        self.assertNotIn('ETag', response)
+
+    def test_async_view_shares_etag(self):
+        etag = self.client.get('/api/levels/')['ETag']
+        request = AsyncRequestFactory().get('/api/levels/', headers={
+            'X-Requested-With': 'XMLHttpRequest', 'If-None-Match': etag,
+        })
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        response = async_to_sync(async_views.level_list)(request)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+
+class LeanSerializerTests(TestCase):
+    """values_list + orjson ต้องได้ JSON เดียวกับ ModelSerializer + JSONRenderer ของ DRF"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+        self.level = Level.objects.create(name='Basics', number=1, description='ทักทาย',
+                                          sound_sprite='level_sprites/level-1.m4a')
+        first = Question.objects.create(word='สบายดี', pronunciation='sabai', level=self.level,
+                                        sound_file='question_sounds/สบาย ดี.m4a', sound_duration=1.25)
+        Question.objects.create(word='ไป', pronunciation='pai', level=self.level)
+        Level.objects.filter(pk=self.level.pk).update(sound_sprite_map={str(first.id): [0, 1.25]})
+        for question in Question.objects.all():
+            Answer.objects.create(question=question, thai_text='ข', english_text='b')
+            Answer.objects.create(question=question, thai_text='ก', english_text='a', is_correct=True)
+        Vocabulary.objects.create(word='กิน', pronunciation='kin', thai_translation='กิน', english_translation='eat',
+                                  category='Verb', sound_file='vocabulary_sounds/kin.m4a', sound_duration=0.5)
+        Vocabulary.objects.create(word='หมา', pronunciation='maa', thai_translation='สุนัข',
+                                  english_translation='dog', category='Animals')
+
+    def fetch(self, url):
+        cache.clear()
+        return self.client.get(url).content
+
+    def test_matches_drf_serializers(self):
+        for url in ['/api/vocabulary/', '/api/vocabulary/?category=Verb', '/api/vocabulary/?search=kin',
+                    f'/api/questions/level/{self.level.id}/']:
+            with self.subTest(url=url):
+                lean = self.fetch(url)
+                with override_settings(LEAN_SERIALIZERS=False):
+                    self.assertEqual(lean, self.fetch(url))
+        data = json.loads(lean)
+        self.assertEqual(data[0]['sound_file_url'], 'http://testserver/media/question_sounds/%E0%B8%AA%E0%B8%9A'
+                                                    '%E0%B8%B2%E0%B8%A2%20%E0%B8%94%E0%B8%B5.m4a')
+        self.assertEqual(data[0]['sound_sprite'], [0, 1.25])
+        self.assertIsNone(data[1]['sound_sprite'])
+
+    def test_questions_bundle_takes_two_queries(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.client.get(f'/api/questions/level/{self.level.id}/').json()), 2)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {'text': 'ไทย\u2028', 'at': timezone.now(), 'day': timezone.now().date(),
+                'nested': [{'n': 1.5, 'ok': True}], 7: None}
+        with mock.patch('api_data.renderers.orjson', None):
+            expected = FastJSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        self.assertIn(b'\\u2028', expected)
+        self.assertTrue(FastJSONRenderer().render(data, 'application/json; indent=2').startswith(b'{\n  "'))
+
+    def test_benchmark_command_reports_both_payloads(self):
+        out = StringIO()
+        call_command('benchmark_serializers', repeat=1, stdout=out)
+        self.assertIn('/api/vocabulary/ (2 rows', out.getvalue())
+        self.assertIn(f'/api/questions/level/{self.level.id}/ (2 rows', out.getvalue())
+        self.assertNotIn('differs', out.getvalue())
+
+
+class ScoreIdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='learner', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+        self.level = Level.objects.create(name='Basics', number=1)
+
+    def test_retry_with_same_key_returns_existing_score(self):
+        data = {'player_name': 'learner', 'score': 4, 'max_score': 5, 'level': self.level.id}
+        first = self.client.post('/api/scores/', data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        second = self.client.post('/api/scores/', data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.json()['id'], second.json()['id'])
+        self.assertEqual(Score.objects.count(), 1)
+
+    def test_key_is_scoped_to_the_user(self):
+        data = {'player_name': 'learner', 'score': 4, 'max_score': 5, 'level': self.level.id}
+        first = self.client.post('/api/scores/', data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        other = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        other.force_authenticate(User.objects.create_user(username='other', password='pass'))
+        second = other.post('/api/scores/', {**data, 'player_name': 'other'}, format='json',
+                            HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(second.status_code, 201)
+        self.assertNotEqual(first.json()['id'], second.json()['id'])
+        self.assertEqual(second.json()['player_name'], 'other')
+
+    def test_overlong_key_is_rejected(self):
+        data = {'player_name': 'learner', 'score': 4, 'max_score': 5, 'level': self.level.id}
+        response = self.client.post('/api/scores/', data, format='json', HTTP_IDEMPOTENCY_KEY='k' * 65)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('idempotency_key', response.json())
+        self.assertFalse(Score.objects.exists())
+
+
+class VocabularySearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='learner', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+        self.school = Vocabulary.objects.create(
+            word='โฮงเฮียน', pronunciation='hóong-hian', thai_translation='โรงเรียน',
+            english_translation='School', category='Noun'
+        )
+        self.water = Vocabulary.objects.create(
+            word='น้ำ', pronunciation='náam', thai_translation='น้ำ',
+            english_translation='Water', category='Noun'
+        )
+        self.eat = Vocabulary.objects.create(
+            word='กิน', pronunciation='gin', thai_translation='กิน',
+            english_translation='Eat', category='Verb'
+        )
+
+    def search(self, term, **params):
+        response = self.client.get('/api/vocabulary/', {'search': term, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()]
+
+    def test_normalize_term(self):
+        self.assertEqual(normalize_term('  Hóong-Hian '), 'hoong hian')
+        # ไม่สนวรรณยุกต์ และ นิคหิต+สระอา เท่ากับ สระอำ
+        self.assertEqual(normalize_term('น้ำ'), normalize_term('น\u0e4d\u0e32'))
+        self.assertEqual(normalize_term('โฮง\u200bเฮียน'), 'โฮงเฮียน')
+
+    def test_search_matches_any_field(self):
+        self.assertEqual(self.search('school'), [self.school.id])
+        self.assertEqual(self.search('เฮียน'), [self.school.id])
+        self.assertEqual(self.search('HOONG'), [self.school.id])
+        self.assertEqual(self.search('verb'), [self.eat.id])
+
+    def test_search_ignores_tone_marks(self):
+        self.assertEqual(self.search('นํา'), [self.water.id])
+
+    def test_short_terms_fall_back_to_like(self):
+        self.assertEqual(self.search('กิ'), [self.eat.id])
+
+    def test_search_combines_with_category_filter(self):
+        self.assertCountEqual(self.search('noun', category='Noun'), [self.school.id, self.water.id])
+        self.assertEqual(self.search('noun', category='Verb'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.school.english_translation = 'Classroom'
+        self.school.save()
+        self.assertEqual(self.search('school'), [])
+        self.assertEqual(self.search('classroom'), [self.school.id])
+        self.assertEqual(fts_ranked_ids('classroom'), [self.school.id])
+        self.school.delete()
+        self.assertEqual(self.search('classroom'), [])
+
+    def test_fts_limits_and_ranks_inside_the_index(self):
+        Vocabulary.objects.create(
+            word='ส้มตำ', pronunciation='som tam', thai_translation='ส้มตำ',
+            english_translation='Papaya salad, salad, salad', category='Noun'
+        )
+        self.assertEqual(len(fts_ranked_ids('noun', limit=2)), 2)
+        with mock.patch('api_data.search.SEARCH_RESULT_LIMIT', 2):
+            self.assertEqual(len(self.search('noun')), 2)
+            # LIKE (และ pg_trgm) ตัดที่จำนวนเดียวกัน
+            self.assertEqual(len(self.search('n')), 2)
+        response = self.client.get('/api/vocabulary/', {'search': 'noun', 'page_size': 2})
+        first = [item['id'] for item in response.json()['results']]
+        second = [item['id'] for item in self.client.get(response.json()['next']).json()['results']]
+        self.assertCountEqual(first + second, self.search('noun'))
+
+
+class AutocompleteTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.use_temp_media()
+        self.user = User.objects.create_user(username='learner', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+        self.papaya = Vocabulary.objects.create(
+            word='บักหุ่ง', pronunciation='bak hung', thai_translation='มะละกอ',
+            english_translation='Papaya', category='Plants'
+        )
+        self.lizard = Vocabulary.objects.create(
+            word='กะปอม', pronunciation='ka phom', thai_translation='กิ้งก่า',
+            english_translation='Lizard', category='Animals'
+        )
+
+    def suggest(self, q):
+        response = self.client.get('/api/vocabulary/autocomplete/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [(item['id'], item['match']) for item in response.json()]
+
+    def test_romanization_variants_share_a_key(self):
+        self.assertEqual(search_key('Ka phok'), search_key('kaphok'))
+        self.assertEqual(search_key('ga pok'), search_key('kaphok'))
+
+    def test_exact_prefix_and_fuzzy_matches(self):
+        self.assertEqual(self.suggest('ga pom'), [(self.lizard.id, 'exact')])
+        self.assertEqual(self.suggest('kap'), [(self.lizard.id, 'prefix')])
+        self.assertEqual(self.suggest('papya'), [(self.papaya.id, 'fuzzy')])
+        self.assertEqual(self.suggest('บักหุ่'), [(self.papaya.id, 'prefix')])
+
+    def test_hot_query_hits_no_database(self):
+        self.suggest('kap')
+        with self.assertNumQueries(0):
+            self.suggest('bak')
+
+    def test_index_updates_incrementally(self):
+        self.suggest('kap')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lizard.pronunciation = 'ka pom'
+            self.lizard.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.papaya.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('kapom'), [(self.lizard.id, 'exact')])
+            self.assertEqual(self.suggest('papaya'), [])
+        self.assertEqual(set(vocabulary_index.entries), {self.lizard.id})
+
+    def test_short_prefix_reads_presorted_candidates(self):
+        index = AutocompleteIndex()
+        words = [f'คำ{i:03d}' for i in range(MAX_LIMIT + 20)]
+        for i, word in enumerate(reversed(words), 1):
+            index.add({'id': i, 'word': word, 'pronunciation': f'ka {word[-3:]}', 'thai_translation': '',
+                       'english_translation': '', 'category': 'Noun'})
+        index.version = 'v'
+        node = index.prefix_node(search_key('ka'))
+        self.assertEqual(len(node.top), MAX_LIMIT)
+        with mock.patch('api_data.autocomplete.get_vocabulary_version', return_value='v'):
+            self.assertEqual([item['word'] for item in index.query('ka', 5)], words[:5])
+            # คำที่หลุดจาก top ถูกเติมกลับเมื่อคำใน top ถูกลบ
+            for item in index.query('ka', MAX_LIMIT):
+                index.remove(item['id'])
+            self.assertEqual([item['word'] for item in index.query('ka', MAX_LIMIT)], words[MAX_LIMIT:])
+
+
+class VocabularyPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='learner', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+        for category in ('Verb', 'Noun'):
+            for word in ('ค', 'ก', 'ข', 'ก'):
+                Vocabulary.objects.create(word=word, pronunciation='p', thai_translation='t',
+                                          english_translation='e', category=category)
+
+    def test_full_list_unless_requested(self):
+        self.assertEqual(len(self.client.get('/api/vocabulary/').json()), 8)
+
+    def test_pages_follow_category_word_id(self):
+        ids = []
+        response = self.client.get('/api/vocabulary/', {'page_size': 3})
+        while True:
+            data = response.json()
+            self.assertLessEqual(len(data['results']), 3)
+            ids += [item['id'] for item in data['results']]
+            if not data['next']:
+                break
+            response = self.client.get(data['next'])
+        expected = list(Vocabulary.objects.order_by('category', 'word', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_search_results_keep_rank_across_pages(self):
+        first = self.client.get('/api/vocabulary/', {'search': 'noun', 'page_size': 3}).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 4)
+        self.assertTrue(all(item['category'] == 'Noun' for item in first['results'] + second['results']))
+        self.assertIsNone(second['next'])
+
+    def test_scores_are_paged(self):
+        level = Level.objects.create(name='Basics', number=1)
+        for score in range(3):
+            Score.objects.create(player_name='p', score=score, max_score=5, level=level)
+        data = self.client.get('/api/scores/', {'page_size': 2}).json()
+        self.assertEqual([item['score'] for item in data['results']], [2, 1])
+        data = self.client.get(data['next']).json()
+        self.assertEqual([item['score'] for item in data['results']], [0])
+        self.assertIsNone(data['next'])
+
+
+class VocabularySnapshotTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.use_temp_media()
+        self.user = User.objects.create_user(username='learner', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+        self.word = Vocabulary.objects.create(word='แซ่บ', pronunciation='saep', thai_translation='อร่อย',
+                                              english_translation='Delicious', category='Adjective')
+
+    def read_snapshot(self, manifest):
+        path = manifest['url'].split('/media/', 1)[1]
+        with open(f'{self.media_root}/{path}', 'rb') as f:
+            return json.loads(gzip.decompress(f.read()))
+
+    def test_snapshot_is_content_addressed(self):
+        manifest = self.client.get('/api/vocabulary/snapshot/').json()
+        snapshot = self.read_snapshot(manifest)
+        self.assertEqual(snapshot['version'], manifest['version'])
+        self.assertIn(manifest['version'], manifest['url'])
+        self.assertEqual(dict(zip(snapshot['fields'], snapshot['rows'][0]))['word'], 'แซ่บ')
+
+        # ไม่มีอะไรเปลี่ยน -> ได้ URL เดิม (ตอบจาก cache)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/vocabulary/snapshot/').json()['url'], manifest['url'])
+
+    def test_save_writes_new_snapshot(self):
+        first = self.client.get('/api/vocabulary/snapshot/').json()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.word.english_translation = 'Tasty'
+            self.word.save()
+        second = self.client.get('/api/vocabulary/snapshot/').json()
+        self.assertNotEqual(first['version'], second['version'])
+        self.assertEqual(self.read_snapshot(second)['rows'][0][4], 'Tasty')
+
+    def test_old_snapshots_are_pruned(self):
+        for i in range(SNAPSHOT_KEEP + 2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.word.english_translation = f'Tasty {i}'
+                self.word.save()
+        files = [name for name in os.listdir(f'{self.media_root}/snapshots') if name.endswith('.json.gz')]
+        self.assertEqual(len(files), SNAPSHOT_KEEP)
+
+
+class MediaServeTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.use_temp_media()
+        os.makedirs(f'{self.media_root}/question_sounds')
+        os.makedirs(f'{self.media_root}/snapshots')
+        self.body = bytes(range(256)) * 4
+        with open(f'{self.media_root}/question_sounds/kin.mp3', 'wb') as f:
+            f.write(self.body)
+        with open(f'{self.media_root}/snapshots/vocabulary-0123456789abcdef.json.gz', 'wb') as f:
+            f.write(gzip.compress(b'{}'))
+        self.url = '/media/question_sounds/kin.mp3'
+
+    def test_full_file_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertEqual(response['Content-Type'], 'audio/mpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=86400', response['Cache-Control'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_streams_asynchronously_under_asgi(self):
+        async def collect(response):
+            return [chunk async for chunk in response]
+
+        request = AsyncRequestFactory().get(self.url, headers={'Range': 'bytes=10-'})
+        with mock.patch('api_data.media.BLOCK_SIZE', 256):
+            response = serve_media(request, 'question_sounds/kin.mp3')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.is_async)
+        chunks = async_to_sync(collect)(response)
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(b''.join(chunks), self.body[10:])
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.body)}')
+        self.assertEqual(b''.join(response.streaming_content), self.body[10:20])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.body[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.body)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.body)}')
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_content_hashed_names_are_immutable(self):
+        response = self.client.get('/media/snapshots/vocabulary-0123456789abcdef.json.gz')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_only_sound_folders_are_served(self):
+        with open(f'{self.media_root}/secret.txt', 'w') as f:
+            f.write('x')
+        self.assertEqual(self.client.get('/media/secret.txt').status_code, 404)
+        self.assertEqual(self.client.get('/media/question_sounds/../secret.txt').status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='nginx', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_accel_redirect_handoff(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/question_sounds/kin.mp3')
+        self.assertEqual(response.content, b'')
+
+
+class BulkQuestionTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.use_temp_media()
+        self.user = User.objects.create_user(username='author', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+        self.level = Level.objects.create(name='Basics', number=1)
+        self.url = '/api/questions/bulk/'
+
+    def payload(self, count, **extra):
+        return [{
+            'word': f'word{i}', 'pronunciation': f'p{i}', 'level': self.level.id,
+            'answers': [
+                {'thai_text': 'ก', 'english_text': 'a', 'is_correct': True},
+                {'thai_text': 'ข', 'english_text': 'b', 'is_correct': False},
+            ],
+            **extra,
+        } for i in range(count)]
+
+    def test_create_uses_constant_number_of_queries(self):
+        with self.assertNumQueries(7):
+            response = self.client.post(self.url, {'questions': self.payload(30)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()), 30)
+        self.assertEqual(Question.objects.filter(level=self.level).count(), 30)
+        self.assertEqual(Answer.objects.filter(question__level=self.level).count(), 60)
+
+    def test_update_replaces_answers_and_uploads_sound(self):
+        question = Question.objects.create(word='old', pronunciation='old', level=self.level)
+        Answer.objects.create(question=question, thai_text='เก่า', english_text='old', is_correct=True)
+        items = self.payload(1, id=question.id) + self.payload(1)
+        response = self.client.post(self.url, {
+            'questions': json.dumps(items),
+            'sound_0': ContentFile(b'ID3 fake', name='word0.mp3'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        question.refresh_from_db()
+        self.assertEqual(question.word, 'word0')
+        self.assertTrue(question.sound_file.name.startswith('question_sounds/word0'))
+        self.assertEqual(sorted(question.answers.values_list('english_text', flat=True)), ['a', 'b'])
+        self.assertEqual(Question.objects.count(), 2)
+
+    def attempted_question(self):
+        from progress.models import QuestionAttempt, UserProgress
+
+        question = Question.objects.create(word='old', pronunciation='old', level=self.level)
+        right = Answer.objects.create(question=question, thai_text='เก่า', english_text='old', is_correct=True)
+        wrong = Answer.objects.create(question=question, thai_text='ผิด', english_text='wrong')
+        progress = UserProgress.objects.create(user=self.user, level=self.level, is_unlocked=True)
+        QuestionAttempt.objects.create(user=self.user, progress=progress, question=question, answer=right,
+                                       is_correct=True)
+        return question, right, wrong
+
+    def test_update_keeps_answers_with_attempts(self):
+        question, right, wrong = self.attempted_question()
+        item = {'id': question.id, 'word': 'new', 'pronunciation': 'new', 'level': self.level.id, 'answers': [
+            {'id': right.id, 'thai_text': 'ใหม่', 'english_text': 'new', 'is_correct': True},
+            {'thai_text': 'ค', 'english_text': 'c', 'is_correct': False},
+        ]}
+        response = self.client.post(self.url, {'questions': [item]}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        right.refresh_from_db()
+        self.assertEqual((right.thai_text, right.english_text), ('ใหม่', 'new'))
+        self.assertEqual(right.questionattempt_set.count(), 1)
+        # คำตอบที่ไม่ได้ส่งมาและยังไม่มีใครตอบถูกลบ
+        self.assertFalse(Answer.objects.filter(id=wrong.id).exists())
+        self.assertEqual(sorted(question.answers.values_list('english_text', flat=True)), ['c', 'new'])
+
+    def test_removing_attempted_answer_is_rejected(self):
+        question, right, wrong = self.attempted_question()
+        item = {'id': question.id, 'word': 'new', 'pronunciation': 'new', 'level': self.level.id, 'answers': [
+            {'id': wrong.id, 'thai_text': 'ผิด', 'english_text': 'wrong', 'is_correct': True},
+        ]}
+        response = self.client.post(self.url, {'questions': [item]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(right.id), response.json()['questions'][0]['answers'][0])
+        self.assertTrue(Answer.objects.filter(id=right.id).exists())
+
+    def test_answer_of_other_question_is_rejected(self):
+        question, right, _ = self.attempted_question()
+        item = self.payload(1)[0]
+        item['answers'][0]['id'] = right.id
+        response = self.client.post(self.url, {'questions': [item]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('answers', response.json()['questions'][0])
+
+    def test_failed_write_removes_uploaded_files(self):
+        items = self.payload(1)
+        with mock.patch.object(Answer.objects, 'bulk_create', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(self.url, {
+                    'questions': json.dumps(items),
+                    'sound_0': ContentFile(b'ID3 fake', name='word0.mp3'),
+                }, format='multipart')
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'question_sounds')), [])
+        self.assertFalse(Question.objects.exists())
+
+    def test_invalid_item_writes_nothing(self):
+        items = self.payload(2)
+        items[1]['level'] = 9999
+        items[0]['answers'][0]['is_correct'] = False
+        response = self.client.post(self.url, {'questions': items}, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['questions']
+        self.assertIn('answers', errors[0])
+        self.assertIn('level', errors[1])
+        self.assertFalse(Question.objects.exists())
+
+
+class ImportContentTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.use_temp_media()
+        self.words = [
+            {'Category': 'Noun', 'Word': 'เฮือน', 'Pronunciation': 'Huan', 'Thai': 'บ้าน', 'Eng': 'House'},
+            {'Category': 'Verb', 'Word': 'เว้า', 'Pronunciation': 'Wao', 'Thai': 'พูด', 'Eng': 'Speak'},
+            {'Category': 'Bogus', 'Word': 'ผิด', 'Pronunciation': 'Phit', 'Thai': 'ผิด', 'Eng': 'Wrong'},
+        ]
+        self.lessons = {'stages': [{'id': 1, 'name': 'Basics', 'description': 'Greetings', 'levels': [{
+            'id': 1, 'name': 'Greetings',
+            'words': [
+                {'id': '1-1-1', 'isan': 'สบายดี', 'karaoke': 'sa-baai-dee', 'thai': 'สบายดี', 'english': 'Hello'},
+                {'id': '1-1-2', 'isan': 'ขอบใจ', 'karaoke': 'khob-jai', 'thai': 'ขอบคุณ', 'english': 'Thank you'},
+            ],
+            'quizzes': [{'type': 'word', 'correctAnswer': 'Hello', 'options': ['Hello', 'Goodbye', 'Thank you']}],
+        }]}]}
+
+    def write_json(self, data):
+        path = os.path.join(self.media_root, 'data.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+    def run_import(self, *args):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_content', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_streaming_parser_handles_chunk_boundaries(self):
+        path = self.write_json(self.words)
+        with mock.patch.object(importer, 'READ_SIZE', 7):
+            self.assertEqual(list(importer.iter_items(path, 'item')), self.words)
+
+    def test_upsert_reports_diff_and_is_idempotent(self):
+        vocabulary = self.write_json(self.words)
+        lessons = os.path.join(self.media_root, 'lessons.json')
+        with open(lessons, 'w', encoding='utf-8') as f:
+            json.dump(self.lessons, f, ensure_ascii=False)
+
+        output = self.run_import('--vocabulary', vocabulary, '--lessons', lessons)
+        self.assertIn('Vocabulary: 2 new, 0 changed, 0 unchanged, 1 skipped', output)
+        self.assertIn('Question: 2 new', output)
+        house = Vocabulary.objects.get(source_key='Noun:เฮือน')
+        self.assertEqual(house.search_text, normalize_term('เฮือน Huan บ้าน House Noun'))
+        question = Question.objects.get(word='สบายดี')
+        self.assertEqual(question.level.number, 1)
+        self.assertEqual(
+            sorted(question.answers.values_list('english_text', 'is_correct')),
+            [('Goodbye', False), ('Hello', True), ('Thank you', False)],
+        )
+        # คำตอบผิดใช้คำแปลไทยจากคำอื่นใน level
+        self.assertEqual(question.answers.get(english_text='Thank you').thai_text, 'ขอบคุณ')
+
+        output = self.run_import('--vocabulary', vocabulary, '--lessons', lessons)
+        self.assertIn('Vocabulary: 0 new, 0 changed, 2 unchanged', output)
+        self.assertIn('Answer: 0 new, 0 changed, 2 unchanged', output)
+
+        self.words[0]['Eng'] = 'Home'
+        output = self.run_import('--only', 'vocabulary', '--vocabulary', self.write_json(self.words), '-v', '2')
+        self.assertIn("~ Noun:เฮือน english_translation: 'House' -> 'Home'", output)
+        house.refresh_from_db()
+        self.assertEqual(house.english_translation, 'Home')
+        self.assertEqual(Vocabulary.objects.count(), 2)
+        self.assertEqual(Question.objects.count(), 2)
+
+    def write_lessons(self):
+        path = os.path.join(self.media_root, 'lessons.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.lessons, f, ensure_ascii=False)
+        return path
+
+    def test_reimport_keeps_answers_with_attempts(self):
+        from progress.models import QuestionAttempt, UserProgress
+
+        lessons = self.write_lessons()
+        self.run_import('--only', 'lessons', '--lessons', lessons)
+        question = Question.objects.get(word='สบายดี')
+        hello = question.answers.get(english_text='Hello')
+        goodbye = question.answers.get(english_text='Goodbye')
+        user = User.objects.create_user(username='learner', password='pass')
+        progress = UserProgress.objects.create(user=user, level=question.level, is_unlocked=True)
+        QuestionAttempt.objects.create(user=user, progress=progress, question=question, answer=goodbye,
+                                       is_correct=False)
+
+        quiz = self.lessons['stages'][0]['levels'][0]['quizzes'][0]
+        quiz['options'] = ['Hello', 'See you', 'Thank you']
+        self.lessons['stages'][0]['levels'][0]['words'][0]['thai'] = 'สวัสดี'
+        output = self.run_import('--only', 'lessons', '--lessons', self.write_lessons(), '-v', '2')
+        self.assertIn("kept answered: 'Goodbye'", output)
+
+        hello.refresh_from_db()
+        self.assertEqual(hello.thai_text, 'สวัสดี')
+        self.assertEqual(QuestionAttempt.objects.get().answer_id, goodbye.id)
+        self.assertEqual(
+            sorted(question.answers.values_list('english_text', flat=True)),
+            ['Goodbye', 'Hello', 'See you', 'Thank you'],
+        )
+        # รันซ้ำไม่มีอะไรเปลี่ยน
+        output = self.run_import('--only', 'lessons', '--lessons', lessons)
+        self.assertIn('Answer: 0 new, 0 changed, 2 unchanged', output)
+
+    def test_matches_rows_added_in_admin(self):
+        level = Level.objects.create(number=1, name='Greetings')
+        question = Question.objects.create(word='สบายดี', pronunciation='sa-baai-dee', level=level)
+        house = Vocabulary.objects.create(word='เฮือน', pronunciation='Huan', thai_translation='บ้าน',
+                                          english_translation='Home', category='Noun')
+        output = self.run_import('--vocabulary', self.write_json(self.words), '--lessons', self.write_lessons())
+        self.assertIn('Vocabulary: 1 new, 1 changed', output)
+        self.assertIn('Question: 1 new, 1 changed', output)
+
+        house.refresh_from_db()
+        self.assertEqual((house.source_key, house.english_translation), ('Noun:เฮือน', 'House'))
+        question.refresh_from_db()
+        self.assertEqual(question.uid, importer.question_uid('1-1-1'))
+        self.assertEqual(Vocabulary.objects.count(), 2)
+        self.assertEqual(Question.objects.count(), 2)
+
+    def test_ambiguous_admin_rows_are_skipped(self):
+        for _ in range(2):
+            Vocabulary.objects.create(word='เฮือน', pronunciation='Huan', thai_translation='บ้าน',
+                                      english_translation='House', category='Noun')
+        stderr = StringIO()
+        call_command('import_content', '--only', 'vocabulary', '--vocabulary', self.write_json(self.words),
+                     stdout=StringIO(), stderr=stderr)
+        self.assertIn('Noun:เฮือน: matches 2 existing rows', stderr.getvalue())
+        self.assertEqual(Vocabulary.objects.filter(word='เฮือน').count(), 2)
+
+    def test_dry_run_writes_nothing(self):
+        output = self.run_import('--only', 'vocabulary', '--vocabulary', self.write_json(self.words), '--dry-run')
+        self.assertIn('Vocabulary: 2 new', output)
+        self.assertFalse(Vocabulary.objects.exists())
+
+
+@skipUnless(processing_available(), 'ffmpeg/ffprobe not installed')
+class AudioProcessingTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.use_temp_media()
+        # เสียง 1.5 วินาที แบบ stereo พร้อม metadata
+        wav = subprocess.run([
+            'ffmpeg', '-loglevel', 'error', '-f', 'lavfi', '-i', 'sine=frequency=440:duration=1.5',
+            '-ac', '2', '-metadata', 'title=upload', '-f', 'wav', '-',
+        ], check=True, capture_output=True).stdout
+        self.question = Question.objects.create(word='กิน', pronunciation='gin')
+        self.question.sound_file.save('kin.wav', ContentFile(wav))
+
+    def test_upload_is_transcoded_and_measured(self):
+        self.assertTrue(process_sound('api_data.Question', self.question.pk))
+        self.question.refresh_from_db()
+        self.assertTrue(self.question.sound_file.name.endswith('.mp3'))
+        self.assertAlmostEqual(self.question.sound_duration, 1.5, delta=0.1)
+        self.assertEqual(self.question.sound_size, self.question.sound_file.size)
+        self.assertFalse(os.path.exists(f'{self.media_root}/question_sounds/kin.wav'))
+        # ไม่แปลงซ้ำ
+        self.assertFalse(process_sound('api_data.Question', self.question.pk))
+
+
+@skipUnless(processing_available(), 'ffmpeg/ffprobe not installed')
+class SoundSpriteTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.use_temp_media()
+        self.level = Level.objects.create(name='Basics', number=1)
+        self.questions = []
+        for i, duration in enumerate([0.5, 1.0]):
+            wav = subprocess.run([
+                'ffmpeg', '-loglevel', 'error', '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+                '-f', 'wav', '-',
+            ], check=True, capture_output=True).stdout
+            question = Question.objects.create(word=f'คำ{i}', pronunciation=f'kham{i}', level=self.level)
+            question.sound_file.save(f'q{i}.wav', ContentFile(wav))
+            self.questions.append(question)
+
+    def test_sprite_map_offsets(self):
+        first, second = self.questions
+        sprite_map = build_level_sprite(self.level.id)
+        self.assertEqual(sprite_map[str(first.id)], [0.0, 0.5])
+        self.assertEqual(sprite_map[str(second.id)], [0.5 + GAP_SECONDS, 1.5 + GAP_SECONDS])
+
+        self.level.refresh_from_db()
+        self.assertEqual(self.level.sound_sprite_map, sprite_map)
+        self.assertRegex(self.level.sound_sprite.name, r'^level_sprites/level-\d+-[0-9a-f]{16}\.mp3$')
+
+        client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        client.force_authenticate(User.objects.create_user(username='learner', password='pass'))
+        data = client.get(f'/api/questions/level/{self.level.id}/').json()
+        self.assertEqual(data[1]['sound_sprite'], sprite_map[str(second.id)])
+        self.assertTrue(data[0]['level_details']['sound_sprite_url'].endswith(self.level.sound_sprite.name))
+
+    def test_rebuild_replaces_old_sprite(self):
+        build_level_sprite(self.level.id)
+        self.level.refresh_from_db()
+        old_path = self.level.sound_sprite.path
+        self.questions[0].delete()
+
+        sprite_map = build_level_sprite(self.level.id)
+        self.assertEqual(list(sprite_map), [str(self.questions[1].id)])
+        self.assertFalse(os.path.exists(old_path))
@@ -4,6 +4,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework import routers, renderers  # เพิ่ม renderers ตรงนี้
 from .views import *
+from . import async_views
 
 class DefaultRouterWithoutBrowsableAPI(routers.DefaultRouter):
     """
@@ -25,4 +26,12 @@ urlpatterns = [
     path('questions/level/<int:level_id>/', QuestionsByLevelView.as_view(), name='questions-by-level'),
     path('questions/level/<int:level_id>/', QuestionsByLevelView.as_view(), name='questions-by-level'),
     # path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
-]  # ลบวงเล็บปิดที่ซ้ำตรงนี้
\ No newline at end of file
+]  # ลบวงเล็บปิดที่ซ้ำตรงนี้
+
+if settings.ASYNC_VIEWS:
+    # view แบบ async อยู่ก่อน router จึงถูกเลือกก่อน (ดู api_data/async_views.py)
+    urlpatterns = [
+        path('levels/', async_views.level_list, name='level-list-async'),
+        path('questions/level/<int:level_id>/', async_views.questions_by_level, name='questions-by-level-async'),
+        path('vocabulary/', async_views.vocabulary_list, name='vocabulary-list-async'),
+    ] + urlpatterns
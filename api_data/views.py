@@ -1,4 +1,7 @@
+import json
+
 from rest_framework import viewsets,filters
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.generics import ListAPIView
@@ -6,14 +9,43 @@ from rest_framework.parsers import MultiPartParser,FormParser,JSONParser
 from .models import *
 from .serializers import *
 from .serializers import ScoreSerializer
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from .cache import LEVEL_BUNDLE_TIMEOUT, get_vocabulary_version, level_bundle_key
+from .mixins import ConditionalGetMixin
+from .lean import LeanQuestionSerializer, LeanVocabularySerializer, lean_enabled
+from .search import VocabularySearchFilter
+from .pagination import ScorePagination, VocabularyPagination
+from .autocomplete import DEFAULT_LIMIT, MAX_LIMIT, vocabulary_index
+from .snapshot import current_snapshot
+from django.utils.cache import patch_cache_control
+
+IDEMPOTENCY_KEY_MAX_LENGTH = Score._meta.get_field('idempotency_key').max_length
 
-class VocabularyViewSet(viewsets.ReadOnlyModelViewSet):
+class VocabularyViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet สำหรับแสดงข้อมูลคำศัพท์"""
     queryset = Vocabulary.objects.all()
     serializer_class = VocabularySerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['word', 'pronunciation', 'thai_translation', 'english_translation', 'category']
+    # ?search= ค้นผ่าน index (pg_trgm / FTS5) และเรียงตามความใกล้เคียง ดู api_data/search.py
+    filter_backends = [VocabularySearchFilter, filters.OrderingFilter]
+    pagination_class = VocabularyPagination
     ordering_fields = ['word', 'category']
+
+    def get_content_version(self):
+        return get_vocabulary_version()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self.lean_list, request, *args, **kwargs)
+
+    def lean_list(self, request, *args, **kwargs):
+        """เหมือน list ของ DRF แต่ list ทั้งหมด (ไม่แบ่งหน้า) อ่านด้วย LeanVocabularySerializer"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        if lean_enabled():
+            return Response(LeanVocabularySerializer(request).data(queryset))
+        return Response(self.get_serializer(queryset, many=True).data)
     
     def get_queryset(self):
         queryset = Vocabulary.objects.all()
@@ -25,12 +57,33 @@ class VocabularyViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """แนะนำคำศัพท์ขณะพิมพ์ (?q=) ทนต่อการสะกดคำอ่านต่างกันและพิมพ์ผิด ตอบจาก index ในหน่วยความจำ"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(vocabulary_index.query(request.query_params.get('q', ''), limit))
+
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        """URL ของไฟล์ snapshot คำศัพท์ล่าสุด (ไฟล์ cache ได้ตลอดไป ตัวนี้ต้องถามใหม่ทุกครั้ง)"""
+        manifest = current_snapshot()
+        response = Response({
+            **manifest,
+            'url': request.build_absolute_uri(manifest['url']),
+            'msgpack_url': manifest['msgpack_url'] and request.build_absolute_uri(manifest['msgpack_url']),
+        })
+        patch_cache_control(response, no_cache=True)
+        return response
 
-class LevelViewSet(viewsets.ModelViewSet):
+
+class LevelViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Level.objects.all().order_by('number')
     serializer_class = LevelSerializer
 
-class QuestionViewSet(viewsets.ModelViewSet):
+class QuestionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     parser_classes = [MultiPartParser,FormParser,JSONParser]
@@ -48,7 +101,36 @@ class QuestionViewSet(viewsets.ModelViewSet):
 
         return queryset
 
-class QuestionsByLevelView(ListAPIView):
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """สร้าง/แก้ไขคำถามหลายข้อพร้อมคำตอบใน request เดียว
+
+        JSON: ``{"questions": [{"id"?, "word", "pronunciation", "level", "answers": [...]}, ...]}``
+        multipart: ``questions`` เป็นข้อความ JSON แบบเดียวกัน และไฟล์เสียงของข้อที่ i ชื่อ ``sound_<i>``
+        """
+        questions = request.data.get('questions') if hasattr(request.data, 'get') else request.data
+        if isinstance(questions, str):
+            try:
+                questions = json.loads(questions)
+            except ValueError:
+                return Response({'questions': ['Invalid JSON.']}, status=status.HTTP_400_BAD_REQUEST)
+        if isinstance(questions, list):
+            questions = [
+                {**item, 'sound_file': request.FILES[f'sound_{i}']}
+                if isinstance(item, dict) and f'sound_{i}' in request.FILES else item
+                for i, item in enumerate(questions)
+            ]
+
+        serializer = BulkQuestionSerializer(data={'questions': questions})
+        serializer.is_valid(raise_exception=True)
+        saved = serializer.save()
+        queryset = (
+            Question.objects.filter(id__in=[question.id for question in saved])
+            .select_related('level').prefetch_related('answers').order_by('id')
+        )
+        return Response(self.get_serializer(queryset, many=True).data, status=status.HTTP_201_CREATED)
+
+class QuestionsByLevelView(ConditionalGetMixin, ListAPIView):
     serializer_class = QuestionSerializer
     
     def get_serializer_context(self):
@@ -58,23 +140,69 @@ class QuestionsByLevelView(ListAPIView):
     
     def get_queryset(self):
         level_id = self.kwargs.get('level_id')
-        return Question.objects.filter(level=level_id)
+        return (
+            Question.objects.filter(level=level_id)
+            .select_related('level')
+            .prefetch_related('answers')
+            .order_by('id')
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self.cached_list, request, *args, **kwargs)
+
+    def cached_list(self, request, *args, **kwargs):
+        """ส่งชุดคำถามของ level จาก cache ถ้ามี ไม่ต้อง query ฐานข้อมูล"""
+        level_id = self.kwargs.get('level_id')
+        cache_key = level_bundle_key(level_id, request.build_absolute_uri('/'))
+        data = cache.get(cache_key)
+        if data is None:
+            if lean_enabled():
+                data = LeanQuestionSerializer(request).data(level_id)
+            else:
+                data = self.get_serializer(self.get_queryset(), many=True).data
+            cache.set(cache_key, data, LEVEL_BUNDLE_TIMEOUT)
+        return Response(data)
 
 class ScoreViewSet(viewsets.ModelViewSet):
-    queryset = Score.objects.all().order_by('-created_at')
+    queryset = Score.objects.all().order_by('-created_at', '-id')
     serializer_class = ScoreSerializer
+    pagination_class = ScorePagination
     
+    def idempotency_scope(self, request):
+        """เจ้าของ idempotency key (API นี้ต้อง login เสมอ)"""
+        return f'user:{request.user.pk}'
+
     def create(self, request, *args, **kwargs):
         # รับข้อมูลจาก request
         data = request.data
         
+        # ถ้าเคยบันทึกคะแนนด้วย idempotency key เดียวกันแล้ว ให้ส่งข้อมูลเดิมกลับ (ไม่บันทึกซ้ำ)
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        scope = ''
+        if idempotency_key:
+            idempotency_key = str(idempotency_key)
+            if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+                return Response({'idempotency_key': [f'Ensure this field has no more than '
+                                                     f'{IDEMPOTENCY_KEY_MAX_LENGTH} characters.']},
+                                status=status.HTTP_400_BAD_REQUEST)
+            scope = self.idempotency_scope(request)
+            existing = Score.objects.filter(idempotency_scope=scope, idempotency_key=idempotency_key).first()
+            if existing:
+                return Response(self.get_serializer(existing).data, status=status.HTTP_200_OK)
+        
         # สร้าง serializer จากข้อมูลที่ได้รับ
         serializer = self.get_serializer(data=data)
         
         # ตรวจสอบความถูกต้องของข้อมูล
         if serializer.is_valid():
             # บันทึกข้อมูล
-            self.perform_create(serializer)
+            try:
+                with transaction.atomic():
+                    serializer.save(idempotency_key=idempotency_key or None, idempotency_scope=scope)
+            except IntegrityError:
+                # request ซ้ำที่เข้ามาพร้อมกันบันทึกไปก่อนแล้ว
+                existing = Score.objects.get(idempotency_scope=scope, idempotency_key=idempotency_key)
+                return Response(self.get_serializer(existing).data, status=status.HTTP_200_OK)
             
             # ส่งข้อมูลกลับพร้อมสถานะ 201 Created
             return Response(serializer.data, status=status.HTTP_201_CREATED)
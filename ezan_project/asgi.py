@@ -3,6 +3,16 @@ ASGI config for ezan_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving this app with an ASGI server (e.g. ``uvicorn ezan_project.asgi:application``)
+enables the live events stream at ``/progress/events/`` (see progress/live.py);
+under the WSGI app that endpoint answers 204 and pages fall back to fetching.
+It also switches on the async read views (``ASYNC_VIEWS``, see
+api_data/async_views.py); ``Procfile.asgi`` is the uvicorn deployment profile.
+It runs a single worker: live events are published in-process, so a second
+worker's subscribers would miss them (see progress/live.py). Media files and
+the CSV/NDJSON exports are streamed chunk by chunk through async iterators
+(api_data/streaming.py) so they never sit whole in that worker's memory.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -12,5 +22,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ezan_project.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
+
+from api_data.cache import ensure_shared_cache  # noqa: E402
+
+ensure_shared_cache()
@@ -52,7 +52,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'api_data.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -60,7 +60,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'api_data.middleware.APIAccessMiddleware',
-    'social_django.middleware.SocialAuthExceptionMiddleware',
+    'api_data.middleware.SocialAuthExceptionMiddleware',
 ]
 
 ROOT_URLCONF = 'ezan_project.urls'
@@ -102,6 +102,52 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# ถ้ารันหลาย worker ต้องใช้ cache ที่แชร์กันได้ (เช่น redis) ผ่าน CACHE_BACKEND: version ของเนื้อหา, ชุดคำถาม,
+# user_levels และ leaderboard อยู่ใน cache นี้ ถ้า DEBUG=False, WEB_CONCURRENCY > 1 และยังเป็น LocMemCache
+# wsgi.py / asgi.py จะบันทึก error ตอนเริ่ม และ `check --deploy` เตือน (ดู api_data.cache.ensure_shared_cache)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'ezan-cache'),
+    }
+}
+
+# อายุ cache ของชุดคำถามต่อ level (วินาที)
+LEVEL_BUNDLE_CACHE_TIMEOUT = int(os.environ.get('LEVEL_BUNDLE_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# Write-behind สำหรับ QuestionAttempt: เก็บผลไว้ในคิวแล้วให้ `python manage.py flush_attempts --loop` เขียนลงฐานข้อมูล
+# เมื่อเปิดใช้ต้องรัน worker นี้ด้วยเสมอ ถ้าคิวค้างเกิน ATTEMPT_WRITE_BEHIND_MAX_LAG วินาที จะหยุดเข้าคิว
+# และเขียนผลของ request นั้น (พร้อมคิวเดิมของผู้ใช้คนนั้น) ลงฐานข้อมูลทันที ส่วนคิวของผู้ใช้อื่น
+# request จะช่วย flush แค่ส่วนเล็กๆ (progress.ingest.INLINE_FLUSH_LIMIT) ที่เหลือรอ worker
+ATTEMPT_WRITE_BEHIND = os.environ.get('ATTEMPT_WRITE_BEHIND', 'False') == 'True'
+ATTEMPT_WRITE_BEHIND_MAX_LAG = int(os.environ.get('ATTEMPT_WRITE_BEHIND_MAX_LAG', 30))
+
+# ผลแบบ offline ที่ส่งผ่าน /api/progress/sync/ ต้องทำไม่เกินกี่วันก่อนส่ง (completed_at ที่เก่ากว่านี้ถูกปฏิเสธ)
+ATTEMPT_SYNC_MAX_AGE_DAYS = int(os.environ.get('ATTEMPT_SYNC_MAX_AGE_DAYS', 7))
+
+# จำนวนวันที่เก็บ QuestionAttempt แบบรายข้อไว้ ที่เก่ากว่านี้ `python manage.py rollup_attempts` จะสรุปเป็นรายวันแล้วลบทิ้ง
+ATTEMPT_RETENTION_DAYS = int(os.environ.get('ATTEMPT_RETENTION_DAYS', 180))
+
+# จำนวนอันดับที่แสดงใน /api/leaderboard/<level_id>/
+LEADERBOARD_SIZE = int(os.environ.get('LEADERBOARD_SIZE', 10))
+
+# ใช้ view แบบ async ของ endpoint ที่อ่านอย่างเดียว (levels, questions/level, vocabulary, user_levels)
+# ezan_project/asgi.py เปิดให้เองเมื่อรันด้วย uvicorn ใต้ gunicorn (WSGI) ควรปิดไว้
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
+# /api/vocabulary/ และ /api/questions/level/<id>/ อ่านด้วย values_list() แทน ModelSerializer (ดู api_data/lean.py)
+LEAN_SERIALIZERS = os.environ.get('LEAN_SERIALIZERS', 'True') == 'True'
+
+# ส่ง comment ทุกกี่วินาทีให้ connection ของ /progress/events/ ที่ว่างอยู่ไม่ถูก proxy ตัดทิ้ง
+LIVE_KEEPALIVE = int(os.environ.get('LIVE_KEEPALIVE', 25))
+
+# snapshot คำศัพท์ (ไฟล์ .json.gz ใน MEDIA_ROOT/snapshots/) สร้าง .msgpack.gz ด้วยถ้าเปิดไว้และติดตั้ง msgpack
+VOCABULARY_SNAPSHOT_MSGPACK = os.environ.get('VOCABULARY_SNAPSHOT_MSGPACK', 'False') == 'True'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -161,9 +207,27 @@ LOGIN_URL = 'login'
 # Media files (uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# อายุ cache ของไฟล์เสียงที่ชื่อไม่มี hash (วินาที) หลังจากนั้น browser ตรวจซ้ำด้วย ETag
+MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', 60 * 60 * 24))
+# ให้ front proxy ส่งไฟล์ media แทน Django: 'nginx' (X-Accel-Redirect ไปที่ MEDIA_ACCEL_PREFIX
+# ซึ่งต้องตั้งเป็น internal location ที่ชี้ไป MEDIA_ROOT) หรือ 'sendfile' (X-Sendfile)
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT') or None
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+# แปลงไฟล์เสียงที่อัปโหลดเป็น MP3 mono และปรับความดัง (ต้องมี ffmpeg/ffprobe ในเครื่อง)
+AUDIO_PROCESSING = os.environ.get('AUDIO_PROCESSING', 'True') == 'True'
+AUDIO_WORKERS = int(os.environ.get('AUDIO_WORKERS', 2))
+AUDIO_BITRATE = os.environ.get('AUDIO_BITRATE', '64k')
+FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = os.environ.get('FFPROBE_BINARY', 'ffprobe')
 
 #REST Framework Settings
 REST_FRAMEWORK = {
+    # encode JSON ด้วย orjson ถ้าติดตั้งไว้ (ดู api_data/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api_data.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'api_data.permissions.IsAuthenticatedAjaxOrAdmin',  
     ],
@@ -4,7 +4,7 @@ from django.urls import path,include
 from django.urls import include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.static import serve
+from api_data.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -16,7 +16,8 @@ urlpatterns = [
     path('social-auth/', include('social_django.urls', namespace='social')),
     
     # เพิ่ม URL pattern สำหรับไฟล์ media ที่จะทำงานทั้งใน development และ production
-    path('media/<path:path>', serve, {'document_root': settings.MEDIA_ROOT}),
+    # (รองรับ Range/ETag และ X-Accel-Redirect ดู api_data/media.py)
+    path('media/<path:path>', serve_media, name='media'),
 ]
 
 # ยังคงใช้ static function สำหรับ development แต่จะไม่มีผลในโหมด production
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ezan_project.settings')
 
 application = get_wsgi_application()
+
+from api_data.cache import ensure_shared_cache  # noqa: E402
+
+ensure_shared_cache()
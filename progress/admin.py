@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProgress, QuestionAttempt
+from .models import UserProgress, QuestionAttempt, UserQuestionState, ReviewCard, LevelAttemptRollup, QuestionAttemptRollup
 
 @admin.register(UserProgress)
 class UserProgressAdmin(admin.ModelAdmin):
@@ -15,4 +15,30 @@ class UserProgressAdmin(admin.ModelAdmin):
 class QuestionAttemptAdmin(admin.ModelAdmin):
     list_display = ['user', 'question', 'is_correct', 'attempt_date']
     list_filter = ['user', 'is_correct', 'question__level']
-    search_fields = ['user__username', 'question__word']
\ No newline at end of file
+    search_fields = ['user__username', 'question__word']
+
+@admin.register(UserQuestionState)
+class UserQuestionStateAdmin(admin.ModelAdmin):
+    list_display = ['user', 'question', 'last_is_correct', 'attempt_count', 'correct_count', 'last_attempt_date']
+    list_filter = ['last_is_correct', 'question__level']
+    search_fields = ['user__username', 'question__word']
+
+
+@admin.register(ReviewCard)
+class ReviewCardAdmin(admin.ModelAdmin):
+    list_display = ['user', 'question', 'ease_factor', 'interval_days', 'repetitions', 'due_at']
+    list_filter = ['question__level']
+    search_fields = ['user__username', 'question__word']
+
+
+@admin.register(LevelAttemptRollup)
+class LevelAttemptRollupAdmin(admin.ModelAdmin):
+    list_display = ['user', 'level', 'date', 'attempts', 'correct']
+    list_filter = ['level', 'date']
+    search_fields = ['user__username']
+
+@admin.register(QuestionAttemptRollup)
+class QuestionAttemptRollupAdmin(admin.ModelAdmin):
+    list_display = ['question', 'date', 'attempts', 'correct']
+    list_filter = ['question__level', 'date']
+    search_fields = ['question__word']
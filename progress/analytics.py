@@ -0,0 +1,145 @@
+"""Question difficulty, distractor and pass-rate statistics.
+
+Attempts are streamed from QuestionAttempt in id order, starting after the
+stored watermark, and counted with NumPy in one vectorized pass per chunk.
+Only counters are stored, so each run adds the new attempts on top of the
+previous totals instead of recomputing everything.
+
+Ids are assigned when a row is inserted but the row only becomes visible when
+its transaction commits, so a quiz submission or write-behind flush can commit
+a lower id after a higher one was read. The watermark therefore only moves
+over attempts written more than ``SAFETY_LAG`` ago, and never past the first
+attempt that is still inside the lag.
+"""
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from api_data.models import Level, Question
+from .models import AnswerStats, LevelStats, QuestionAttempt, QuestionStats, StatsWatermark, UserProgress
+
+WATERMARK_NAME = 'question_stats'
+CHUNK_SIZE = 50000
+# Longer than any transaction that writes attempts
+SAFETY_LAG = timedelta(minutes=5)
+PASS_PERCENTAGE = 80
+CURVE_THRESHOLDS = np.arange(0, 101, 10)
+
+
+def count_by(keys, weights=None):
+    """Return (unique keys, totals per key) for an integer array"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=weights, minlength=len(unique))
+    return unique, totals.astype(np.int64)
+
+
+def add_counts(model, key_field, counts, fields):
+    """Add {key: (value, ...)} onto the matching stats rows, creating missing ones"""
+    existing = {getattr(obj, key_field): obj for obj in model.objects.filter(**{f'{key_field}__in': counts})}
+    new_rows = []
+    for key, values in counts.items():
+        obj = existing.get(key)
+        if obj is None:
+            new_rows.append(model(**{key_field: key}, **dict(zip(fields, values))))
+        else:
+            for field, value in zip(fields, values):
+                setattr(obj, field, getattr(obj, field) + value)
+    model.objects.bulk_update(existing.values(), fields)
+    model.objects.bulk_create(new_rows)
+
+
+def settled_attempts(after_id, lag=SAFETY_LAG):
+    """Attempts after ``after_id`` that no transaction still in flight can precede"""
+    cutoff = timezone.now() - lag
+    attempts = QuestionAttempt.objects.filter(id__gt=after_id)
+    recent = attempts.filter(created_at__gte=cutoff).aggregate(first=Min('id'))['first']
+    attempts = attempts.filter(created_at__lt=cutoff)
+    if recent is not None:
+        attempts = attempts.filter(id__lt=recent)
+    return attempts
+
+
+def update_attempt_stats(chunk_size=CHUNK_SIZE, lag=SAFETY_LAG):
+    """Fold settled attempts newer than the watermark into the stats tables; returns attempts processed"""
+    watermark, _ = StatsWatermark.objects.get_or_create(name=WATERMARK_NAME)
+    # Array lookup question id -> level id (0 when the question has no level)
+    question_levels = np.array(
+        [(question_id, level_id or 0) for question_id, level_id in Question.objects.values_list('id', 'level_id')],
+        dtype=np.int64
+    ).reshape(-1, 2)
+    level_lookup = np.zeros(int(question_levels[:, 0].max(initial=0)) + 1, dtype=np.int64)
+    level_lookup[question_levels[:, 0]] = question_levels[:, 1]
+    rows = (
+        settled_attempts(watermark.last_attempt_id, lag)
+        .order_by('id')
+        .values_list('id', 'question_id', 'answer_id', 'is_correct')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    processed = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        data = np.array(chunk, dtype=np.int64)
+        attempt_ids, question_ids, answer_ids, correct = data.T
+
+        questions, question_attempts = count_by(question_ids)
+        _, question_correct = count_by(question_ids, weights=correct)
+        answers, answer_chosen = count_by(answer_ids)
+
+        known = question_ids < len(level_lookup)
+        level_ids = np.where(known, level_lookup[np.where(known, question_ids, 0)], 0)
+        levels, level_attempts = count_by(level_ids)
+        _, level_correct = count_by(level_ids, weights=correct)
+
+        with transaction.atomic():
+            add_counts(QuestionStats, 'question_id', {
+                int(q): (int(a), int(c)) for q, a, c in zip(questions, question_attempts, question_correct)
+            }, ['attempts', 'correct'])
+            add_counts(AnswerStats, 'answer_id', {
+                int(a): (int(n),) for a, n in zip(answers, answer_chosen)
+            }, ['times_chosen'])
+            add_counts(LevelStats, 'level_id', {
+                int(l): (int(a), int(c)) for l, a, c in zip(levels, level_attempts, level_correct) if l
+            }, ['attempts', 'correct'])
+            watermark.last_attempt_id = int(attempt_ids.max())
+            watermark.save()
+        processed += len(chunk)
+    return processed
+
+
+def update_pass_curves():
+    """Recompute per-level pass rates from each learner's latest score (one row per learner and level)"""
+    rows = np.array(
+        list(UserProgress.objects.filter(is_completed=True, max_score__gt=0)
+             .order_by().values_list('level_id', 'score', 'max_score')),
+        dtype=np.float64
+    ).reshape(-1, 3)
+    level_ids = rows[:, 0].astype(np.int64)
+    percentages = rows[:, 1] / rows[:, 2] * 100
+
+    with transaction.atomic():
+        for level_id in Level.objects.values_list('id', flat=True):
+            scores = percentages[level_ids == level_id]
+            stats, _ = LevelStats.objects.get_or_create(level_id=level_id)
+            stats.learners = len(scores)
+            if len(scores):
+                # Compare every score with every threshold at once
+                curve = (scores[:, None] >= CURVE_THRESHOLDS[None, :]).mean(axis=0) * 100
+                stats.pass_curve = [round(float(value), 1) for value in curve]
+                stats.pass_rate = float((scores >= PASS_PERCENTAGE).mean() * 100)
+            else:
+                stats.pass_curve = []
+                stats.pass_rate = 0
+            stats.save()
+
+
+def update_stats(chunk_size=CHUNK_SIZE, lag=SAFETY_LAG):
+    processed = update_attempt_stats(chunk_size, lag)
+    update_pass_curves()
+    return processed
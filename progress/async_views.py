@@ -0,0 +1,45 @@
+"""Async version of ``/api/progress/user_levels/`` (routed when ``ASYNC_VIEWS`` is on).
+
+Same payload and cache entry as ``UserProgressViewSet.user_levels``; the two
+queries go through the async ORM so a uvicorn worker keeps serving other
+requests while they run. Anything but GET/HEAD goes to the DRF view.
+"""
+import logging
+
+from django.core.cache import cache
+from django.views.decorators.csrf import csrf_exempt
+
+from api_data.async_views import READ_METHODS, authorize, delegate, json_response
+from api_data.cache import aget_content_version
+from api_data.models import Level
+from .cache import USER_LEVELS_TIMEOUT, user_levels_key
+from .models import UserProgress
+from .views import UserProgressViewSet, build_user_levels
+
+logger = logging.getLogger(__name__)
+
+user_levels_fallback = delegate(UserProgressViewSet.as_view({'get': 'user_levels'}))
+
+
+@csrf_exempt
+async def user_levels(request):
+    """Get all levels with user progress information"""
+    if request.method not in READ_METHODS:
+        return await user_levels_fallback(request)
+    denied = await authorize(request, ajax=False)
+    if denied:
+        return denied
+    user = await request.auser()
+
+    cache_key = user_levels_key(user.id, await aget_content_version())
+    result = await cache.aget(cache_key)
+    if result is None:
+        levels = [level async for level in Level.objects.order_by('number')]
+        progress_by_level = {
+            progress.level_id: progress
+            async for progress in UserProgress.objects.filter(user=user).order_by()
+        }
+        result = build_user_levels(levels, progress_by_level)
+        await cache.aset(cache_key, result, USER_LEVELS_TIMEOUT)
+        logger.info(f"Returning data for {len(result)} levels")
+    return json_response(result)
@@ -0,0 +1,16 @@
+from django.core.cache import cache
+
+from api_data.cache import get_content_version
+
+USER_LEVELS_TIMEOUT = 60 * 60
+
+
+def user_levels_key(user_id, version=None):
+    """cache key ของข้อมูล level ต่อผู้ใช้ (ผูกกับ version ของเนื้อหาด้วย)"""
+    if version is None:
+        version = get_content_version()
+    return f'progress:user_levels:{user_id}:{version}'
+
+
+def invalidate_user_levels(user_id):
+    cache.delete(user_levels_key(user_id))
@@ -0,0 +1,90 @@
+"""Streaming CSV / NDJSON export of attempts, progress and scores.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` and written
+one line at a time, so memory stays flat no matter how large the table is.
+Used by ``export_view`` and ``manage.py export_data``.
+"""
+import csv
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from api_data.models import Score
+from .models import QuestionAttempt, UserProgress
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'ndjson')
+
+# name: (model, columns, level field, user field, date field)
+EXPORTS = {
+    'attempts': (
+        QuestionAttempt,
+        ['id', 'user__username', 'question_id', 'question__word', 'question__level__number',
+         'answer_id', 'is_correct', 'attempt_date'],
+        'question__level_id', 'user__username', 'attempt_date',
+    ),
+    'progress': (
+        UserProgress,
+        ['id', 'user__username', 'level_id', 'level__number', 'is_completed', 'is_unlocked',
+         'score', 'max_score', 'completion_date'],
+        'level_id', 'user__username', 'completion_date',
+    ),
+    'scores': (
+        Score,
+        ['id', 'player_name', 'level_id', 'level__number', 'score', 'max_score', 'created_at'],
+        'level_id', 'player_name', 'created_at',
+    ),
+}
+
+
+def parse_bound(value):
+    """Accept a date (YYYY-MM-DD) or a full ISO datetime"""
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value) or parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value}")
+    if isinstance(parsed, datetime) and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_rows(name, level=None, user=None, since=None, until=None):
+    """Return (columns, row iterator) for one export; filters are optional"""
+    model, columns, level_field, user_field, date_field = EXPORTS[name]
+    queryset = model.objects.all()
+    if level:
+        queryset = queryset.filter(**{level_field: level})
+    if user:
+        queryset = queryset.filter(**{user_field: user})
+    for bound, operator in ((parse_bound(since), 'gte'), (parse_bound(until), 'lte')):
+        if bound:
+            # Plain dates compare against the calendar day, so until=2025-03-01 includes that day
+            lookup = date_field if isinstance(bound, datetime) else f'{date_field}__date'
+            queryset = queryset.filter(**{f'{lookup}__{operator}': bound})
+    rows = queryset.order_by('id').values_list(*columns).iterator(chunk_size=CHUNK_SIZE)
+    return columns, rows
+
+
+class Echo:
+    """File-like object that hands back what is written (for csv.writer)"""
+    def write(self, value):
+        return value
+
+
+def render_lines(columns, rows, fmt):
+    """Yield the export one line at a time"""
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
@@ -0,0 +1,150 @@
+"""Grading quiz answers and recording the result, shared by submit_quiz and sync."""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api_data.models import Answer, Level
+from .ingest import enqueue_attempts
+from .live import publish_on_commit, user_group
+from .models import QuestionAttempt, QuizSubmission, UserProgress
+
+logger = logging.getLogger(__name__)
+
+
+def parse_answers(answers):
+    """Turn [{'question_id': .., 'answer_id': ..}, ...] into (question_id, answer_id) pairs"""
+    submitted = []
+    for answer_data in answers:
+        try:
+            submitted.append((int(answer_data.get('question_id')), int(answer_data.get('answer_id'))))
+        except (AttributeError, TypeError, ValueError):
+            logger.warning(f"Skipping invalid answer data: {answer_data}")
+    return submitted
+
+
+def load_answers(answer_ids):
+    """Fetch {answer_id: (question_id, level_id, is_correct)} with one IN query"""
+    return {
+        answer_id: (question_id, level_id, is_correct)
+        for answer_id, question_id, level_id, is_correct in Answer.objects.filter(
+            id__in=answer_ids
+        ).values_list('id', 'question_id', 'question__level_id', 'is_correct')
+    }
+
+
+def invalid_answers(level, submitted, answers):
+    """Pairs whose answer does not exist or does not belong to the question and level"""
+    return [
+        {'question_id': question_id, 'answer_id': answer_id}
+        for question_id, answer_id in submitted
+        if answers.get(answer_id, (None, None))[:2] != (question_id, level.id)
+    ]
+
+
+def sync_window_start(now=None):
+    """Earliest ``completed_at`` accepted for a quiz taken offline"""
+    days = getattr(settings, 'ATTEMPT_SYNC_MAX_AGE_DAYS', 7)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def clamp_completed_at(completed_at):
+    """Keep a client-supplied completion time between the sync window start and now"""
+    now = timezone.now()
+    if completed_at is None:
+        return now
+    return min(max(completed_at, sync_window_start(now)), now)
+
+
+def record_quiz(user, level, submitted, answers, max_score, idempotency_key=None, completed_at=None):
+    """Save one graded quiz and update progress, unlocking the next level on a pass
+
+    Returns (progress, attempts, queued, duplicate). ``duplicate`` is True when
+    ``idempotency_key`` was already used; nothing is written in that case.
+    ``completed_at`` is the client time for quizzes taken offline; an offline
+    result older than the stored completion keeps its attempts but does not
+    overwrite the newer score. It is clamped to the sync window, so a backdated
+    payload cannot win leaderboard ties or slip behind the rollup cutoff.
+    """
+    completed_at = clamp_completed_at(completed_at)
+    with transaction.atomic():
+        # Get or create progress for this level
+        progress, created = UserProgress.objects.get_or_create(
+            user=user,
+            level=level,
+            defaults={'is_unlocked': True}  # New progress is unlocked by default
+        )
+        logger.debug(f"{'Created new' if created else 'Using existing'} progress record")
+
+        if idempotency_key:
+            submission, created = QuizSubmission.objects.get_or_create(
+                user=user,
+                idempotency_key=idempotency_key,
+                defaults={'progress': progress}
+            )
+            if not created:
+                return submission.progress, [], False, True
+
+        attempts = [
+            QuestionAttempt(
+                user=user,
+                progress=progress,
+                question_id=question_id,
+                answer_id=answer_id,
+                is_correct=answers[answer_id][2],
+                attempt_date=completed_at
+            )
+            for question_id, answer_id in submitted
+        ]
+        queued = enqueue_attempts(user, progress, attempts)
+        correct_count = sum(1 for attempt in attempts if attempt.is_correct)
+        logger.debug(f"{'Queued' if queued else 'Recorded'} {len(attempts)} attempts, {correct_count} correct")
+
+        if progress.completion_date and completed_at < progress.completion_date:
+            logger.info("Offline result is older than the stored progress, score left unchanged")
+            return progress, attempts, queued, False
+
+        # Update progress
+        progress.score = correct_count
+        progress.max_score = max_score
+
+        # Mark as completed if attempted
+        if max_score > 0:
+            progress.is_completed = True
+            progress.completion_date = completed_at
+
+        progress.save()
+        logger.info(f"Updated progress: score={correct_count}/{max_score} ({progress.percentage_score:.1f}%)")
+        publish_on_commit(user_group(user.id), 'progress', {
+            'level_id': level.id, 'score': progress.score, 'max_score': progress.max_score,
+            'is_completed': progress.is_completed,
+        })
+
+        # Unlock next level if passed (80% or higher)
+        if progress.has_passed:
+            next_level = Level.objects.filter(number=level.number + 1).first()
+            if next_level:
+                logger.info(f"Unlocking next level: {next_level.name} (Level {next_level.number})")
+                next_progress, created = UserProgress.objects.get_or_create(
+                    user=user,
+                    level=next_level,
+                    defaults={'is_unlocked': True}
+                )
+                newly_unlocked = created
+                if not next_progress.is_unlocked:
+                    next_progress.is_unlocked = True
+                    next_progress.save()
+                    newly_unlocked = True
+                    logger.info(f"Next level {next_level.number} unlocked")
+                if newly_unlocked:
+                    publish_on_commit(user_group(user.id), 'unlock', {
+                        'level_id': next_level.id, 'number': next_level.number,
+                    })
+            else:
+                logger.info("No next level to unlock")
+        else:
+            logger.info(f"Level not passed ({progress.percentage_score:.1f}%), no next level unlocked")
+
+    return progress, attempts, queued, False
@@ -0,0 +1,167 @@
+"""Writing graded quiz attempts, either straight away or through the write-behind queue.
+
+With ``ATTEMPT_WRITE_BEHIND`` enabled, submit_quiz stores each graded quiz as
+one ``PendingAttemptBatch`` row and answers from the in-memory grading result.
+``manage.py flush_attempts`` turns the queued batches into ``QuestionAttempt``
+rows in large ``bulk_create`` calls.
+
+The guarantee is that nothing is queued behind a stale queue: once the oldest
+batch is more than ``ATTEMPT_WRITE_BEHIND_MAX_LAG`` seconds old, submissions
+stop queueing and write synchronously, after first writing that user's own
+queued batches. A learner's attempts therefore reach ``QuestionAttempt`` no
+later than their next submission after the bound passes, even with the worker
+down. Each such submission also drains at most ``INLINE_FLUSH_LIMIT`` queued
+attempts of other users; draining the backlog of learners who do not come back
+is left to the worker, which must run whenever write-behind is enabled.
+
+Every writer of a user's attempts, question states and review cards first
+row-locks that user (``lock_user``). A flusher only takes batches of users it
+could lock, so one user's batches are applied by one flusher at a time and
+always in id order, and the state rows are never rewritten concurrently.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import PendingAttemptBatch, QuestionAttempt, ReviewCard, UserQuestionState
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 1000
+# Cap on the flush a lagging submission does inside its own request
+INLINE_FLUSH_LIMIT = 200
+INLINE_FLUSH_BATCH_SIZE = 20
+
+
+def write_behind_enabled():
+    return getattr(settings, 'ATTEMPT_WRITE_BEHIND', False)
+
+
+def lock_user(user_id):
+    """Row-lock the user until the end of the transaction (serializes writers of their attempts)"""
+    list(User.objects.select_for_update().filter(pk=user_id).values_list('pk', flat=True))
+
+
+def write_attempts(user, attempts):
+    """Save attempts (oldest first) and fold them into the per-question tables"""
+    lock_user(user.pk)
+    QuestionAttempt.objects.bulk_create(attempts)
+    UserQuestionState.record_attempts(user, attempts)
+    ReviewCard.record_attempts(user, attempts)
+
+
+def queue_max_lag():
+    return getattr(settings, 'ATTEMPT_WRITE_BEHIND_MAX_LAG', 30)
+
+
+def queue_lagging():
+    """True when the oldest queued batch is older than ``ATTEMPT_WRITE_BEHIND_MAX_LAG``"""
+    cutoff = timezone.now() - timedelta(seconds=queue_max_lag())
+    return PendingAttemptBatch.objects.filter(created_at__lte=cutoff).exists()
+
+
+def enqueue_attempts(user, progress, attempts):
+    """Queue graded attempts for the worker; falls back to a synchronous write
+
+    The write is synchronous when queueing fails or the queue is lagging.
+    Returns True if the attempts were queued, False if they were written now.
+    """
+    if write_behind_enabled():
+        try:
+            with transaction.atomic():
+                # Keeps a user's batch ids in the order their submissions commit
+                lock_user(user.pk)
+                if queue_lagging():
+                    logger.warning(f"Attempt queue is more than {queue_max_lag()}s behind, writing synchronously; "
+                                   "is the flush_attempts worker running?")
+                    # This user's older queued attempts go first so they stay in order
+                    write_batches(list(
+                        PendingAttemptBatch.objects.filter(user=user).select_related('user').order_by('id')
+                    ))
+                    write_attempts(user, attempts)
+                    return False
+                PendingAttemptBatch.objects.create(
+                    user=user,
+                    progress=progress,
+                    attempts=[
+                        [attempt.question_id, attempt.answer_id, attempt.is_correct,
+                         attempt.attempt_date.isoformat()]
+                        for attempt in attempts
+                    ]
+                )
+            return True
+        except DatabaseError:
+            logger.warning("Could not queue attempts, writing them synchronously", exc_info=True)
+    write_attempts(user, attempts)
+    return False
+
+
+def write_batches(batches, batch_size=FLUSH_BATCH_SIZE):
+    """Write queued batches (in id order, their users already locked); returns the number of attempts"""
+    attempts_by_user = defaultdict(list)
+    users = {}
+    for batch in batches:
+        users[batch.user_id] = batch.user
+        for question_id, answer_id, is_correct, attempt_date in batch.attempts:
+            attempts_by_user[batch.user_id].append(QuestionAttempt(
+                user_id=batch.user_id,
+                progress_id=batch.progress_id,
+                question_id=question_id,
+                answer_id=answer_id,
+                is_correct=is_correct,
+                attempt_date=parse_datetime(attempt_date)
+            ))
+
+    all_attempts = [attempt for attempts in attempts_by_user.values() for attempt in attempts]
+    QuestionAttempt.objects.bulk_create(all_attempts, batch_size=batch_size)
+    for user_id, attempts in attempts_by_user.items():
+        UserQuestionState.record_attempts(users[user_id], attempts)
+        ReviewCard.record_attempts(users[user_id], attempts)
+
+    PendingAttemptBatch.objects.filter(id__in=[batch.id for batch in batches]).delete()
+    return len(all_attempts)
+
+
+def flush_pending_attempts(limit=None, batch_size=FLUSH_BATCH_SIZE):
+    """Move queued attempts into QuestionAttempt; returns the number of attempts written"""
+    written = 0
+    while limit is None or written < limit:
+        with transaction.atomic():
+            # Users of the oldest batches, minus those another flusher or a submission holds
+            candidates = set(PendingAttemptBatch.objects.order_by('id').values_list('user_id', flat=True)[:batch_size])
+            user_ids = list(
+                User.objects.select_for_update(skip_locked=True)
+                .filter(pk__in=candidates).order_by('pk').values_list('pk', flat=True)
+            )
+            batches = list(
+                PendingAttemptBatch.objects.filter(user_id__in=user_ids)
+                .select_related('user').order_by('id')[:batch_size]
+            )
+            if not batches:
+                break
+            written += write_batches(batches, batch_size)
+    if written:
+        logger.info(f"Flushed {written} queued attempts")
+    return written
+
+
+def flush_if_lagging(limit=None):
+    """Flush the oldest queued attempts inline when the queue is older than the lag bound
+
+    Writes roughly ``limit`` (default ``INLINE_FLUSH_LIMIT``) attempts, whole submissions
+    ``INLINE_FLUSH_BATCH_SIZE`` at a time, and leaves the rest to the ``flush_attempts`` worker.
+    Database errors are logged, never raised.
+    """
+    if queue_lagging():
+        logger.warning(f"Attempt queue is more than {queue_max_lag()}s behind, flushing inline")
+        try:
+            flush_pending_attempts(limit=limit or INLINE_FLUSH_LIMIT, batch_size=INLINE_FLUSH_BATCH_SIZE)
+        except DatabaseError:
+            # The caller's quiz is already recorded; failing its request would make the client resend it
+            logger.warning("Inline flush of queued attempts failed", exc_info=True)
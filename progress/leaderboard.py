@@ -0,0 +1,161 @@
+"""Per-level leaderboards kept up to date on every result write.
+
+LeaderboardEntry holds the best score of each player per level. Every
+UserProgress or Score save folds its result in with a conditional UPDATE, so
+nothing is ever re-sorted. The top K rows of a level are read from the
+(level, -score, achieved_at) index and cached; the cache is only refreshed
+when a write can change it, and each refresh is pushed to live clients
+(see progress.live). A player's rank is one indexed COUNT of the entries
+ahead of them.
+
+``manage.py rebuild_leaderboard`` recomputes the entries from UserProgress
+and Score (needed after deleting scores, which are not tracked here).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .live import channel, leaderboard_group
+from .models import LeaderboardEntry
+
+TOP_FIELDS = ['player', 'display_name', 'score', 'max_score', 'achieved_at']
+TOP_TIMEOUT = 60 * 60 * 24
+
+
+def leaderboard_size():
+    return getattr(settings, 'LEADERBOARD_SIZE', 10)
+
+
+def user_player(user_id):
+    return f'user:{user_id}'
+
+
+def name_player(player_name):
+    return f'name:{player_name.strip()[:100]}'
+
+
+def top_key(level_id):
+    return f'progress:leaderboard:{level_id}'
+
+
+def load_top(level_id):
+    """The K best entries of a level, read from the rank index"""
+    rows = list(
+        LeaderboardEntry.objects.filter(level_id=level_id)
+        .order_by('-score', 'achieved_at', 'id')
+        .values(*TOP_FIELDS)[:leaderboard_size()]
+    )
+    for rank, row in enumerate(rows, 1):
+        row['rank'] = rank
+    return rows
+
+
+def top_entries(level_id):
+    rows = cache.get(top_key(level_id))
+    if rows is None:
+        rows = load_top(level_id)
+        cache.set(top_key(level_id), rows, TOP_TIMEOUT)
+    return rows
+
+
+def public_rows(rows):
+    """Top rows without the internal player key"""
+    return [{key: value for key, value in row.items() if key != 'player'} for row in rows]
+
+
+def refresh_top(level_id):
+    rows = load_top(level_id)
+    cache.set(top_key(level_id), rows, TOP_TIMEOUT)
+    channel.publish(leaderboard_group(level_id), 'leaderboard', {'level': level_id, 'top': public_rows(rows)})
+
+
+def affects_top(level_id, player, score):
+    """Whether a new best score can change the cached top K"""
+    rows = cache.get(top_key(level_id))
+    if rows is None:
+        # Nothing cached to fix up; refresh only to notify live subscribers
+        return channel.subscriber_count(leaderboard_group(level_id)) > 0
+    if len(rows) < leaderboard_size() or any(row['player'] == player for row in rows):
+        return True
+    return score >= rows[-1]['score']
+
+
+def record_result(level_id, player, display_name, score, max_score, achieved_at, user_id=None):
+    """Keep the player's best score for the level; returns True if the entry changed"""
+    values = {'display_name': display_name, 'score': score, 'max_score': max_score, 'achieved_at': achieved_at}
+    updated = LeaderboardEntry.objects.filter(
+        level_id=level_id, player=player, score__lt=score
+    ).update(**values)
+    if not updated:
+        try:
+            with transaction.atomic():
+                _, created = LeaderboardEntry.objects.get_or_create(
+                    level_id=level_id, player=player, defaults={'user_id': user_id, **values}
+                )
+        except IntegrityError:
+            # A concurrent write for the same player won the insert
+            return record_result(level_id, player, display_name, score, max_score, achieved_at, user_id)
+        if not created:
+            return False
+    if affects_top(level_id, player, score):
+        transaction.on_commit(lambda: refresh_top(level_id))
+    return True
+
+
+def remove_player(level_id, player):
+    deleted, _ = LeaderboardEntry.objects.filter(level_id=level_id, player=player).delete()
+    if deleted:
+        transaction.on_commit(lambda: refresh_top(level_id))
+
+
+def player_rank(level_id, player):
+    """The player's entry with its rank, counted from the index (None if not ranked)"""
+    entry = LeaderboardEntry.objects.filter(level_id=level_id, player=player).values(*TOP_FIELDS).first()
+    if entry is None:
+        return None
+    ahead = LeaderboardEntry.objects.filter(level_id=level_id).filter(
+        Q(score__gt=entry['score']) | Q(score=entry['score'], achieved_at__lt=entry['achieved_at'])
+    ).count()
+    entry['rank'] = ahead + 1
+    return entry
+
+
+def rebuild_leaderboard(level_ids=None):
+    """Recompute entries from UserProgress and Score; returns the number of entries"""
+    from api_data.models import Score
+    from .models import UserProgress
+
+    progress = UserProgress.objects.filter(is_completed=True, max_score__gt=0, completion_date__isnull=False)
+    scores = Score.objects.exclude(player_name__isnull=True).exclude(player_name='')
+    entries = LeaderboardEntry.objects.all()
+    if level_ids is not None:
+        progress = progress.filter(level_id__in=level_ids)
+        scores = scores.filter(level_id__in=level_ids)
+        entries = entries.filter(level_id__in=level_ids)
+
+    rows = {}
+    # UserProgress keeps only the latest result, so that is the user's best known score
+    for user_id, username, level_id, score, max_score, completed in progress.values_list(
+            'user_id', 'user__username', 'level_id', 'score', 'max_score', 'completion_date').iterator():
+        rows[level_id, user_player(user_id)] = LeaderboardEntry(
+            level_id=level_id, player=user_player(user_id), user_id=user_id, display_name=username,
+            score=score, max_score=max_score, achieved_at=completed,
+        )
+    # Highest score first, earliest first within a score: the first row per player wins
+    for level_id, player_name, score, max_score, created in scores.order_by(
+            'level_id', '-score', 'created_at').values_list(
+            'level_id', 'player_name', 'score', 'max_score', 'created_at').iterator():
+        key = (level_id, name_player(player_name))
+        if key not in rows:
+            rows[key] = LeaderboardEntry(
+                level_id=level_id, player=key[1], display_name=player_name.strip()[:150],
+                score=score, max_score=max_score, achieved_at=created,
+            )
+
+    with transaction.atomic():
+        level_ids = set(entries.values_list('level_id', flat=True).distinct()) | {key[0] for key in rows}
+        entries.delete()
+        LeaderboardEntry.objects.bulk_create(rows.values(), batch_size=1000)
+    cache.delete_many([top_key(level_id) for level_id in level_ids])
+    return len(rows)
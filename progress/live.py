@@ -0,0 +1,149 @@
+"""Push leaderboard changes and level unlocks to browsers with server-sent events.
+
+Under ASGI, ``/progress/events/`` keeps one streaming response open per
+browser tab. Each connection is a suspended coroutine waiting on an
+``asyncio.Queue``, so an idle client costs a few kilobytes and a keepalive
+comment every ``LIVE_KEEPALIVE`` seconds instead of a poll request.
+
+Events are published through ``channel``, an in-process pub/sub: sync code
+(views, signals, grading) calls ``publish_on_commit`` and the message is
+handed to each subscriber's event loop with ``call_soon_threadsafe``. The
+channel only reaches connections served by the same process, so the ASGI
+profile (``Procfile.asgi``) runs a single uvicorn worker; scaling it out
+needs a shared broker (e.g. Redis pub/sub) behind ``Channel`` first. Under
+WSGI the endpoint answers 204 and clients keep polling.
+
+Leaderboard groups carry usernames, which ``/api/leaderboard/`` only shows
+to signed-in users, so anonymous clients asking for them get 403.
+"""
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+
+QUEUE_SIZE = 100
+MAX_LEVELS = 20
+RETRY_MS = 5000
+
+
+def keepalive_seconds():
+    return getattr(settings, 'LIVE_KEEPALIVE', 25)
+
+
+def user_group(user_id):
+    return f'user:{user_id}'
+
+
+def leaderboard_group(level_id):
+    return f'leaderboard:{level_id}'
+
+
+class Channel:
+    """In-process pub/sub: groups of asyncio queues that any thread can publish to"""
+
+    def __init__(self):
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, groups):
+        """Yield a queue receiving (event, data) for every message published to ``groups``"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+        with self._lock:
+            for group in groups:
+                self._groups.setdefault(group, set()).add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                for group in groups:
+                    members = self._groups.get(group)
+                    if members is not None:
+                        members.discard(subscriber)
+                        if not members:
+                            del self._groups[group]
+
+    def publish(self, group, event, data):
+        with self._lock:
+            subscribers = list(self._groups.get(group, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, (event, data))
+            except RuntimeError:
+                # The subscriber's loop has closed; its cleanup will remove it
+                pass
+
+    def subscriber_count(self, group=None):
+        with self._lock:
+            if group is not None:
+                return len(self._groups.get(group, ()))
+            return len({subscriber for members in self._groups.values() for subscriber in members})
+
+
+def _deliver(queue, message):
+    if queue.full():
+        # A client too slow to keep up loses its oldest events, not the newest
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+channel = Channel()
+
+
+def publish_on_commit(group, event, data):
+    """Publish once the current transaction commits (immediately outside one)"""
+    transaction.on_commit(lambda: channel.publish(group, event, data))
+
+
+def format_event(event, data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f'event: {event}\ndata: {payload}\n\n'
+
+
+def parse_levels(value):
+    levels = []
+    for part in (value or '').split(',')[:MAX_LEVELS]:
+        if part.strip().isdigit():
+            levels.append(int(part))
+    return levels
+
+
+async def event_stream(groups):
+    async with channel.subscribe(groups) as queue:
+        yield f'retry: {RETRY_MS}\n\n'
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), keepalive_seconds())
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event, data)
+
+
+async def events_view(request):
+    """``GET /progress/events/?levels=1,2``: unlocks for the signed-in user and leaderboard updates"""
+    if not isinstance(request, ASGIRequest):
+        # Streaming would hold a WSGI worker forever; 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    groups = [leaderboard_group(level_id) for level_id in parse_levels(request.GET.get('levels'))]
+    if groups and not user.is_authenticated:
+        return HttpResponseForbidden()
+    if user.is_authenticated:
+        groups.append(user_group(user.id))
+    if not groups:
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(event_stream(groups), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx would otherwise buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
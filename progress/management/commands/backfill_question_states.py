@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from progress.models import QuestionAttempt, UserQuestionState
+
+
+class Command(BaseCommand):
+    help = 'Rebuild UserQuestionState rows from the existing QuestionAttempt history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of state rows written per bulk_create')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        attempts = (
+            QuestionAttempt.objects
+            .order_by('user_id', 'question_id', 'attempt_date', 'id')
+            .values_list('user_id', 'question_id', 'answer_id', 'is_correct', 'attempt_date')
+        )
+
+        created = 0
+        batch = []
+        state = None
+        with transaction.atomic():
+            UserQuestionState.objects.all().delete()
+            # Attempts arrive grouped by (user, question) and oldest first, so
+            # each group folds into one state row in a single streaming pass
+            for user_id, question_id, answer_id, is_correct, attempt_date in attempts.iterator(chunk_size=batch_size):
+                if state is None or (state.user_id, state.question_id) != (user_id, question_id):
+                    if state is not None:
+                        batch.append(state)
+                    state = UserQuestionState(user_id=user_id, question_id=question_id)
+                    if len(batch) >= batch_size:
+                        UserQuestionState.objects.bulk_create(batch)
+                        created += len(batch)
+                        batch = []
+                state.last_answer_id = answer_id
+                state.last_is_correct = is_correct
+                state.last_attempt_date = attempt_date
+                state.attempt_count += 1
+                if is_correct:
+                    state.correct_count += 1
+            if state is not None:
+                batch.append(state)
+            UserQuestionState.objects.bulk_create(batch)
+            created += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Built {created} question states'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from progress.exports import EXPORTS, FORMATS, export_rows, render_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream attempts, progress or scores to CSV or NDJSON without loading the table into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--level', help='Level id')
+        parser.add_argument('--user', help='Username (player name for scores)')
+        parser.add_argument('--since', help='Start date or datetime (inclusive)')
+        parser.add_argument('--until', help='End date or datetime (inclusive)')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            columns, rows = export_rows(
+                options['name'],
+                level=options['level'],
+                user=options['user'],
+                since=options['since'],
+                until=options['until'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        lines = render_lines(columns, rows, options['format'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,39 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from progress.ingest import FLUSH_BATCH_SIZE, flush_pending_attempts
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Write queued quiz attempts (ATTEMPT_WRITE_BEHIND mode) into QuestionAttempt'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and flush every --interval seconds')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to wait between flushes in --loop mode')
+        parser.add_argument('--batch-size', type=int, default=FLUSH_BATCH_SIZE,
+                            help='Number of queued submissions handled per transaction')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                written = flush_pending_attempts(batch_size=options['batch_size'])
+            except DatabaseError:
+                if not options['loop']:
+                    raise
+                # A failed flush rolls back whole; keep the worker alive and retry next round
+                logger.exception("Flushing queued attempts failed, retrying")
+                close_old_connections()
+                time.sleep(options['interval'])
+                continue
+            if written or not options['loop']:
+                self.stdout.write(f'Flushed {written} attempts')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api_data.models import Level
+from progress.leaderboard import rebuild_leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-level leaderboards from UserProgress and Score'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--level', type=int, help='Only rebuild the leaderboard of this level number')
+
+    def handle(self, *args, **options):
+        level_ids = None
+        if options['level'] is not None:
+            level_ids = list(Level.objects.filter(number=options['level']).values_list('id', flat=True))
+            if not level_ids:
+                raise CommandError(f'Level {options["level"]} does not exist')
+        count = rebuild_leaderboard(level_ids)
+        self.stdout.write(self.style.SUCCESS(f'Built {count} leaderboard entries'))
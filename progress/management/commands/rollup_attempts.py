@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from progress.analytics import WATERMARK_NAME
+from progress.models import LevelAttemptRollup, QuestionAttempt, QuestionAttemptRollup, StatsWatermark
+
+
+def merge_rollups(model, key_fields, rows, existing):
+    """Add aggregated rows onto existing rollups, creating the missing ones"""
+    existing = {tuple(getattr(obj, field) for field in key_fields): obj for obj in existing}
+    new_rollups = []
+    for row in rows:
+        key = tuple(row[field] for field in key_fields)
+        rollup = existing.get(key)
+        if rollup is None:
+            new_rollups.append(model(attempts=row['attempts'], correct=row['correct'],
+                                     **dict(zip(key_fields, key))))
+        else:
+            rollup.attempts += row['attempts']
+            rollup.correct += row['correct']
+    model.objects.bulk_update(existing.values(), ['attempts', 'correct'])
+    model.objects.bulk_create(new_rollups)
+
+
+class Command(BaseCommand):
+    help = ('Roll QuestionAttempt rows older than the retention window into daily aggregates and delete them '
+            '(only rows already counted by update_question_stats)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int,
+                            default=getattr(settings, 'ATTEMPT_RETENTION_DAYS', 180),
+                            help='Keep raw attempts newer than this many days')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Number of attempts rolled up and deleted per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many attempts would be rolled up')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['retention_days'])
+        # Attempts the stats job has not read yet would be missing from AnswerStats once deleted
+        watermark = StatsWatermark.objects.filter(name=WATERMARK_NAME).values_list('last_attempt_id', flat=True)
+        watermark = watermark.first() or 0
+        expired = QuestionAttempt.objects.filter(attempt_date__lt=cutoff)
+        old_attempts = expired.filter(id__lte=watermark)
+        held_back = expired.filter(id__gt=watermark).count()
+        if held_back:
+            self.stdout.write(self.style.WARNING(
+                f'Keeping {held_back} old attempts not yet counted by update_question_stats; run it first'))
+
+        if options['dry_run']:
+            self.stdout.write(f'{old_attempts.count()} attempts older than {cutoff:%Y-%m-%d} would be rolled up')
+            return
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                ids = list(old_attempts.order_by('id').values_list('id', flat=True)[:options['chunk_size']])
+                if not ids:
+                    break
+                chunk = QuestionAttempt.objects.filter(id__in=ids).order_by().annotate(date=TruncDate('attempt_date'))
+                counts = {'attempts': Count('id'), 'correct': Count('id', filter=Q(is_correct=True))}
+
+                level_rows = list(chunk.values('user_id', 'question__level_id', 'date').annotate(**counts))
+                for row in level_rows:
+                    row['level_id'] = row.pop('question__level_id')
+                merge_rollups(
+                    LevelAttemptRollup, ['user_id', 'level_id', 'date'], level_rows,
+                    LevelAttemptRollup.objects.filter(
+                        user_id__in={row['user_id'] for row in level_rows},
+                        date__in={row['date'] for row in level_rows},
+                    )
+                )
+
+                question_rows = list(chunk.values('question_id', 'date').annotate(**counts))
+                merge_rollups(
+                    QuestionAttemptRollup, ['question_id', 'date'], question_rows,
+                    QuestionAttemptRollup.objects.filter(
+                        question_id__in={row['question_id'] for row in question_rows},
+                        date__in={row['date'] for row in question_rows},
+                    )
+                )
+
+                QuestionAttempt.objects.filter(id__in=ids).delete()
+                total += len(ids)
+            self.stdout.write(f'Rolled up {total} attempts')
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {total} attempts older than {cutoff:%Y-%m-%d} rolled up'))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from progress.models import ReviewCard, UserQuestionState
+
+
+class Command(BaseCommand):
+    help = 'Create spaced-repetition cards for questions users attempted before the scheduler existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of cards written per bulk_create')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        states = UserQuestionState.objects.values_list(
+            'user_id', 'question_id', 'last_is_correct', 'last_attempt_date'
+        )
+
+        created = 0
+        batch = []
+        for user_id, question_id, last_is_correct, last_attempt_date in states.iterator(chunk_size=batch_size):
+            card = ReviewCard(user_id=user_id, question_id=question_id, last_reviewed_at=last_attempt_date)
+            if last_is_correct:
+                card.repetitions = 1
+                card.interval_days = 1
+                card.due_at = last_attempt_date + timedelta(days=1)
+            else:
+                card.due_at = last_attempt_date
+            batch.append(card)
+            if len(batch) >= batch_size:
+                created += len(ReviewCard.objects.bulk_create(batch, ignore_conflicts=True))
+                batch = []
+        created += len(ReviewCard.objects.bulk_create(batch, ignore_conflicts=True))
+
+        self.stdout.write(self.style.SUCCESS(f'Seeded review cards for {created} question states'))
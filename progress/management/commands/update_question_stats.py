@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from progress.analytics import CHUNK_SIZE, SAFETY_LAG, update_stats
+
+
+class Command(BaseCommand):
+    help = 'Update question, answer and level statistics from attempts recorded since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Number of attempts loaded into memory per pass')
+        parser.add_argument('--lag', type=int, default=int(SAFETY_LAG.total_seconds()),
+                            help='Leave attempts written in the last N seconds for the next run')
+
+    def handle(self, *args, **options):
+        processed = update_stats(options['chunk_size'], timedelta(seconds=options['lag']))
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} new attempts'))
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data', '0005_keyset_pagination_indexes'),
+        ('progress', '0008_userprogress_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='questionattempt',
+            index=models.Index(fields=['user', '-attempt_date', '-id'], name='attempt_user_date_id'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data', '0009_score_level_index'),
+        ('progress', '0009_attempt_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('player', models.CharField(max_length=110)),
+                ('display_name', models.CharField(max_length=150)),
+                ('score', models.IntegerField()),
+                ('max_score', models.IntegerField()),
+                ('achieved_at', models.DateTimeField()),
+                ('level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='api_data.level')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['level', '-score', 'achieved_at'], name='leaderboard_level_rank')],
+                'unique_together': {('level', 'player')},
+            },
+        ),
+    ]
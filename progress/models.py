@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from api_data.models import Level, Question, Answer
 
@@ -10,10 +13,15 @@ class UserProgress(models.Model):
     score = models.IntegerField(default=0)
     max_score = models.IntegerField(default=0)
     completion_date = models.DateTimeField(null=True, blank=True)
+    # Used as the version for offline sync (see UserProgressViewSet.sync)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['user', 'level']
         ordering = ['level__number']
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='progress_user_updated'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - Level {self.level.number}"
@@ -35,10 +43,277 @@ class QuestionAttempt(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     answer = models.ForeignKey(Answer, on_delete=models.CASCADE)
     is_correct = models.BooleanField()
-    attempt_date = models.DateTimeField(auto_now_add=True)
+    # Set when the answer is graded (not when the row is written) so queued attempts keep their time
+    attempt_date = models.DateTimeField(default=timezone.now, editable=False)
+    # When the row was written; progress.analytics only reads attempts older than its safety lag
+    created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-attempt_date']
+        indexes = [
+            # Keyset pagination of /api/attempts/ (see AttemptPagination)
+            models.Index(fields=['user', '-attempt_date', '-id'], name='attempt_user_date_id'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - {self.question.word} - {'Correct' if self.is_correct else 'Incorrect'}"
\ No newline at end of file
+        return f"{self.user.username} - {self.question.word} - {'Correct' if self.is_correct else 'Incorrect'}"
+
+class QuizSubmission(models.Model):
+    """Remembers idempotency keys so a retried quiz submission is not recorded twice"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_submissions')
+    progress = models.ForeignKey(UserProgress, on_delete=models.CASCADE, related_name='submissions')
+    idempotency_key = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'idempotency_key']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.idempotency_key}"
+
+
+class UserQuestionState(models.Model):
+    """Latest attempt and counters per (user, question), kept in step with QuestionAttempt"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='question_states')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='user_states')
+    last_answer = models.ForeignKey(Answer, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_is_correct = models.BooleanField(default=False)
+    last_attempt_date = models.DateTimeField()
+    attempt_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'question']
+        indexes = [
+            models.Index(fields=['user', 'last_is_correct'], name='progress_state_user_correct'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.question.word} - {'Correct' if self.last_is_correct else 'Incorrect'}"
+
+    @classmethod
+    def record_attempts(cls, user, attempts):
+        """Fold newly saved attempts (oldest first) into the user's question states"""
+        if not attempts:
+            return
+        question_ids = {attempt.question_id for attempt in attempts}
+        states = {
+            state.question_id: state
+            for state in cls.objects.filter(user=user, question_id__in=question_ids)
+        }
+        new_states = {}
+        for attempt in attempts:
+            state = states.get(attempt.question_id) or new_states.get(attempt.question_id)
+            if state is None:
+                state = cls(user=user, question_id=attempt.question_id)
+                new_states[attempt.question_id] = state
+            state.last_answer_id = attempt.answer_id
+            state.last_is_correct = attempt.is_correct
+            state.last_attempt_date = attempt.attempt_date
+            state.attempt_count += 1
+            if attempt.is_correct:
+                state.correct_count += 1
+        if states:
+            cls.objects.bulk_update(
+                states.values(),
+                ['last_answer', 'last_is_correct', 'last_attempt_date', 'attempt_count', 'correct_count']
+            )
+        cls.objects.bulk_create(new_states.values())
+
+
+class ReviewCard(models.Model):
+    """SM-2 spaced-repetition schedule per (user, question)"""
+    MIN_EASE = 1.3
+    DEFAULT_EASE = 2.5
+    PASSING_QUALITY = 3
+    # Quality grades used when a quiz attempt or a flashcard answer feeds the schedule
+    QUALITY_CORRECT = 4
+    QUALITY_INCORRECT = 1
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_cards')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='review_cards')
+    ease_factor = models.FloatField(default=DEFAULT_EASE)
+    interval_days = models.PositiveIntegerField(default=0)
+    repetitions = models.PositiveIntegerField(default=0)
+    due_at = models.DateTimeField(default=timezone.now)
+    last_reviewed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['user', 'question']
+        ordering = ['due_at']
+        indexes = [
+            models.Index(fields=['user', 'due_at'], name='progress_card_user_due'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.question.word} - due {self.due_at:%Y-%m-%d}"
+
+    def review(self, quality, reviewed_at=None):
+        """Apply one SM-2 review with a quality grade from 0 (blackout) to 5 (perfect)"""
+        reviewed_at = reviewed_at or timezone.now()
+        if quality < self.PASSING_QUALITY:
+            # Forgotten cards restart and come back straight away
+            self.repetitions = 0
+            self.interval_days = 0
+        else:
+            self.repetitions += 1
+            if self.repetitions == 1:
+                self.interval_days = 1
+            elif self.repetitions == 2:
+                self.interval_days = 6
+            else:
+                self.interval_days = round(self.interval_days * self.ease_factor)
+        self.ease_factor = max(
+            self.MIN_EASE,
+            self.ease_factor + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        )
+        self.due_at = reviewed_at + timedelta(days=self.interval_days)
+        self.last_reviewed_at = reviewed_at
+
+    @classmethod
+    def record_attempts(cls, user, attempts):
+        """Schedule the questions of newly saved quiz attempts (oldest first)"""
+        if not attempts:
+            return
+        question_ids = {attempt.question_id for attempt in attempts}
+        cards = {
+            card.question_id: card
+            for card in cls.objects.filter(user=user, question_id__in=question_ids)
+        }
+        new_cards = {}
+        for attempt in attempts:
+            card = cards.get(attempt.question_id) or new_cards.get(attempt.question_id)
+            if card is None:
+                card = cls(user=user, question_id=attempt.question_id)
+                new_cards[attempt.question_id] = card
+            quality = cls.QUALITY_CORRECT if attempt.is_correct else cls.QUALITY_INCORRECT
+            card.review(quality, attempt.attempt_date)
+        if cards:
+            cls.objects.bulk_update(
+                cards.values(),
+                ['ease_factor', 'interval_days', 'repetitions', 'due_at', 'last_reviewed_at']
+            )
+        cls.objects.bulk_create(new_cards.values())
+
+
+class PendingAttemptBatch(models.Model):
+    """Graded quiz attempts waiting for the write-behind worker (see progress.ingest)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pending_attempt_batches')
+    progress = models.ForeignKey(UserProgress, on_delete=models.CASCADE, related_name='pending_attempt_batches')
+    # [[question_id, answer_id, is_correct, attempt_date (ISO 8601)], ...]
+    attempts = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.user.username} - {len(self.attempts)} attempts"
+
+
+class LevelAttemptRollup(models.Model):
+    """Daily attempt totals per (user, level) for attempts moved out of QuestionAttempt"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attempt_rollups')
+    level = models.ForeignKey(Level, on_delete=models.CASCADE, null=True, blank=True, related_name='attempt_rollups')
+    date = models.DateField()
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'level', 'date']
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.level} - {self.date}: {self.correct}/{self.attempts}"
+
+
+class QuestionAttemptRollup(models.Model):
+    """Daily attempt totals per question for attempts moved out of QuestionAttempt"""
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='attempt_rollups')
+    date = models.DateField()
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['question', 'date']
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.question.word} - {self.date}: {self.correct}/{self.attempts}"
+
+
+class StatsWatermark(models.Model):
+    """Last QuestionAttempt id folded into the analytics tables, per job"""
+    name = models.CharField(max_length=50, unique=True)
+    last_attempt_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_attempt_id}"
+
+
+class QuestionStats(models.Model):
+    """Answer statistics per question, maintained by progress.analytics"""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='stats')
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.question.word}: {self.correct}/{self.attempts}"
+
+    @property
+    def correct_rate(self):
+        if self.attempts == 0:
+            return 0
+        return (self.correct / self.attempts) * 100
+
+
+class AnswerStats(models.Model):
+    """How often each answer (including wrong distractors) was chosen"""
+    answer = models.OneToOneField(Answer, on_delete=models.CASCADE, related_name='stats')
+    times_chosen = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.answer}: {self.times_chosen}"
+
+
+class LevelStats(models.Model):
+    """Per-level totals and pass-rate curve, maintained by progress.analytics"""
+    level = models.OneToOneField(Level, on_delete=models.CASCADE, related_name='stats')
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    learners = models.PositiveIntegerField(default=0)
+    pass_rate = models.FloatField(default=0)
+    # Share of learners (%) whose latest score is at least 0%, 10%, ... 100%
+    pass_curve = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Level {self.level.number}: pass rate {self.pass_rate:.1f}%"
+
+
+class LeaderboardEntry(models.Model):
+    """Best score per player and level, maintained by progress.leaderboard
+
+    Players are signed-in users (from UserProgress) or the free-text
+    player name of a Score, so ``player`` is ``user:<id>`` or ``name:<name>``.
+    """
+    level = models.ForeignKey(Level, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    player = models.CharField(max_length=110)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='leaderboard_entries')
+    display_name = models.CharField(max_length=150)
+    score = models.IntegerField()
+    max_score = models.IntegerField()
+    # Ties rank whoever reached the score first higher
+    achieved_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['level', 'player']
+        indexes = [
+            # Top-K reads and rank counts for one level (see progress.leaderboard)
+            models.Index(fields=['level', '-score', 'achieved_at'], name='leaderboard_level_rank'),
+        ]
+
+    def __str__(self):
+        return f"Level {self.level_id} - {self.display_name}: {self.score}/{self.max_score}"
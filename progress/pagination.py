@@ -0,0 +1,12 @@
+from api_data.pagination import KeysetPagination
+
+
+class ProgressPagination(KeysetPagination):
+    # One row per level, served by the (user, level) unique index.
+    # review.js expects the full list, so pages are only used on request
+    ordering = ('level__number', 'id')
+    opt_in = True
+
+
+class AttemptPagination(KeysetPagination):
+    ordering = ('-attempt_date', '-id')
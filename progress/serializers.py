@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from .models import UserProgress, QuestionAttempt
+from .models import UserProgress, QuestionAttempt, ReviewCard, QuestionStats, LevelStats
+from api_data.mixins import DynamicFieldsMixin
 from api_data.serializers import LevelSerializer, QuestionSerializer
 
 
-class QuestionAttemptSerializer(serializers.ModelSerializer):
+class QuestionAttemptSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     question_details = QuestionSerializer(source='question', read_only=True)
+    # The nested question (with answers and level) is only sent with ?expand=question_details
+    expandable_fields = ['question_details']
 
     class Meta:
         model = QuestionAttempt
@@ -13,7 +16,7 @@ class QuestionAttemptSerializer(serializers.ModelSerializer):
         read_only_fields = ['attempt_date']
 
 
-class UserProgressSerializer(serializers.ModelSerializer):
+class UserProgressSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     level_details = LevelSerializer(source='level', read_only=True)
     percentage_score = serializers.FloatField(read_only=True)
     has_passed = serializers.BooleanField(read_only=True)
@@ -31,3 +34,49 @@ class UserProgressDetailSerializer(UserProgressSerializer):
 
     class Meta(UserProgressSerializer.Meta):
         fields = UserProgressSerializer.Meta.fields + ['question_attempts']
+
+
+class ReviewCardSerializer(serializers.ModelSerializer):
+    question_details = QuestionSerializer(source='question', read_only=True)
+
+    class Meta:
+        model = ReviewCard
+        fields = ['id', 'question', 'ease_factor', 'interval_days', 'repetitions',
+                  'due_at', 'last_reviewed_at', 'question_details']
+        read_only_fields = fields
+
+
+class QuestionStatsSerializer(serializers.ModelSerializer):
+    word = serializers.CharField(source='question.word', read_only=True)
+    level = serializers.IntegerField(source='question.level_id', read_only=True)
+    correct_rate = serializers.FloatField(read_only=True)
+    answers = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QuestionStats
+        fields = ['question', 'word', 'level', 'attempts', 'correct', 'correct_rate', 'answers', 'updated_at']
+        read_only_fields = fields
+
+    def get_answers(self, obj):
+        """How often each answer was chosen, so editors can spot weak distractors"""
+        result = []
+        for answer in obj.question.answers.all():
+            stats = getattr(answer, 'stats', None)
+            result.append({
+                'id': answer.id,
+                'thai_text': answer.thai_text,
+                'english_text': answer.english_text,
+                'is_correct': answer.is_correct,
+                'times_chosen': stats.times_chosen if stats else 0,
+            })
+        return result
+
+
+class LevelStatsSerializer(serializers.ModelSerializer):
+    level_details = LevelSerializer(source='level', read_only=True)
+
+    class Meta:
+        model = LevelStats
+        fields = ['level', 'attempts', 'correct', 'learners', 'pass_rate', 'pass_curve',
+                  'updated_at', 'level_details']
+        read_only_fields = fields
@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api_data.models import Score
+from .cache import invalidate_user_levels
+from .leaderboard import name_player, record_result, remove_player, user_player
+from .models import UserProgress
+
+
+@receiver([post_save, post_delete], sender=UserProgress)
+def invalidate_progress_caches(sender, instance, **kwargs):
+    """ล้าง cache ข้อมูล level ของผู้ใช้เมื่อ progress เปลี่ยน"""
+    user_id = instance.user_id
+    invalidate_user_levels(user_id)
+    # request อื่นที่อ่านระหว่าง transaction อาจ cache ข้อมูลก่อน commit ไว้ใหม่ จึงล้างอีกครั้งหลัง commit
+    transaction.on_commit(lambda: invalidate_user_levels(user_id))
+
+
+@receiver(post_save, sender=UserProgress)
+def update_leaderboard_from_progress(sender, instance, **kwargs):
+    """นำคะแนนของผู้ใช้เข้า leaderboard ของ level (เก็บเฉพาะคะแนนดีที่สุด)"""
+    if instance.is_completed and instance.max_score > 0 and instance.completion_date:
+        record_result(
+            instance.level_id, user_player(instance.user_id), instance.user.username,
+            instance.score, instance.max_score, instance.completion_date, user_id=instance.user_id,
+        )
+
+
+@receiver(post_delete, sender=UserProgress)
+def remove_from_leaderboard(sender, instance, **kwargs):
+    remove_player(instance.level_id, user_player(instance.user_id))
+
+
+@receiver(post_save, sender=Score)
+def update_leaderboard_from_score(sender, instance, created, **kwargs):
+    if created and instance.player_name and instance.player_name.strip():
+        record_result(
+            instance.level_id, name_player(instance.player_name), instance.player_name.strip()[:150],
+            instance.score, instance.max_score, instance.created_at,
+        )
@@ -1,3 +1,725 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api_data.models import Answer, Level, Question, Score
+from . import async_views
+from .analytics import update_attempt_stats
+from .cache import user_levels_key
+from .ingest import flush_pending_attempts
+from .views import export_view
+from .live import Channel, channel, event_stream, events_view, leaderboard_group, user_group
+from .models import (
+    AnswerStats, LeaderboardEntry, LevelAttemptRollup, LevelStats, QuestionStats, PendingAttemptBatch, QuestionAttempt, QuestionAttemptRollup,
+    ReviewCard, StatsWatermark, UserProgress, UserQuestionState,
+)
+
+
+class ProgressAPITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='pass')
+        self.client = APIClient(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.client.force_authenticate(self.user)
+
+    def make_level(self, number, questions=0):
+        level = Level.objects.create(name=f'Level {number}', number=number)
+        for i in range(questions):
+            question = Question.objects.create(word=f'w{number}-{i}', pronunciation='p', level=level)
+            Answer.objects.create(question=question, thai_text='ถูก', english_text='right', is_correct=True)
+            Answer.objects.create(question=question, thai_text='ผิด', english_text='wrong')
+        return level
+
+
+class UserLevelsTests(ProgressAPITestCase):
+    url = '/api/progress/user_levels/'
+
+    def test_query_count_is_constant_as_levels_grow(self):
+        for number in range(1, 3):
+            level = self.make_level(number)
+            UserProgress.objects.create(user=self.user, level=level, is_unlocked=True)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.client.get(self.url).json()), 2)
+
+        for number in range(3, 13):
+            level = self.make_level(number)
+            UserProgress.objects.create(user=self.user, level=level)
+        cache.clear()
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.client.get(self.url).json()), 12)
+
+    def test_cached_until_progress_changes(self):
+        level = self.make_level(1)
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        UserProgress.objects.create(user=self.user, level=level, is_unlocked=True, is_completed=True)
+        data = self.client.get(self.url).json()
+        self.assertTrue(data[0]['is_completed'])
+
+    def test_cache_filled_before_commit_is_cleared_after_commit(self):
+        level = self.make_level(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProgress.objects.create(user=self.user, level=level, is_unlocked=True, is_completed=True)
+            # A concurrent read inside the writing transaction caches the row as it is now
+            cache.set(user_levels_key(self.user.id), [{'id': level.id, 'is_completed': False}])
+        self.assertTrue(self.client.get(self.url).json()[0]['is_completed'])
+
+    def test_submit_quiz_refreshes_levels(self):
+        level = self.make_level(1, questions=1)
+        next_level = self.make_level(2)
+        self.assertFalse(self.client.get(self.url).json()[1]['is_unlocked'])
+
+        answer = Answer.objects.get(question__level=level, is_correct=True)
+        self.client.post('/api/progress/submit_quiz/', {
+            'level_id': level.id,
+            'answers': [{'question_id': answer.question_id, 'answer_id': answer.id}],
+        }, format='json')
+        data = self.client.get(self.url).json()
+        self.assertEqual(data[1]['id'], next_level.id)
+        self.assertTrue(data[1]['is_unlocked'])
+
+    def async_user_levels(self, user):
+        request = AsyncRequestFactory().get(self.url)
+
+        async def auser():
+            return user
+        request.auser = auser
+        return async_to_sync(async_views.user_levels)(request)
+
+    def test_async_view_matches_sync_view_and_shares_cache(self):
+        level = self.make_level(1)
+        self.make_level(2)
+        UserProgress.objects.create(user=self.user, level=level, is_unlocked=True, is_completed=True, score=4, max_score=5)
+        # Content version read with cache.aget, not the blocking get_version
+        with self.assertNumQueries(2), mock.patch('api_data.cache.get_version', side_effect=AssertionError):
+            response = self.async_user_levels(self.user)
+        data = json.loads(response.content)
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]['percentage_score'], 80.0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).json(), data)
+
+        self.assertEqual(self.async_user_levels(AnonymousUser()).status_code, 403)
+
+
+class SubmitQuizTests(ProgressAPITestCase):
+    url = '/api/progress/submit_quiz/'
+
+    def payload(self, level, correct=True):
+        answers = Answer.objects.filter(question__level=level, is_correct=correct)
+        return {
+            'level_id': level.id,
+            'answers': [{'question_id': a.question_id, 'answer_id': a.id} for a in answers],
+        }
+
+    def test_attempts_are_bulk_written(self):
+        level = self.make_level(1, questions=20)
+        response = self.client.post(self.url, self.payload(level), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user.question_attempts.count(), 20)
+        progress = UserProgress.objects.get(user=self.user, level=level)
+        self.assertEqual((progress.score, progress.max_score), (20, 20))
+
+    def test_idempotency_key_prevents_duplicate_attempts(self):
+        level = self.make_level(1, questions=3)
+        for _ in range(2):
+            response = self.client.post(self.url, self.payload(level, correct=False), format='json',
+                                        HTTP_IDEMPOTENCY_KEY='quiz-1')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user.question_attempts.count(), 3)
+
+        self.client.post(self.url, self.payload(level), format='json', HTTP_IDEMPOTENCY_KEY='quiz-2')
+        self.assertEqual(self.user.question_attempts.count(), 6)
+
+    def test_overlong_idempotency_key_is_rejected(self):
+        level = self.make_level(1, questions=1)
+        response = self.client.post(self.url, self.payload(level), format='json', HTTP_IDEMPOTENCY_KEY='k' * 65)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.user.question_attempts.exists())
+
+    def test_answer_from_other_level_is_rejected(self):
+        level = self.make_level(1, questions=1)
+        other = self.make_level(2, questions=1)
+        question = Question.objects.get(level=level)
+        foreign_answer = Answer.objects.filter(question__level=other).first()
+        response = self.client.post(self.url, {
+            'level_id': level.id,
+            'answers': [{'question_id': question.id, 'answer_id': foreign_answer.id}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.user.question_attempts.exists())
+
+
+class IncorrectQuestionsTests(ProgressAPITestCase):
+    url = '/api/progress/incorrect_questions/'
+
+    def submit(self, level, correct_for):
+        answers = []
+        for question in level.questions.all():
+            answer = question.answers.get(is_correct=question.id in correct_for)
+            answers.append({'question_id': question.id, 'answer_id': answer.id})
+        self.client.post('/api/progress/submit_quiz/', {'level_id': level.id, 'answers': answers}, format='json')
+
+    def test_uses_latest_attempt_per_question(self):
+        level = self.make_level(1, questions=3)
+        first, second, third = level.questions.order_by('id')
+        self.submit(level, correct_for=set())
+        self.submit(level, correct_for={first.id})
+
+        ids = {q['id'] for q in self.client.get(self.url, {'level_id': level.id}).json()}
+        self.assertEqual(ids, {second.id, third.id})
+        state = UserQuestionState.objects.get(user=self.user, question=first)
+        self.assertEqual((state.attempt_count, state.correct_count), (2, 1))
+
+    def test_backfill_rebuilds_states_from_attempts(self):
+        level = self.make_level(1, questions=2)
+        first, second = level.questions.order_by('id')
+        self.submit(level, correct_for={second.id})
+        self.submit(level, correct_for={first.id})
+        expected = set(UserQuestionState.objects.values_list(
+            'question_id', 'last_is_correct', 'attempt_count', 'correct_count', 'last_answer_id'))
+
+        UserQuestionState.objects.all().delete()
+        call_command('backfill_question_states', stdout=StringIO())
+        rebuilt = set(UserQuestionState.objects.values_list(
+            'question_id', 'last_is_correct', 'attempt_count', 'correct_count', 'last_answer_id'))
+        self.assertEqual(rebuilt, expected)
+
+
+class ReviewCardTests(ProgressAPITestCase):
+    def test_sm2_intervals_grow_and_reset(self):
+        level = self.make_level(1, questions=1)
+        card = ReviewCard(user=self.user, question=level.questions.get())
+        intervals = []
+        for _ in range(4):
+            card.review(5)
+            intervals.append(card.interval_days)
+        self.assertEqual(intervals[:2], [1, 6])
+        self.assertGreater(intervals[3], intervals[2])
+        card.review(1)
+        self.assertEqual((card.repetitions, card.interval_days), (0, 0))
+        self.assertGreaterEqual(card.ease_factor, ReviewCard.MIN_EASE)
+
+    def test_next_cards_returns_due_cards_after_quiz(self):
+        level = self.make_level(1, questions=3)
+        wrong, right, _ = level.questions.order_by('id')
+        answers = [
+            {'question_id': wrong.id, 'answer_id': wrong.answers.get(is_correct=False).id},
+            {'question_id': right.id, 'answer_id': right.answers.get(is_correct=True).id},
+        ]
+        self.client.post('/api/progress/submit_quiz/', {'level_id': level.id, 'answers': answers}, format='json')
+
+        cards = self.client.get('/api/progress/next_cards/', {'level_id': level.id}).json()
+        self.assertEqual([card['question'] for card in cards], [wrong.id])
+        self.assertEqual(cards[0]['question_details']['word'], wrong.word)
+
+        response = self.client.post('/api/progress/review_card/',
+                                    {'question_id': wrong.id, 'remembered': True}, format='json')
+        self.assertEqual(response.json()['interval_days'], 1)
+        self.assertEqual(self.client.get('/api/progress/next_cards/').json(), [])
+
+
+@override_settings(ATTEMPT_WRITE_BEHIND=True)
+class WriteBehindTests(ProgressAPITestCase):
+    def submit(self, level):
+        answers = Answer.objects.filter(question__level=level, is_correct=True)
+        return self.client.post('/api/progress/submit_quiz/', {
+            'level_id': level.id,
+            'answers': [{'question_id': a.question_id, 'answer_id': a.id} for a in answers],
+        }, format='json')
+
+    def test_attempts_are_queued_then_flushed(self):
+        level = self.make_level(1, questions=3)
+        response = self.submit(level)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['score'], 3)
+        self.assertEqual(len(response.json()['question_attempts']), 3)
+        self.assertFalse(QuestionAttempt.objects.exists())
+        self.assertEqual(PendingAttemptBatch.objects.count(), 1)
+
+        call_command('flush_attempts', stdout=StringIO())
+        self.assertEqual(QuestionAttempt.objects.count(), 3)
+        self.assertFalse(PendingAttemptBatch.objects.exists())
+        self.assertEqual(UserQuestionState.objects.filter(user=self.user, last_is_correct=True).count(), 3)
+
+    def test_flush_applies_each_users_batches_in_order(self):
+        level = self.make_level(1, questions=1)
+        right, wrong = Answer.objects.filter(question__level=level).order_by('-is_correct')
+        for answer in (wrong, right, wrong):
+            self.client.post('/api/progress/submit_quiz/', {
+                'level_id': level.id, 'answers': [{'question_id': answer.question_id, 'answer_id': answer.id}],
+            }, format='json')
+        flush_pending_attempts(batch_size=1)
+        state = UserQuestionState.objects.get(user=self.user)
+        self.assertEqual((state.attempt_count, state.correct_count, state.last_answer_id), (3, 1, wrong.id))
+        self.assertEqual(ReviewCard.objects.get(user=self.user).repetitions, 0)
+
+    @override_settings(ATTEMPT_WRITE_BEHIND_MAX_LAG=0)
+    def test_lagging_queue_is_flushed_inline(self):
+        level = self.make_level(1, questions=2)
+        self.submit(level)
+        self.assertEqual(QuestionAttempt.objects.count(), 2)
+        self.assertFalse(PendingAttemptBatch.objects.exists())
+
+    @override_settings(ATTEMPT_WRITE_BEHIND_MAX_LAG=0)
+    def test_failed_inline_flush_does_not_fail_the_submission(self):
+        level = self.make_level(1, questions=2)
+        with mock.patch('progress.ingest.flush_pending_attempts', side_effect=OperationalError('locked')), \
+                self.assertLogs('progress.ingest', 'WARNING'):
+            response = self.submit(level)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PendingAttemptBatch.objects.count(), 1)
+
+    def test_worker_loop_survives_database_errors(self):
+        flushes = mock.patch('progress.management.commands.flush_attempts.flush_pending_attempts',
+                             side_effect=[OperationalError('locked'), 3])
+        # The second sleep ends the loop
+        sleeps = mock.patch('progress.management.commands.flush_attempts.time.sleep', side_effect=[None, StopIteration])
+        out = StringIO()
+        with flushes as flush, sleeps, self.assertLogs('progress.management.commands.flush_attempts', 'ERROR'):
+            with self.assertRaises(StopIteration):
+                call_command('flush_attempts', '--loop', stdout=out)
+        self.assertEqual(flush.call_count, 2)
+        self.assertIn('Flushed 3 attempts', out.getvalue())
+
+    @override_settings(ATTEMPT_WRITE_BEHIND_MAX_LAG=0)
+    def test_lagging_queue_stops_queueing(self):
+        level = self.make_level(1, questions=2)
+        with override_settings(ATTEMPT_WRITE_BEHIND_MAX_LAG=3600):
+            self.submit(level)
+        self.assertEqual(PendingAttemptBatch.objects.count(), 1)
+
+        with mock.patch('progress.views.flush_if_lagging'):
+            response = self.submit(level)
+        self.assertEqual(response.status_code, 200)
+        # The user's queued quiz is written first, then this one, without the worker
+        self.assertFalse(PendingAttemptBatch.objects.exists())
+        self.assertEqual(list(QuestionAttempt.objects.order_by('id').values_list('progress_id', flat=True)),
+                         [response.json()['id']] * 4)
+        self.assertEqual(UserQuestionState.objects.filter(user=self.user, attempt_count=2).count(), 2)
+
+    @override_settings(ATTEMPT_WRITE_BEHIND_MAX_LAG=0)
+    @mock.patch('progress.ingest.INLINE_FLUSH_BATCH_SIZE', 1)
+    def test_inline_flush_is_capped(self):
+        level = self.make_level(1, questions=2)
+        other = User.objects.create_user(username='other', password='pass')
+        self.client.force_authenticate(other)
+        with override_settings(ATTEMPT_WRITE_BEHIND_MAX_LAG=3600):
+            for _ in range(3):
+                self.submit(level)
+        self.assertEqual(PendingAttemptBatch.objects.count(), 3)
+
+        self.client.force_authenticate(self.user)
+        with mock.patch('progress.ingest.INLINE_FLUSH_LIMIT', 2):
+            self.submit(level)
+        # This quiz is written synchronously, one of the other user's is flushed; the worker does the rest
+        self.assertEqual(QuestionAttempt.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(QuestionAttempt.objects.filter(user=other).count(), 2)
+        self.assertEqual(PendingAttemptBatch.objects.count(), 2)
+
+
+class RollupTests(ProgressAPITestCase):
+    def test_old_attempts_are_rolled_up_and_history_is_unchanged(self):
+        level = self.make_level(1, questions=2)
+        answers = Answer.objects.filter(question__level=level)
+        self.client.post('/api/progress/submit_quiz/', {
+            'level_id': level.id,
+            'answers': [{'question_id': a.question_id, 'answer_id': a.id} for a in answers],
+        }, format='json')
+        QuestionAttempt.objects.update(attempt_date=timezone.now() - timedelta(days=400))
+        before = self.client.get('/api/progress/attempt_history/').json()
+
+        update_attempt_stats(lag=timedelta(0))
+        call_command('rollup_attempts', retention_days=180, chunk_size=1, stdout=StringIO())
+        self.assertFalse(QuestionAttempt.objects.exists())
+        self.assertEqual(QuestionAttemptRollup.objects.count(), 2)
+        rollup = LevelAttemptRollup.objects.get(user=self.user, level=level)
+        self.assertEqual((rollup.attempts, rollup.correct), (4, 2))
+        self.assertEqual(self.client.get('/api/progress/attempt_history/').json(), before)
+
+    def test_attempts_not_yet_in_stats_are_kept(self):
+        level = self.make_level(1, questions=2)
+        answers = Answer.objects.filter(question__level=level, is_correct=True)
+        self.client.post('/api/progress/submit_quiz/', {
+            'level_id': level.id,
+            'answers': [{'question_id': a.question_id, 'answer_id': a.id} for a in answers],
+        }, format='json')
+        QuestionAttempt.objects.update(attempt_date=timezone.now() - timedelta(days=400))
+        first = QuestionAttempt.objects.order_by('id').first()
+        StatsWatermark.objects.create(name='question_stats', last_attempt_id=first.id)
+
+        out = StringIO()
+        call_command('rollup_attempts', retention_days=180, stdout=out)
+        self.assertIn('Keeping 1 old attempts', out.getvalue())
+        self.assertEqual(QuestionAttempt.objects.count(), 1)
+        self.assertFalse(QuestionAttempt.objects.filter(id=first.id).exists())
+        self.assertEqual(LevelAttemptRollup.objects.get().attempts, 1)
+
+
+class QuestionStatsTests(ProgressAPITestCase):
+    def test_stats_are_incremental_from_watermark(self):
+        level = self.make_level(1, questions=2)
+        first, second = level.questions.order_by('id')
+        wrong = first.answers.get(is_correct=False)
+        answers = [
+            {'question_id': first.id, 'answer_id': wrong.id},
+            {'question_id': second.id, 'answer_id': second.answers.get(is_correct=True).id},
+        ]
+        self.client.post('/api/progress/submit_quiz/', {'level_id': level.id, 'answers': answers}, format='json')
+        call_command('update_question_stats', '--lag', '0', stdout=StringIO())
+        self.client.post('/api/progress/submit_quiz/', {'level_id': level.id, 'answers': answers}, format='json')
+        call_command('update_question_stats', '--lag', '0', stdout=StringIO())
+
+        stats = QuestionStats.objects.get(question=first)
+        self.assertEqual((stats.attempts, stats.correct), (2, 0))
+        self.assertEqual(AnswerStats.objects.get(answer=wrong).times_chosen, 2)
+        level_stats = LevelStats.objects.get(level=level)
+        self.assertEqual((level_stats.attempts, level_stats.correct, level_stats.learners), (4, 2, 1))
+        self.assertEqual(level_stats.pass_rate, 0)
+        self.assertEqual(level_stats.pass_curve[5], 100)  # the learner scored 50%
+        self.assertEqual(level_stats.pass_curve[6], 0)
+
+    def test_watermark_waits_for_attempts_inside_the_lag(self):
+        level = self.make_level(1, questions=3)
+        answers = Answer.objects.filter(question__level=level, is_correct=True)
+        self.client.post('/api/progress/submit_quiz/', {
+            'level_id': level.id, 'answers': [{'question_id': a.question_id, 'answer_id': a.id} for a in answers],
+        }, format='json')
+        first, middle, last = QuestionAttempt.objects.order_by('id')
+        # The middle row was written late (e.g. a slow transaction that committed after the last one)
+        QuestionAttempt.objects.exclude(id=middle.id).update(created_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(update_attempt_stats(), 1)
+        self.assertEqual(StatsWatermark.objects.get().last_attempt_id, first.id)
+        QuestionAttempt.objects.filter(id=middle.id).update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(update_attempt_stats(), 2)
+        self.assertEqual(StatsWatermark.objects.get().last_attempt_id, last.id)
+        self.assertEqual(sum(QuestionStats.objects.values_list('attempts', flat=True)), 3)
+
+    def test_stats_api_is_staff_only(self):
+        self.assertEqual(self.client.get('/api/stats/questions/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get('/api/stats/questions/').status_code, 200)
+
+
+class SparseFieldsTests(ProgressAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.level = self.make_level(1, questions=5)
+        answers = Answer.objects.filter(question__level=self.level, is_correct=True)
+        self.client.post('/api/progress/submit_quiz/', {
+            'level_id': self.level.id,
+            'answers': [{'question_id': a.question_id, 'answer_id': a.id} for a in answers],
+        }, format='json')
+        self.progress = UserProgress.objects.get(user=self.user, level=self.level)
+
+    def test_retrieve_is_slim_by_default(self):
+        url = f'/api/progress/{self.progress.id}/'
+        with self.assertNumQueries(2):
+            data = self.client.get(url).json()
+        self.assertEqual(len(data['question_attempts']), 5)
+        self.assertNotIn('question_details', data['question_attempts'][0])
+
+    def test_expand_adds_prefetched_question_details(self):
+        url = f'/api/progress/{self.progress.id}/'
+        with self.assertNumQueries(3):
+            data = self.client.get(url, {'expand': 'question_details'}).json()
+        self.assertEqual(len(data['question_attempts'][0]['question_details']['answers']), 2)
+
+    def test_fields_limits_top_level_fields(self):
+        data = self.client.get('/api/attempts/', {'fields': 'id,is_correct'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'is_correct'})
+        data = self.client.get('/api/progress/', {'fields': 'level,score'}).json()
+        self.assertEqual(data, [{'level': self.level.id, 'score': 5}])
+
+
+class ExportTests(ProgressAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.level = self.make_level(1, questions=3)
+        answers = Answer.objects.filter(question__level=self.level, is_correct=True)
+        self.client.post('/api/progress/submit_quiz/', {
+            'level_id': self.level.id,
+            'answers': [{'question_id': a.question_id, 'answer_id': a.id} for a in answers],
+        }, format='json')
+
+    def test_export_is_staff_only(self):
+        self.client.force_login(self.user)
+        self.assertNotEqual(self.client.get('/api/export/attempts/').status_code, 200)
+
+    def test_streams_filtered_csv_and_ndjson(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+
+        response = self.client.get('/api/export/attempts/', {'level': self.level.id, 'user': 'learner'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('id,user__username'))
+
+        response = self.client.get('/api/export/progress/', {'format': 'ndjson', 'since': '2000-01-01'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows[0]['score'], 3)
+
+        response = self.client.get('/api/export/attempts/', {'until': '2000-01-01'})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 1)
+
+    def test_streams_chunks_asynchronously_under_asgi(self):
+        self.user.is_staff = True
+        self.user.save()
+        request = AsyncRequestFactory().get('/api/export/attempts/')
+        request.user = self.user
+
+        async def collect(response):
+            return [chunk async for chunk in response]
+
+        with mock.patch('progress.views.EXPORT_CHUNK_SIZE', 2):
+            response = export_view(request, 'attempts')
+            self.assertTrue(response.is_async)
+            chunks = async_to_sync(collect)(response)
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(len(b''.join(chunks).decode().splitlines()), 4)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command('export_data', 'attempts', format='ndjson', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+
+class SyncTests(ProgressAPITestCase):
+    url = '/api/progress/sync/'
+
+    def quiz(self, level, client_id, correct=True, completed_at=None):
+        answers = Answer.objects.filter(question__level=level, is_correct=correct)
+        return {
+            'client_id': client_id,
+            'level_id': level.id,
+            'completed_at': (completed_at or timezone.now()).isoformat(),
+            'answers': [{'question_id': a.question_id, 'answer_id': a.id} for a in answers],
+        }
+
+    def test_merges_offline_quizzes_once(self):
+        level = self.make_level(1, questions=2)
+        self.make_level(2)
+        payload = {'quizzes': [self.quiz(level, 'offline-1')]}
+        data = self.client.post(self.url, payload, format='json').json()
+        self.assertEqual(data['results'], [{'client_id': 'offline-1', 'status': 'recorded'}])
+        self.assertEqual({p['level'] for p in data['progress']}, set(Level.objects.values_list('id', flat=True)))
+
+        data = self.client.post(self.url, payload, format='json').json()
+        self.assertEqual(data['results'][0]['status'], 'duplicate')
+        self.assertEqual(QuestionAttempt.objects.count(), 2)
+
+    def test_token_returns_only_recent_changes(self):
+        level = self.make_level(1, questions=1)
+        token = self.client.post(self.url, {'quizzes': [self.quiz(level, 'a')]}, format='json').json()['token']
+        UserProgress.objects.filter(user=self.user).update(updated_at=timezone.now() - timedelta(minutes=5))
+        data = self.client.post(self.url, {'since': token}, format='json').json()
+        self.assertEqual(data['progress'], [])
+
+    def test_older_offline_result_does_not_override_score(self):
+        level = self.make_level(1, questions=2)
+        self.client.post(self.url, {'quizzes': [self.quiz(level, 'new')]}, format='json')
+        old = self.quiz(level, 'old', correct=False, completed_at=timezone.now() - timedelta(days=1))
+        self.client.post(self.url, {'quizzes': [old]}, format='json')
+        self.assertEqual(UserProgress.objects.get(user=self.user, level=level).score, 2)
+        self.assertEqual(QuestionAttempt.objects.count(), 4)
+
+    @override_settings(ATTEMPT_SYNC_MAX_AGE_DAYS=7)
+    def test_completed_at_must_be_inside_the_sync_window(self):
+        level = self.make_level(1, questions=1)
+        backdated = self.quiz(level, 'backdated', completed_at=timezone.now() - timedelta(days=30))
+        future = self.quiz(level, 'future', completed_at=timezone.now() + timedelta(days=30))
+        data = self.client.post(self.url, {'quizzes': [backdated, future]}, format='json').json()
+        self.assertEqual([result['status'] for result in data['results']], ['rejected', 'recorded'])
+        self.assertLessEqual(QuestionAttempt.objects.get().attempt_date, timezone.now())
+        self.assertLessEqual(UserProgress.objects.get(user=self.user, level=level).completion_date, timezone.now())
+
+    def test_rejects_answers_from_other_levels(self):
+        level = self.make_level(1, questions=1)
+        other = self.make_level(2, questions=1)
+        quiz = self.quiz(other, 'x')
+        quiz['level_id'] = level.id
+        data = self.client.post(self.url, {'quizzes': [quiz]}, format='json').json()
+        self.assertEqual(data['results'][0]['status'], 'rejected')
+
+
+class PaginationTests(ProgressAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.level = self.make_level(1, questions=5)
+        answers = Answer.objects.filter(question__level=self.level, is_correct=True)
+        for _ in range(2):
+            self.client.post('/api/progress/submit_quiz/', {
+                'level_id': self.level.id,
+                'answers': [{'question_id': a.question_id, 'answer_id': a.id} for a in answers],
+            }, format='json')
+
+    def walk(self, url, params):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json()['results'])
+            if not response.json()['next']:
+                return pages
+            response = self.client.get(response.json()['next'])
+
+    def test_attempts_are_paged_newest_first_without_gaps(self):
+        pages = self.walk('/api/attempts/', {'page_size': 3})
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 1])
+        ids = [item['id'] for page in pages for item in page]
+        expected = list(QuestionAttempt.objects.filter(user=self.user)
+                        .order_by('-attempt_date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_progress_pagination_is_opt_in(self):
+        self.assertIsInstance(self.client.get('/api/progress/').json(), list)
+        pages = self.walk('/api/progress/', {'page_size': 1})
+        self.assertEqual([[item['level'] for item in page] for page in pages], [[self.level.id]])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/attempts/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(LEADERBOARD_SIZE=2)
+class LeaderboardTests(ProgressAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.level = self.make_level(1, questions=4)
+        self.url = f'/api/leaderboard/{self.level.id}/'
+
+    def submit(self, correct):
+        answers = []
+        for question in Question.objects.filter(level=self.level).order_by('id'):
+            answer = question.answers.get(is_correct=len(answers) < correct)
+            answers.append({'question_id': question.id, 'answer_id': answer.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/progress/submit_quiz/', {'level_id': self.level.id, 'answers': answers}, format='json')
+
+    def add_score(self, name, score):
+        with self.captureOnCommitCallbacks(execute=True):
+            Score.objects.create(player_name=name, score=score, max_score=4, level=self.level)
+
+    def test_keeps_best_score_per_player_and_ranks_by_count(self):
+        self.add_score('alice', 4)
+        self.add_score('bob', 2)
+        self.submit(correct=3)
+        self.submit(correct=1)
+
+        data = self.client.get(self.url).json()
+        self.assertEqual([(row['display_name'], row['score']) for row in data['top']], [('alice', 4), ('learner', 3)])
+        self.assertEqual(data['me']['rank'], 2)
+        self.assertEqual(data['me']['score'], 3)
+        self.assertTrue(data['top'][1]['is_me'])
+        self.assertNotIn('player', data['top'][0])
+
+        # A new best moves the user to the top, the cached list follows the write
+        self.add_score('bob', 3)
+        self.submit(correct=4)
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['top'][0]['display_name'], 'alice')
+        self.assertEqual([row['score'] for row in data['top']], [4, 4])
+        self.assertEqual(data['me']['rank'], 2)
+        self.assertEqual(LeaderboardEntry.objects.filter(level=self.level).count(), 3)
+
+    def test_cached_top_and_indexed_rank(self):
+        self.add_score('alice', 4)
+        self.submit(correct=2)
+        self.client.get(self.url)
+        # level lookup, own entry and the rank count; the top list comes from cache
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+    def test_rebuild_matches_incremental_entries(self):
+        self.add_score('alice', 1)
+        self.add_score('alice', 3)
+        self.submit(correct=2)
+        before = sorted(LeaderboardEntry.objects.values_list('player', 'score', 'achieved_at'))
+        LeaderboardEntry.objects.all().delete()
+
+        call_command('rebuild_leaderboard', stdout=StringIO())
+        self.assertEqual(sorted(LeaderboardEntry.objects.values_list('player', 'score', 'achieved_at')), before)
+
+
+class LiveEventsTests(ProgressAPITestCase):
+    async def test_channel_delivers_across_threads_and_cleans_up(self):
+        local = Channel()
+        async with local.subscribe(['a', 'b']) as queue:
+            thread = threading.Thread(target=local.publish, args=('b', 'ping', {'n': 1}))
+            thread.start()
+            thread.join()
+            local.publish('other', 'ignored', {})
+            self.assertEqual(await asyncio.wait_for(queue.get(), 1), ('ping', {'n': 1}))
+            self.assertTrue(queue.empty())
+            self.assertEqual(local.subscriber_count(), 1)
+        self.assertEqual(local.subscriber_count(), 0)
+
+    async def test_stream_formats_events_and_keepalives(self):
+        stream = event_stream([leaderboard_group(7)])
+        self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+        channel.publish(leaderboard_group(7), 'leaderboard', {'level': 7, 'top': []})
+        self.assertEqual(await anext(stream), 'event: leaderboard\ndata: {"level": 7, "top": []}\n\n')
+        with override_settings(LIVE_KEEPALIVE=0.01):
+            self.assertEqual(await anext(stream), ': keepalive\n\n')
+        await stream.aclose()
+        self.assertEqual(channel.subscriber_count(leaderboard_group(7)), 0)
+
+    async def test_events_view_subscribes_signed_in_user(self):
+        request = AsyncRequestFactory().get('/progress/events/', {'levels': '1,x,2'})
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        response = await events_view(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response._iterator
+        self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+        self.assertEqual(channel.subscriber_count(user_group(self.user.id)), 1)
+        self.assertEqual(channel.subscriber_count(leaderboard_group(2)), 1)
+        await stream.aclose()
+        self.assertEqual(channel.subscriber_count(), 0)
+
+    async def test_events_view_refuses_leaderboards_to_anonymous_clients(self):
+        request = AsyncRequestFactory().get('/progress/events/', {'levels': '1'})
+
+        async def auser():
+            return AnonymousUser()
+        request.auser = auser
+        response = await events_view(request)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(channel.subscriber_count(), 0)
+
+    def test_wsgi_requests_are_told_to_poll(self):
+        self.assertEqual(self.client.get('/progress/events/').status_code, 204)
+
+    def test_passing_a_level_publishes_unlock(self):
+        level = self.make_level(1, questions=2)
+        next_level = self.make_level(2)
+        answers = Answer.objects.filter(question__level=level, is_correct=True)
+        published = []
+        with mock.patch.object(channel, 'publish', lambda *args: published.append(args)):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/api/progress/submit_quiz/', {
+                    'level_id': level.id,
+                    'answers': [{'question_id': a.question_id, 'answer_id': a.id} for a in answers],
+                }, format='json')
+        self.assertIn((user_group(self.user.id), 'unlock', {'level_id': next_level.id, 'number': 2}), published)
+        self.assertIn(user_group(self.user.id), [group for group, event, _ in published if event == 'progress'])
@@ -1,11 +1,23 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserProgressViewSet, QuestionAttemptViewSet
+from . import async_views
+from .views import UserProgressViewSet, QuestionAttemptViewSet, QuestionStatsViewSet, LevelStatsViewSet, LeaderboardViewSet, export_view
 
 router = DefaultRouter()
 router.register(r'progress', UserProgressViewSet, basename='progress')
 router.register(r'attempts', QuestionAttemptViewSet, basename='attempts')
+router.register(r'stats/questions', QuestionStatsViewSet, basename='question-stats')
+router.register(r'stats/levels', LevelStatsViewSet, basename='level-stats')
+router.register(r'leaderboard', LeaderboardViewSet, basename='leaderboard')
 
 urlpatterns = [
     path('', include(router.urls)),
-]
\ No newline at end of file
+    path('export/<str:name>/', export_view, name='export'),
+]
+
+if settings.ASYNC_VIEWS:
+    # Ahead of the router so it wins over the DRF action (see progress/async_views.py)
+    urlpatterns = [
+        path('progress/user_levels/', async_views.user_levels, name='progress-user-levels-async'),
+    ] + urlpatterns
@@ -1,6 +1,8 @@
 from django.urls import path
+from .live import events_view
 from .views import review_view
 
 urlpatterns = [
     path('review/', review_view, name='review'),
+    path('events/', events_view, name='events'),
 ]
\ No newline at end of file
@@ -1,19 +1,89 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Count, Q, Prefetch
+from django.db.models.functions import TruncDate
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from api_data.mixins import SparseFieldsMixin
+from api_data.streaming import stream_for
 from api_data.models import Level, Question, Answer
-from .models import UserProgress, QuestionAttempt
-from .serializers import UserProgressSerializer, UserProgressDetailSerializer, QuestionAttemptSerializer
+from .models import UserProgress, QuestionAttempt, QuizSubmission, ReviewCard, LevelAttemptRollup
+from .models import QuestionStats, LevelStats
+from .serializers import UserProgressSerializer, UserProgressDetailSerializer, QuestionAttemptSerializer, ReviewCardSerializer
+from .serializers import QuestionStatsSerializer, LevelStatsSerializer
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.core.cache import cache
+from .cache import USER_LEVELS_TIMEOUT, user_levels_key
+from .ingest import flush_if_lagging, write_behind_enabled
+from .grading import parse_answers, load_answers, invalid_answers, record_quiz, sync_window_start
+from .exports import CHUNK_SIZE as EXPORT_CHUNK_SIZE, EXPORTS, FORMATS as EXPORT_FORMATS, export_rows, render_lines
+from .pagination import ProgressPagination, AttemptPagination
+from .leaderboard import player_rank, public_rows, top_entries, user_player
 import logging
 
 # เพิ่ม logger สำหรับบันทึกข้อมูลการทำงาน
 logger = logging.getLogger(__name__)
 
+# A progress row committed just before a token was issued may carry an older
+# updated_at, so each sync re-sends a few seconds of changes (clients merge by level)
+SYNC_TOKEN_OVERLAP = timedelta(seconds=5)
+# Longer keys would not fit QuizSubmission.idempotency_key (a DataError on Postgres)
+IDEMPOTENCY_KEY_MAX_LENGTH = QuizSubmission._meta.get_field('idempotency_key').max_length
+
+def make_sync_token(moment):
+    return str(int(moment.timestamp() * 1000000))
+
+def parse_sync_token(token):
+    if not token:
+        return None
+    return datetime.fromtimestamp(int(token) / 1000000, tz=dt_timezone.utc)
+
+def build_user_levels(levels, progress_by_level):
+    """Rows of ``user_levels``: every level merged with the user's progress on it"""
+    result = []
+    for level in levels:
+        progress = progress_by_level.get(level.id)
+
+        if progress:
+            # User has progress for this level
+            level_data = {
+                'id': level.id,
+                'number': level.number,
+                'name': level.name,
+                'description': level.description,
+                'is_completed': progress.is_completed,
+                'is_unlocked': progress.is_unlocked,
+                'score': progress.score,
+                'max_score': progress.max_score,
+                'percentage_score': progress.percentage_score,
+                'has_passed': progress.has_passed
+            }
+        else:
+            # Default data for level with no progress
+            level_data = {
+                'id': level.id,
+                'number': level.number,
+                'name': level.name,
+                'description': level.description,
+                'is_completed': False,
+                'is_unlocked': level.number == 1,  # First level is unlocked by default
+                'score': 0,
+                'max_score': 0,
+                'percentage_score': 0,
+                'has_passed': False
+            }
+
+        result.append(level_data)
+    return result
+
 class IsUserOrReadOnly(permissions.BasePermission):
     """
     Object-level permission to only allow users to edit their own progress.
@@ -26,13 +96,20 @@ class IsUserOrReadOnly(permissions.BasePermission):
         # Write permissions are only allowed to the owner
         return obj.user == request.user
 
-class UserProgressViewSet(viewsets.ModelViewSet):
+class UserProgressViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = UserProgressSerializer
+    pagination_class = ProgressPagination
     permission_classes = [permissions.IsAuthenticated, IsUserOrReadOnly]
     
     def get_queryset(self):
         user = self.request.user
-        return UserProgress.objects.filter(user=user)
+        queryset = UserProgress.objects.filter(user=user).select_related('level')
+        if self.action == 'retrieve' and self.wants_field('question_attempts'):
+            attempts = QuestionAttempt.objects.all()
+            if self.expanded('question_details'):
+                attempts = attempts.select_related('question__level').prefetch_related('question__answers')
+            queryset = queryset.prefetch_related(Prefetch('question_attempts', queryset=attempts))
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -44,58 +121,32 @@ class UserProgressViewSet(viewsets.ModelViewSet):
         """Get all levels with user progress information"""
         logger.info(f"User levels requested by user: {request.user.username}")
         user = request.user
-        
-        # Get all levels
+
+        cache_key = user_levels_key(user.id)
+        result = cache.get(cache_key)
+        if result is not None:
+            return Response(result)
+
+        # One query for levels and one for this user's progress, joined in Python
         levels = Level.objects.all().order_by('number')
-        logger.debug(f"Found {levels.count()} levels")
-        
-        # Get user progress for all levels
-        user_progress = UserProgress.objects.filter(user=user)
-        logger.debug(f"Found {user_progress.count()} progress records for user")
-        
-        # Prepare data for each level
-        result = []
-        for level in levels:
-            # Find user progress for this level, or create default data
-            progress = user_progress.filter(level=level).first()
-            
-            if progress:
-                # User has progress for this level
-                level_data = {
-                    'id': level.id,
-                    'number': level.number,
-                    'name': level.name,
-                    'description': level.description,
-                    'is_completed': progress.is_completed,
-                    'is_unlocked': progress.is_unlocked,
-                    'score': progress.score,
-                    'max_score': progress.max_score,
-                    'percentage_score': progress.percentage_score,
-                    'has_passed': progress.has_passed
-                }
-            else:
-                # Default data for level with no progress
-                level_data = {
-                    'id': level.id,
-                    'number': level.number,
-                    'name': level.name,
-                    'description': level.description,
-                    'is_completed': False,
-                    'is_unlocked': level.number == 1,  # First level is unlocked by default
-                    'score': 0,
-                    'max_score': 0,
-                    'percentage_score': 0,
-                    'has_passed': False
-                }
-            
-            result.append(level_data)
-        
+        progress_by_level = {
+            progress.level_id: progress
+            for progress in UserProgress.objects.filter(user=user).order_by()
+        }
+        result = build_user_levels(levels, progress_by_level)
+
+        cache.set(cache_key, result, USER_LEVELS_TIMEOUT)
         logger.info(f"Returning data for {len(result)} levels")
         return Response(result)
-    
+
     @action(detail=False, methods=['post'])
     def submit_quiz(self, request):
-        """Submit quiz answers and update progress"""
+        """Submit quiz answers and update progress
+
+        Clients may send an ``Idempotency-Key`` header (or ``idempotency_key``
+        field); a retry with the same key returns the stored result instead of
+        recording the attempts again.
+        """
         logger.info(f"Submit quiz called by user: {request.user.username}")
         logger.debug(f"Submit quiz data: {request.data}")
         
@@ -103,6 +154,7 @@ class UserProgressViewSet(viewsets.ModelViewSet):
             user = request.user
             level_id = request.data.get('level_id')
             answers = request.data.get('answers', [])
+            idempotency_key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key')
             
             logger.debug(f"User: {user.username}, Level ID: {level_id}, Answers count: {len(answers)}")
             
@@ -111,79 +163,57 @@ class UserProgressViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'level_id and answers are required'}, 
                                status=status.HTTP_400_BAD_REQUEST)
             
-            level = get_object_or_404(Level, id=level_id)
-            logger.debug(f"Found level: {level.name} (Level {level.number})")
-            
-            # Get or create progress for this level
-            progress, created = UserProgress.objects.get_or_create(
-                user=user,
-                level=level,
-                defaults={'is_unlocked': True}  # New progress is unlocked by default
-            )
-            logger.debug(f"{'Created new' if created else 'Using existing'} progress record")
-            
-            # Process answers
-            correct_count = 0
-            max_score = len(answers)
+            if idempotency_key and len(str(idempotency_key)) > IDEMPOTENCY_KEY_MAX_LENGTH:
+                return Response({'error': f'Idempotency-Key must be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters'},
+                               status=status.HTTP_400_BAD_REQUEST)
             
-            for answer_data in answers:
-                question_id = answer_data.get('question_id')
-                answer_id = answer_data.get('answer_id')
-                
-                if not question_id or not answer_id:
-                    logger.warning(f"Skipping invalid answer data: {answer_data}")
-                    continue
-                
-                question = get_object_or_404(Question, id=question_id)
-                answer = get_object_or_404(Answer, id=answer_id)
-                
-                # Check if answer is correct
-                is_correct = answer.is_correct
-                if is_correct:
-                    correct_count += 1
-                
-                # Save question attempt
-                QuestionAttempt.objects.create(
-                    user=user,
-                    progress=progress,
-                    question=question,
-                    answer=answer,
-                    is_correct=is_correct
-                )
-                logger.debug(f"Recorded attempt for question {question.word}: {'Correct' if is_correct else 'Incorrect'}")
+            if idempotency_key:
+                submission = QuizSubmission.objects.filter(
+                    user=user, idempotency_key=idempotency_key
+                ).select_related('progress').first()
+                if submission:
+                    logger.info(f"Replaying quiz submission {idempotency_key}")
+                    serializer = UserProgressDetailSerializer(submission.progress, context=self.get_serializer_context())
+                    return Response(serializer.data)
             
-            # Update progress
-            progress.score = correct_count
-            progress.max_score = max_score
+            level = get_object_or_404(Level, id=level_id)
+            logger.debug(f"Found level: {level.name} (Level {level.number})")
             
-            # Mark as completed if attempted
-            if max_score > 0:
-                progress.is_completed = True
-                progress.completion_date = timezone.now()
+            # Check every answer with one query; this also confirms that the
+            # answer belongs to the submitted question and to this level
+            submitted = parse_answers(answers)
+            answer_rows = load_answers([answer_id for _, answer_id in submitted])
+            invalid = invalid_answers(level, submitted, answer_rows)
+            if invalid:
+                logger.warning(f"Answers do not match their question/level: {invalid}")
+                return Response({'error': 'Some answers do not belong to the given question and level',
+                                 'invalid_answers': invalid},
+                               status=status.HTTP_400_BAD_REQUEST)
             
-            progress.save()
-            logger.info(f"Updated progress: score={correct_count}/{max_score} ({progress.percentage_score:.1f}%)")
+            progress, attempts, queued, duplicate = record_quiz(
+                user, level, submitted, answer_rows, len(answers), idempotency_key
+            )
+            if duplicate:
+                # A concurrent retry already recorded this submission
+                serializer = UserProgressDetailSerializer(progress, context=self.get_serializer_context())
+                return Response(serializer.data)
             
-            # Unlock next level if passed (80% or higher)
-            if progress.has_passed:
-                next_level = Level.objects.filter(number=level.number + 1).first()
-                if next_level:
-                    logger.info(f"Unlocking next level: {next_level.name} (Level {next_level.number})")
-                    next_progress, created = UserProgress.objects.get_or_create(
-                        user=user,
-                        level=next_level,
-                        defaults={'is_unlocked': True}
+            if write_behind_enabled():
+                flush_if_lagging()
+            if queued:
+                # Attempts are not in the database yet; answer from the grading result
+                if self.expanded('question_details'):
+                    questions = Question.objects.select_related('level').prefetch_related('answers').in_bulk(
+                        [attempt.question_id for attempt in attempts]
                     )
-                    if not next_progress.is_unlocked:
-                        next_progress.is_unlocked = True
-                        next_progress.save()
-                        logger.info(f"Next level {next_level.number} unlocked")
-                else:
-                    logger.info("No next level to unlock")
-            else:
-                logger.info(f"Level not passed ({progress.percentage_score:.1f}%), no next level unlocked")
+                    for attempt in attempts:
+                        attempt.question = questions[attempt.question_id]
+                context = self.get_serializer_context()
+                data = UserProgressSerializer(progress, context=context).data
+                data['question_attempts'] = QuestionAttemptSerializer(attempts, many=True, context=context).data
+                return Response(data)
             
-            serializer = UserProgressDetailSerializer(progress)
+            serializer = UserProgressDetailSerializer(progress, context=self.get_serializer_context())
             return Response(serializer.data)
             
         except Exception as e:
@@ -191,6 +221,86 @@ class UserProgressViewSet(viewsets.ModelViewSet):
             return Response({'error': 'An error occurred while processing your quiz submission'},
                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """Merge quizzes taken offline and return progress changed since the client's token
+
+        Body: ``{"since": "<token>", "quizzes": [{"client_id", "level_id",
+        "completed_at", "answers": [{"question_id", "answer_id"}]}]}``.
+        ``client_id`` works like submit_quiz's idempotency key, so a batch can
+        be resent safely. ``completed_at`` must fall within the last
+        ``ATTEMPT_SYNC_MAX_AGE_DAYS``; a future time counts as now. The response
+        carries a new ``token`` for the next call.
+        """
+        user = request.user
+        quizzes = request.data.get('quizzes', [])
+        if not isinstance(quizzes, list):
+            return Response({'error': 'quizzes must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            since = parse_sync_token(request.data.get('since'))
+        except (TypeError, ValueError, OverflowError):
+            return Response({'error': 'Invalid since token'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One query each for known client ids, levels and answers across the whole batch
+        client_ids = [str(quiz.get('client_id')) for quiz in quizzes if isinstance(quiz, dict) and quiz.get('client_id')]
+        seen = set(QuizSubmission.objects.filter(
+            user=user, idempotency_key__in=client_ids
+        ).values_list('idempotency_key', flat=True))
+        levels = Level.objects.in_bulk([quiz.get('level_id') for quiz in quizzes
+                                        if isinstance(quiz, dict) and str(quiz.get('level_id', '')).isdigit()])
+        parsed = [parse_answers(quiz.get('answers') or []) if isinstance(quiz, dict) else [] for quiz in quizzes]
+        answer_rows = load_answers([answer_id for submitted in parsed for _, answer_id in submitted])
+
+        results = []
+        pending = []
+        window_start = sync_window_start()
+        for quiz, submitted in zip(quizzes, parsed):
+            if not isinstance(quiz, dict) or not quiz.get('client_id'):
+                results.append({'client_id': None, 'status': 'rejected', 'error': 'client_id is required'})
+                continue
+            client_id = str(quiz['client_id'])
+            level = levels.get(int(quiz['level_id'])) if str(quiz.get('level_id', '')).isdigit() else None
+            try:
+                completed_at = parse_datetime(str(quiz.get('completed_at') or '')) or timezone.now()
+            except ValueError:
+                completed_at = timezone.now()
+            if timezone.is_naive(completed_at):
+                completed_at = timezone.make_aware(completed_at)
+            if len(client_id) > IDEMPOTENCY_KEY_MAX_LENGTH:
+                results.append({'client_id': client_id, 'status': 'rejected',
+                                'error': f'client_id must be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters'})
+            elif client_id in seen:
+                results.append({'client_id': client_id, 'status': 'duplicate'})
+            elif completed_at < window_start:
+                results.append({'client_id': client_id, 'status': 'rejected',
+                                'error': f'completed_at must not be before {window_start.isoformat()}'})
+            elif level is None or not submitted:
+                results.append({'client_id': client_id, 'status': 'rejected', 'error': 'level_id and answers are required'})
+            elif invalid_answers(level, submitted, answer_rows):
+                results.append({'client_id': client_id, 'status': 'rejected',
+                                'error': 'Some answers do not belong to the given question and level'})
+            else:
+                pending.append((completed_at, client_id, level, submitted, len(quiz['answers'])))
+                results.append({'client_id': client_id, 'status': 'recorded'})
+                seen.add(client_id)
+
+        with transaction.atomic():
+            # Oldest first, so the latest quiz per level decides the stored score
+            for completed_at, client_id, level, submitted, max_score in sorted(pending, key=lambda item: item[0]):
+                record_quiz(user, level, submitted, answer_rows, max_score, client_id, completed_at)
+
+        token = make_sync_token(timezone.now())
+        changed = UserProgress.objects.filter(user=user).select_related('level')
+        if since:
+            changed = changed.filter(updated_at__gte=since - SYNC_TOKEN_OVERLAP)
+        if pending and write_behind_enabled():
+            flush_if_lagging()
+        return Response({
+            'token': token,
+            'results': results,
+            'progress': UserProgressSerializer(changed, many=True, context=self.get_serializer_context()).data,
+        })
+
     @action(detail=False, methods=['get'])
     def incorrect_questions(self, request):
         """Get questions that the user answered incorrectly in their most recent attempt"""
@@ -198,47 +308,168 @@ class UserProgressViewSet(viewsets.ModelViewSet):
         user = request.user
         level_id = request.query_params.get('level_id')
         
-        base_query = Q(user=user)
+        # The latest result per question lives in UserQuestionState, so this is
+        # a single indexed lookup instead of a scan over the attempt history
+        questions = Question.objects.filter(
+            user_states__user=user,
+            user_states__last_is_correct=False
+        )
         if level_id:
-            base_query &= Q(question__level_id=level_id)
+            questions = questions.filter(level_id=level_id)
             logger.debug(f"Filtering by level ID: {level_id}")
-        
-        # Get all question IDs attempted by the user for this level
-        all_attempted_question_ids = QuestionAttempt.objects.filter(
-            base_query
-        ).values_list('question_id', flat=True).distinct()
-        logger.debug(f"Total distinct questions attempted: {len(all_attempted_question_ids)}")
-        
-        # Find incorrectly answered questions based on the most recent attempt
-        incorrect_question_ids = []
-        
-        for question_id in all_attempted_question_ids:
-            # Get the most recent attempt for this question
-            latest_attempt = QuestionAttempt.objects.filter(
-                user=user,
-                question_id=question_id
-            ).order_by('-attempt_date').first()
-            
-            # If the most recent attempt is incorrect, add to our list
-            if latest_attempt and not latest_attempt.is_correct:
-                incorrect_question_ids.append(question_id)
-        
-        logger.debug(f"Found {len(incorrect_question_ids)} questions with incorrect latest attempts")
-        
-        # Fetch the full question objects
-        questions = Question.objects.filter(id__in=incorrect_question_ids)
+        questions = questions.select_related('level').prefetch_related('answers')
         
         from api_data.serializers import QuestionSerializer
         serializer = QuestionSerializer(questions, many=True)
+        logger.debug(f"Found {len(serializer.data)} questions with incorrect latest attempts")
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def next_cards(self, request):
+        """Get the most overdue flashcards for the user (spaced repetition)"""
+        user = request.user
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Range scan on the (user, due_at) index; QuestionAttempt is never touched
+        cards = ReviewCard.objects.filter(user=user, due_at__lte=timezone.now())
+        level_id = request.query_params.get('level_id')
+        if level_id:
+            cards = cards.filter(question__level_id=level_id)
+        cards = cards.order_by('due_at').select_related(
+            'question__level'
+        ).prefetch_related('question__answers')[:limit]
+
+        serializer = ReviewCardSerializer(cards, many=True, context={'request': request})
+        logger.debug(f"Returning {len(serializer.data)} due cards for user {user.username}")
         return Response(serializer.data)
 
-class QuestionAttemptViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=['post'])
+    def review_card(self, request):
+        """Grade a flashcard review and reschedule it"""
+        question_id = request.data.get('question_id')
+        quality = request.data.get('quality')
+        if quality is None and 'remembered' in request.data:
+            remembered = request.data.get('remembered') in (True, 'true', 'True', '1', 1)
+            quality = ReviewCard.QUALITY_CORRECT if remembered else ReviewCard.QUALITY_INCORRECT
+        try:
+            quality = int(quality)
+        except (TypeError, ValueError):
+            quality = -1
+        if not question_id or not 0 <= quality <= 5:
+            return Response({'error': 'question_id and a quality between 0 and 5 (or remembered) are required'},
+                           status=status.HTTP_400_BAD_REQUEST)
+
+        question = get_object_or_404(Question, id=question_id)
+        card, created = ReviewCard.objects.get_or_create(user=request.user, question=question)
+        card.review(quality)
+        card.save()
+        return Response(ReviewCardSerializer(card, context={'request': request}).data)
+
+    @action(detail=False, methods=['get'])
+    def attempt_history(self, request):
+        """Daily attempts per level: rollups for archived days plus live attempts"""
+        user = request.user
+        level_id = request.query_params.get('level_id')
+
+        rollups = LevelAttemptRollup.objects.filter(user=user)
+        live = QuestionAttempt.objects.filter(user=user)
+        if level_id:
+            rollups = rollups.filter(level_id=level_id)
+            live = live.filter(question__level_id=level_id)
+
+        history = {}
+        for level, date, attempts, correct in rollups.values_list('level_id', 'date', 'attempts', 'correct'):
+            history[(level, date)] = [attempts, correct]
+        live = live.order_by().annotate(date=TruncDate('attempt_date')).values_list('question__level_id', 'date').annotate(
+            attempts=Count('id'), correct=Count('id', filter=Q(is_correct=True))
+        )
+        for level, date, attempts, correct in live:
+            totals = history.setdefault((level, date), [0, 0])
+            totals[0] += attempts
+            totals[1] += correct
+
+        result = [
+            {'level': level, 'date': date, 'attempts': attempts, 'correct': correct}
+            for (level, date), (attempts, correct) in sorted(history.items(), key=lambda item: (item[0][1], item[0][0] or 0))
+        ]
+        return Response(result)
+
+class QuestionAttemptViewSet(SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = QuestionAttemptSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AttemptPagination
     
     def get_queryset(self):
         user = self.request.user
-        return QuestionAttempt.objects.filter(user=user)
+        queryset = QuestionAttempt.objects.filter(user=user)
+        if self.expanded('question_details') and self.wants_field('question_details'):
+            queryset = queryset.select_related('question__level').prefetch_related('question__answers')
+        return queryset
+
+class QuestionStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    """Per-question correct rates and distractor counts for content editors"""
+    serializer_class = QuestionStatsSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        queryset = QuestionStats.objects.select_related('question').prefetch_related(
+            Prefetch('question__answers', queryset=Answer.objects.select_related('stats'))
+        ).order_by('question_id')
+        level_id = self.request.query_params.get('level_id')
+        if level_id:
+            queryset = queryset.filter(question__level_id=level_id)
+        return queryset
+
+class LevelStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    """Per-level totals and pass-rate curves for content editors"""
+    serializer_class = LevelStatsSerializer
+    permission_classes = [permissions.IsAdminUser]
+    queryset = LevelStats.objects.select_related('level').order_by('level__number')
+
+class LeaderboardViewSet(viewsets.ViewSet):
+    """Top players of a level and the requesting user's own rank
+
+    ``GET /api/leaderboard/<level_id>/``; the top list is served from cache
+    and the user's rank from one indexed count (see progress.leaderboard).
+    """
+
+    def retrieve(self, request, pk=None):
+        level = get_object_or_404(Level, pk=pk)
+        me = player_rank(level.id, user_player(request.user.id)) if request.user.is_authenticated else None
+        own_player = me and me['player']
+        rows = top_entries(level.id)
+        top = [{**row, 'is_me': entry['player'] == own_player} for row, entry in zip(public_rows(rows), rows)]
+        if me:
+            del me['player']
+        return Response({'level': level.id, 'top': top, 'me': me})
+
+@staff_member_required
+def export_view(request, name):
+    """Stream attempts, progress or scores as CSV or NDJSON (staff only)"""
+    if name not in EXPORTS:
+        raise Http404(f"Unknown export: {name}")
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    try:
+        columns, rows = export_rows(
+            name,
+            level=request.GET.get('level'),
+            user=request.GET.get('user'),
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(render_lines(columns, rows, fmt), content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+    # Under ASGI, rows are read one chunk at a time instead of being collected up front
+    return stream_for(request, response, batch=EXPORT_CHUNK_SIZE)
 
 @login_required
 def review_view(request):
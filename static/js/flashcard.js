@@ -136,8 +136,8 @@ async function startGame() {
         if (incorrectWords.length === 0) {
             flashcardGame.innerHTML = `
                 <div class="no-words">
-                    <h2>No incorrect answer found</h2>
-                    <p>You answered all questions correctly at this level or have not taken the test yet.<br>Try the quiz first to use the flashcards.</p>
+                    <h2>No cards due for review</h2>
+                    <p>You have reviewed every card that is due at this level or have not taken the test yet.<br>Try the quiz first to use the flashcards.</p>
                 </div>
             `;
             return;
@@ -152,17 +152,18 @@ async function startGame() {
     }
 }
 
-// Load incorrect words from API
+// Load cards that are due for review from API
 async function loadIncorrectWords(levelId) {
     try {
-        console.log("Loading incorrect words for level:", levelId);
+        console.log("Loading due cards for level:", levelId);
         
+        let cards;
         // Try to use progressService if available
         if (window.progressService) {
-            incorrectWords = await progressService.getIncorrectQuestions(levelId);
+            cards = await progressService.getDueCards(levelId);
         } else {
             // Fallback to direct API call
-            const response = await fetch(`/api/progress/incorrect_questions/?level_id=${levelId}`, {
+            const response = await fetch(`/api/progress/next_cards/?level_id=${levelId}&limit=50`, {
                 method: "GET",
                 headers: {
                     "Content-Type": "application/json",
@@ -174,18 +175,36 @@ async function loadIncorrectWords(levelId) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
             
-            incorrectWords = await response.json();
+            cards = await response.json();
         }
         
-        console.log("Loaded incorrect words:", incorrectWords);
+        incorrectWords = cards.map(card => card.question_details);
+        console.log("Loaded due cards:", incorrectWords);
         return incorrectWords;
         
     } catch (error) {
-        console.error("Error loading incorrect words:", error);
+        console.error("Error loading due cards:", error);
         throw error;
     }
 }
 
+// Send a review result so the card is rescheduled
+function reviewCard(word, remembered) {
+    if (window.progressService) {
+        progressService.reviewCard(word.id, remembered);
+        return;
+    }
+    fetch("/api/progress/review_card/", {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+            "X-Requested-With": "XMLHttpRequest",
+            "X-CSRFToken": getCsrfToken()
+        },
+        body: JSON.stringify({ question_id: word.id, remembered: remembered })
+    }).catch(error => console.error("Error reviewing card:", error));
+}
+
 // Show a flashcard
 function showCard(index) {
     // If we've gone through all cards
@@ -278,11 +297,13 @@ function showCard(index) {
     });
     
     rememberedBtn.addEventListener("click", () => {
+        reviewCard(word, true);
         currentCardIndex++;
         showCard(currentCardIndex);
     });
     
     notRememberedBtn.addEventListener("click", () => {
+        reviewCard(word, false);
         notRememberedWords.push(word);
         currentCardIndex++;
         showCard(currentCardIndex);
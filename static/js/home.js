@@ -256,18 +256,18 @@ function updateLevelStatus(levelId, newStatus) {
 }
 
 // Initialize everything
+// progress-service.js โหลดจาก home.html ก่อนไฟล์นี้แล้ว
 document.addEventListener('DOMContentLoaded', function() {
-    // Load the progress service script
-    const script = document.createElement('script');
-    script.src = '/static/js/progress-service.js';
-    script.onload = function() {
-        // Initialize levels after progress service is loaded
-        initializeLevels();
-        setupEventListeners();
-        
-        // เพิ่มฟังก์ชัน initializeLevels ให้ window object
-        window.initializeLevels = initializeLevels;
-        window.updateLevelStatus = updateLevelStatus;
-    };
-    document.head.appendChild(script);
+    initializeLevels();
+    setupEventListeners();
+
+    // ผ่าน level ในอีกแท็บหรืออุปกรณ์อื่น ให้หน้านี้อัปเดตเองโดยไม่ต้อง poll
+    progressService.connectLive({
+        unlock: () => initializeLevels(),
+        progress: () => initializeLevels()
+    });
+
+    // เพิ่มฟังก์ชัน initializeLevels ให้ window object
+    window.initializeLevels = initializeLevels;
+    window.updateLevelStatus = updateLevelStatus;
 });
\ No newline at end of file
@@ -33,24 +33,48 @@ style.innerHTML = `
 document.head.appendChild(style);
 
 // For fetch vocabulary from API
-fetch('/api/vocabulary/', {
-    method: 'GET',
-    headers: {
-        'Content-Type': 'application/json',
-        'X-Requested-With': 'XMLHttpRequest'
-    }
-})
-.then(function (response) {
-    if (!response.ok) {
-        throw new Error('Network response was not ok: ' + response.status);
-    }
-    return response.json();
-})
+function fetchJson(url) {
+    return fetch(url, {
+        method: 'GET',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    }).then(function (response) {
+        if (!response.ok) {
+            throw new Error('Network response was not ok: ' + response.status);
+        }
+        return response.json();
+    });
+}
+
+// The snapshot file name contains a content hash, so the browser can keep it
+// cached; only the tiny pointer request goes to the server on each visit
+function loadVocabulary() {
+    return fetchJson('/api/vocabulary/snapshot/')
+        .then(manifest => fetch(manifest.url))
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Snapshot not available: ' + response.status);
+            }
+            return response.json();
+        })
+        .then(snapshot => snapshot.rows.map(row =>
+            Object.fromEntries(snapshot.fields.map((field, i) => [field, row[i]]))
+        ))
+        .catch(error => {
+            console.warn('Falling back to /api/vocabulary/:', error);
+            return fetchJson('/api/vocabulary/');
+        });
+}
+
+loadVocabulary()
 .then(function (data) {
     console.log('Data loaded from API:', data);
     
     // แปลงข้อมูลจาก API
     vocabularyData = data.map(item => ({
+        Id: item.id,
         Category: item.category,
         Word: item.word,
         Pronunciation: item.pronunciation,
@@ -218,17 +242,46 @@ function setupSearchAndSort() {
             return matchesSearch && matchesCategory;
         });
         
-        displayVocabulary(filteredData);
+        displayFilteredRows(filteredData);
         
-        // Apply alternating row background
-        document.querySelectorAll("tbody tr").forEach((row, i) => {
-            row.style.backgroundColor = (i % 2 === 0) ? "transparent" : "#0000000b";
-            // Add animation delay
-            row.style.setProperty("--delay", i / 25 + "s");
-        });
+        // ไม่เจอคำที่ตรงกันเลย ลองถาม server ซึ่งทนต่อการสะกดคำอ่านต่างกัน/พิมพ์ผิด
+        if (filteredData.length === 0 && searchTerm.trim().length >= 2) {
+            suggestFromServer(search, searchTerm, selectedCategory);
+        }
     }
 }
 
+function displayFilteredRows(data) {
+    displayVocabulary(data);
+    
+    // Apply alternating row background
+    document.querySelectorAll("tbody tr").forEach((row, i) => {
+        row.style.backgroundColor = (i % 2 === 0) ? "transparent" : "#0000000b";
+        // Add animation delay
+        row.style.setProperty("--delay", i / 25 + "s");
+    });
+}
+
+// Fuzzy autocomplete from /api/vocabulary/autocomplete/ (e.g. "ga pok" finds "ka phok")
+function suggestFromServer(search, searchTerm, selectedCategory) {
+    fetch(`/api/vocabulary/autocomplete/?q=${encodeURIComponent(searchTerm)}`, {
+        headers: { 'X-Requested-With': 'XMLHttpRequest' }
+    })
+    .then(response => response.ok ? response.json() : [])
+    .then(suggestions => {
+        // The user kept typing, this answer is stale
+        if (search.value.toLowerCase() !== searchTerm) return;
+        const byId = new Map(vocabularyData.map(item => [item.Id, item]));
+        const suggested = suggestions
+            .map(suggestion => byId.get(suggestion.id))
+            .filter(item => item && (selectedCategory === '' || item.Category === selectedCategory));
+        if (suggested.length > 0) {
+            displayFilteredRows(suggested);
+        }
+    })
+    .catch(error => console.error("Error fetching suggestions:", error));
+}
+
 function searchVocabulary(searchTerm) {
     const categoryFilter = document.getElementById("category-filter");
     const selectedCategory = categoryFilter ? categoryFilter.value : '';
@@ -10,6 +10,17 @@ let currentQuestionIndex = 0;
 let score = 0;
 let progressSubmitted = false;
 let questionAttempts = [];
+let submissionKey = null;
+let spriteAudio = null;
+let spriteStopTimer = null;
+
+// สร้าง key สำหรับการส่งผล quiz หนึ่งรอบ ใช้ซ้ำได้ทุกครั้งที่ retry เพื่อไม่ให้บันทึกซ้ำ
+function generateSubmissionKey() {
+    if (window.crypto && window.crypto.randomUUID) {
+        return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
 
 function getCookie(name) {
     let cookieValue = null;
@@ -76,6 +87,7 @@ async function fetchQuestions() {
         console.log('Received data:', data);
         console.log('Number of questions:', data.length);
         questions = data;
+        preloadSoundSprite();
 
         // check if have questions
         if (questions && questions.length > 0) {
@@ -102,6 +114,7 @@ function startQuiz() {
     score = 0;
     progressSubmitted = false;
     questionAttempts = [];
+    submissionKey = generateSubmissionKey();
     nextButton.innerHTML = "Next";
     showQuestion();
 }
@@ -142,7 +155,7 @@ function showQuestion() {
     // เพิ่มปุ่มเล่นเสียง
     if (currentQuestion.sound_file_url) {
         questionHTML += `
-            <button class="sound-button" data-sound="${currentQuestion.sound_file_url}" type="button">
+            <button class="sound-button" data-sound="${currentQuestion.sound_file_url}"${spriteAttributes(currentQuestion)} type="button">
                 <i class="bx bx-volume-full"></i>
             </button>
         `;
@@ -250,7 +263,7 @@ function showScore() {
         
         if (window.progressService) {
             console.log("Using progressService to submit quiz");
-            progressService.submitQuiz()
+            progressService.submitQuiz(submissionKey)
                 .then(result => {
                     console.log('Progress submitted successfully:', result);
                     progressSubmitted = true;
@@ -341,7 +354,8 @@ function submitDirectly(score, totalQuestions, levelId) {
         headers: {
             'Content-Type': 'application/json',
             'X-Requested-With': 'XMLHttpRequest',
-            'X-CSRFToken': getCookie('csrftoken')
+            'X-CSRFToken': getCookie('csrftoken'),
+            'Idempotency-Key': submissionKey
         },
         body: JSON.stringify({
             level_id: levelId,
@@ -396,7 +410,8 @@ function submitTraditionalScore(score, totalQuestions, levelId) {
         headers: {
             'Content-Type': 'application/json',
             'X-Requested-With': 'XMLHttpRequest',
-            'X-CSRFToken': getCookie('csrftoken')
+            'X-CSRFToken': getCookie('csrftoken'),
+            'Idempotency-Key': submissionKey
         },
         body: JSON.stringify(data)
     })
@@ -412,10 +427,14 @@ function submitTraditionalScore(score, totalQuestions, levelId) {
     })
     .catch(error => {
         console.error('Error submitting traditional score:', error);
+        // เก็บผลไว้ส่งใหม่ครั้งถัดไปที่ออนไลน์ (ใช้ key เดิมจึงไม่บันทึกซ้ำ)
+        if (typeof progressService !== 'undefined') {
+            progressService.queueOfflineQuiz(submissionKey, levelId, questionAttempts);
+        }
         // Show error message to user
         const errorMsg = document.createElement('p');
         errorMsg.className = 'error-message';
-        errorMsg.innerHTML = 'Could not save your progress. Please try again later.';
+        errorMsg.innerHTML = 'You seem to be offline. Your progress will be saved next time you are online.';
         document.querySelector('.quiz').appendChild(errorMsg);
     });
 }
@@ -433,8 +452,8 @@ nextButton.addEventListener("click", () => {
 document.addEventListener('DOMContentLoaded', function() {
     console.log('DOM fully loaded');
     
-    // ตรวจสอบว่ามี progress service
-    if (window.progressService) {
+    // ตรวจสอบว่ามี progress service (const ระดับบนสุดไม่อยู่ใน window จึงต้องใช้ typeof)
+    if (typeof progressService !== 'undefined') {
         console.log('Progress service found, fetching questions...');
         fetchQuestions();
     } else {
@@ -463,11 +482,62 @@ function setupSoundButtons() {
     });
 }
 
+// โหลดไฟล์เสียงรวมของทั้ง level ครั้งเดียว แทนการโหลดไฟล์ทีละคำถาม
+function preloadSoundSprite() {
+    const level = questions.length > 0 ? questions[0].level_details : null;
+    if (level && level.sound_sprite_url) {
+        spriteAudio = new Audio(level.sound_sprite_url);
+        spriteAudio.preload = 'auto';
+    }
+}
+
+function spriteAttributes(question) {
+    if (!spriteAudio || !question.sound_sprite) {
+        return '';
+    }
+    const [start, end] = question.sound_sprite;
+    return ` data-start="${start}" data-end="${end}"`;
+}
+
+// เล่นเฉพาะช่วง [start, end] ของคำถามใน sprite
+function playSpriteSegment(button) {
+    const start = parseFloat(button.dataset.start);
+    const end = parseFloat(button.dataset.end);
+
+    clearTimeout(spriteStopTimer);
+    spriteAudio.pause();
+    spriteAudio.currentTime = start;
+    button.classList.add('playing');
+
+    return spriteAudio.play().then(() => {
+        spriteStopTimer = setTimeout(() => {
+            spriteAudio.pause();
+            button.classList.remove('playing');
+        }, (end - start) * 1000);
+    });
+}
+
 function playQuestionSound(e) {
     e.preventDefault(); // กัน submit form
     e.stopPropagation(); // กันไม่ให้ event ทำงานซ้อนกัน
     
     const button = e.currentTarget;
+
+    if (spriteAudio && button.dataset.start !== undefined) {
+        playSpriteSegment(button).catch(error => {
+            // เล่นจาก sprite ไม่ได้ ใช้ไฟล์ของคำถามแทน
+            console.error('Error playing sound sprite:', error);
+            button.classList.remove('playing');
+            spriteAudio = null;
+            playSoundFile(button);
+        });
+        return;
+    }
+
+    playSoundFile(button);
+}
+
+function playSoundFile(button) {
     const soundUrl = button.dataset.sound;
     
     if (soundUrl) {
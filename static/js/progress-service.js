@@ -11,6 +11,8 @@ class ProgressService {
 
     // Initialize level progress
     async initLevelProgress() {
+        // ส่งผล quiz ที่ทำไว้ตอนออฟไลน์ก่อน (ถ้ามี)
+        await this.syncPendingQuizzes();
         try {
             console.log('Fetching user levels progress...');
             const response = await fetch(`${this.apiBaseUrl}user_levels/`, {
@@ -54,7 +56,8 @@ class ProgressService {
     }
 
     // Submit answers for a level
-    async submitQuiz() {
+    // idempotencyKey: same key on every retry so the server records the quiz only once
+    async submitQuiz(idempotencyKey = null) {
         if (!this.currentLevel || this.quizAnswers.length === 0) {
             console.error('No level or answers to submit', { 
                 currentLevel: this.currentLevel, 
@@ -72,13 +75,18 @@ class ProgressService {
             const csrfToken = this.getCsrfToken();
             console.log('CSRF Token:', csrfToken ? 'Present' : 'Missing');
 
+            const headers = {
+                'Content-Type': 'application/json',
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': csrfToken
+            };
+            if (idempotencyKey) {
+                headers['Idempotency-Key'] = idempotencyKey;
+            }
+
             const response = await fetch(`${this.apiBaseUrl}submit_quiz/`, {
                 method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'X-Requested-With': 'XMLHttpRequest',
-                    'X-CSRFToken': csrfToken
-                },
+                headers: headers,
                 body: JSON.stringify({
                     level_id: this.currentLevel,
                     answers: this.quizAnswers
@@ -169,6 +177,143 @@ class ProgressService {
         }
     }
 
+    // Get flashcards that are due for review (spaced repetition)
+    async getDueCards(levelId = null, limit = 50) {
+        let url = `${this.apiBaseUrl}next_cards/?limit=${limit}`;
+        if (levelId) {
+            url += `&level_id=${levelId}`;
+        }
+
+        try {
+            const response = await fetch(url, {
+                method: 'GET',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-Requested-With': 'XMLHttpRequest'
+                }
+            });
+
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const cards = await response.json();
+            console.log('Due cards fetched:', cards.length);
+            return cards;
+        } catch (error) {
+            console.error('Error fetching due cards:', error);
+            return [];
+        }
+    }
+
+    // Send the result of one flashcard review so the card is rescheduled
+    async reviewCard(questionId, remembered) {
+        try {
+            const response = await fetch(`${this.apiBaseUrl}review_card/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-Requested-With': 'XMLHttpRequest',
+                    'X-CSRFToken': this.getCsrfToken()
+                },
+                body: JSON.stringify({
+                    question_id: questionId,
+                    remembered: remembered
+                }),
+                credentials: 'same-origin'
+            });
+
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return await response.json();
+        } catch (error) {
+            console.error('Error reviewing card:', error);
+            return null;
+        }
+    }
+
+    // Keep a quiz that could not be submitted so it is sent on the next sync
+    queueOfflineQuiz(clientId, levelId, answers) {
+        const pending = JSON.parse(localStorage.getItem('pendingQuizzes') || '[]');
+        if (pending.some(quiz => quiz.client_id === clientId)) {
+            return;
+        }
+        pending.push({
+            client_id: clientId,
+            level_id: levelId,
+            completed_at: new Date().toISOString(),
+            answers: answers.map(answer => ({
+                question_id: answer.question_id,
+                answer_id: answer.answer_id
+            }))
+        });
+        localStorage.setItem('pendingQuizzes', JSON.stringify(pending));
+        console.log(`Queued offline quiz ${clientId}, ${pending.length} pending`);
+    }
+
+    // Send all offline quizzes in one request and pick up progress changed since the last sync
+    async syncPendingQuizzes() {
+        const pending = JSON.parse(localStorage.getItem('pendingQuizzes') || '[]');
+        if (pending.length === 0) {
+            return null;
+        }
+
+        try {
+            const response = await fetch(`${this.apiBaseUrl}sync/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-Requested-With': 'XMLHttpRequest',
+                    'X-CSRFToken': this.getCsrfToken()
+                },
+                body: JSON.stringify({
+                    since: localStorage.getItem('progressSyncToken'),
+                    quizzes: pending
+                }),
+                credentials: 'same-origin'
+            });
+
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const result = await response.json();
+            // Recorded, duplicate and rejected quizzes are all done; only keep ones added meanwhile
+            const handled = new Set(result.results.map(item => item.client_id));
+            const remaining = JSON.parse(localStorage.getItem('pendingQuizzes') || '[]')
+                .filter(quiz => !handled.has(quiz.client_id));
+            localStorage.setItem('pendingQuizzes', JSON.stringify(remaining));
+            localStorage.setItem('progressSyncToken', result.token);
+            console.log('Synced offline quizzes:', result.results);
+            return result;
+        } catch (error) {
+            console.error('Error syncing offline quizzes:', error);
+            return null;
+        }
+    }
+
+    // รับการปลดล็อก level และ leaderboard แบบ real-time (server-sent events)
+    // handlers: { unlock, progress, leaderboard } แต่ละตัวรับ data ของ event
+    // ถ้า server ไม่ได้รันแบบ ASGI จะตอบ 204 และ EventSource ปิดเอง (ใช้การ fetch แบบเดิมต่อ)
+    connectLive(handlers = {}, levelIds = []) {
+        if (!window.EventSource || this.liveSource) {
+            return this.liveSource || null;
+        }
+        const query = levelIds.length > 0 ? `?levels=${levelIds.join(',')}` : '';
+        this.liveSource = new EventSource(`/progress/events/${query}`);
+        Object.entries(handlers).forEach(([event, handler]) => {
+            this.liveSource.addEventListener(event, message => {
+                try {
+                    handler(JSON.parse(message.data));
+                } catch (error) {
+                    console.error(`Error handling live ${event} event:`, error);
+                }
+            });
+        });
+        return this.liveSource;
+    }
+
     // Get CSRF token from cookies
     getCsrfToken() {
         let cookieValue = null;